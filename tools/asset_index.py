@@ -0,0 +1,457 @@
+"""
+Asset Index and Cleaner
+Indexes assets/ and finds files that only slow down imports and exports
+
+Godot imports every image under the project and keeps a .import file next
+to it. Files renamed or removed by hand leave their .import behind
+(e.g. dungeon_tileset_1770125130429.png.import without the png), and
+PixelLab bundles are kept both as .zip and as the extracted directory.
+This tool reports:
+
+    orphans       .import files whose source file no longer exists
+    duplicates    files with the same content as another file (one is kept;
+                  copies that are referenced themselves are only reported)
+    bundles       .zip bundles whose extracted directory holds the same files
+    unreferenced  assets no scene, script or project setting points to
+
+with the bytes each would reclaim, plus referenced paths that are missing.
+Nothing is deleted unless --apply is given. Unreferenced files are only
+deleted with --unreferenced as well: scripts may build paths at runtime
+that a text scan cannot see.
+
+Usage:
+    python asset_index.py [project_dir] [options]
+"""
+
+import json
+import os
+import re
+import sys
+import zipfile
+import zlib
+
+from output_cache import file_hash
+from pixellab_bundle import member_path
+
+
+IMPORT_SUFFIX = '.import'
+
+# Files scanned for res:// and uid:// references
+REFERENCE_EXTENSIONS = ('.gd', '.tscn', '.tres', '.godot', '.cfg')
+
+# Directories never indexed or scanned (engine cache, VCS, tool caches)
+SKIP_DIRS = {'.godot', '.git', '.import', '__pycache__', '.sprite_cache'}
+
+# Categories --apply can delete
+CATEGORIES = ('orphans', 'duplicates', 'bundles', 'unreferenced')
+
+# Categories --apply deletes by default
+DEFAULT_CLEAN = ('orphans', 'duplicates', 'bundles')
+
+# Millisecond timestamp that generators append to file names
+TIMESTAMP_PATTERN = re.compile(r'_\d{13}(?=\.)')
+
+_RES_PATTERN = re.compile(r'res://[^"\'\s)\]]+')
+_UID_PATTERN = re.compile(r'uid://[0-9a-z_]+')
+_IMPORT_FIELD = re.compile(r'^(source_file|uid)="([^"]*)"', re.MULTILINE)
+
+_CRC_CHUNK = 1 << 20
+
+
+def find_project_root(start=None):
+	"""Nearest directory at or above start holding project.godot"""
+	path = os.path.abspath(start or os.path.dirname(os.path.abspath(__file__)))
+	while True:
+		if os.path.isfile(os.path.join(path, 'project.godot')):
+			return path
+		parent = os.path.dirname(path)
+		if parent == path:
+			raise FileNotFoundError(f"No project.godot at or above {start or os.getcwd()}")
+		path = parent
+
+
+def walk_files(root, top):
+	"""Project-relative paths (with '/') of every file below root/top"""
+	for dirpath, dirnames, filenames in os.walk(os.path.join(root, top)):
+		dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+		for name in sorted(filenames):
+			yield os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, '/')
+
+
+def read_import(path):
+	"""
+	Fields of a Godot .import file
+
+	Returns:
+		Dict with 'source_file' and 'uid' (missing fields are absent)
+	"""
+	with open(path, encoding='utf-8', errors='replace') as f:
+		return dict(_IMPORT_FIELD.findall(f.read()))
+
+
+def res_to_relpath(res):
+	"""'res://assets/a.png' -> 'assets/a.png'"""
+	return res[len('res://'):] if res.startswith('res://') else res
+
+
+def index_assets(root, assets_dir='assets'):
+	"""
+	Index every file below root/assets_dir
+
+	Content hashes are only computed for files whose size matches another
+	file's, since only those can be duplicates.
+
+	Returns:
+		Dict relpath -> {'size', 'hash' (or None), 'import' (fields of a
+		.import file, or None)}
+	"""
+	index = {}
+	by_size = {}
+	for relpath in walk_files(root, assets_dir):
+		entry = {'size': os.path.getsize(os.path.join(root, relpath)), 'hash': None, 'import': None}
+		if relpath.endswith(IMPORT_SUFFIX):
+			entry['import'] = read_import(os.path.join(root, relpath))
+		else:
+			by_size.setdefault(entry['size'], []).append(relpath)
+		index[relpath] = entry
+
+	for paths in by_size.values():
+		if len(paths) > 1:
+			for relpath in paths:
+				index[relpath]['hash'] = file_hash(os.path.join(root, relpath))
+
+	return index
+
+
+def find_references(root, assets_dir='assets'):
+	"""
+	res:// paths and uid:// ids mentioned by scenes, scripts and settings
+
+	Returns:
+		(set of referenced relpaths or directory prefixes, set of uids)
+	"""
+	paths = set()
+	uids = set()
+	for relpath in walk_files(root, '.'):
+		if relpath.startswith(assets_dir + '/') or not relpath.endswith(REFERENCE_EXTENSIONS):
+			continue
+		with open(os.path.join(root, relpath), encoding='utf-8', errors='replace') as f:
+			text = f.read()
+		paths.update(res_to_relpath(res) for res in _RES_PATTERN.findall(text))
+		uids.update(_UID_PATTERN.findall(text))
+	return paths, uids
+
+
+def is_referenced(relpath, references):
+	"""True if relpath or one of its parent directories is referenced"""
+	if relpath in references:
+		return True
+	parts = relpath.split('/')
+	return any('/'.join(parts[:i]) + '/' in references for i in range(1, len(parts)))
+
+
+def source_of(relpath):
+	"""Source path of a .import file ('a.png.import' -> 'a.png')"""
+	return relpath[:-len(IMPORT_SUFFIX)]
+
+
+def find_orphans(root, index):
+	"""
+	.import files whose source is gone
+
+	Returns:
+		Sorted list of relpaths
+	"""
+	orphans = []
+	for relpath, entry in index.items():
+		if entry['import'] is None:
+			continue
+		source = res_to_relpath(entry['import'].get('source_file', '')) or source_of(relpath)
+		if not os.path.exists(os.path.join(root, source)):
+			orphans.append(relpath)
+	return sorted(orphans)
+
+
+def _keep_rank(relpath, live):
+	"""Sort key choosing which copy of duplicate content to keep"""
+	return (
+		relpath not in live,
+		bool(TIMESTAMP_PATTERN.search(os.path.basename(relpath))),
+		relpath.count('/'),
+		len(relpath),
+		relpath,
+	)
+
+
+def find_duplicates(index, live=()):
+	"""
+	Groups of files with identical content
+
+	Referenced, untimestamped, shallow and short paths are kept first.
+	Other referenced copies are never duplicates to delete: removing them
+	would break the scene or script that loads them.
+
+	Returns:
+		List of (kept relpath, [unreferenced copies], [referenced copies]),
+		largest first
+	"""
+	groups = {}
+	for relpath, entry in index.items():
+		if entry['hash'] is not None:
+			groups.setdefault(entry['hash'], []).append(relpath)
+
+	result = []
+	for paths in groups.values():
+		if len(paths) > 1:
+			paths = sorted(paths, key=lambda p: _keep_rank(p, live))
+			copies = paths[1:]
+			result.append((paths[0], [p for p in copies if p not in live],
+						   [p for p in copies if p in live]))
+	return sorted(result, key=lambda group: (-index[group[0]]['size'], group[0]))
+
+
+def _file_crc(path):
+	crc = 0
+	with open(path, 'rb') as f:
+		for chunk in iter(lambda: f.read(_CRC_CHUNK), b''):
+			crc = zlib.crc32(chunk, crc)
+	return crc
+
+
+def bundle_extracted(root, relpath):
+	"""
+	True if the directory next to a .zip holds every file of the zip
+
+	Members are compared by size and CRC-32, so the zip is not decompressed.
+	A single top-level folder inside the zip is ignored. A zip with member
+	paths leaving the directory ('..', absolute) never counts as extracted.
+	"""
+	directory = os.path.join(root, relpath[:-len('.zip')])
+	if not os.path.isdir(directory):
+		return False
+
+	with zipfile.ZipFile(os.path.join(root, relpath)) as archive:
+		members = [info for info in archive.infolist() if not info.is_dir()]
+		names = [info.filename for info in members]
+		top = names[0].split('/')[0] + '/' if names else ''
+		if not top or not all(name.startswith(top) for name in names):
+			top = ''
+
+		for info in members:
+			try:
+				path = member_path(directory, info.filename[len(top):])
+			except ValueError:
+				return False
+			if not os.path.isfile(path) or os.path.getsize(path) != info.file_size:
+				return False
+			if _file_crc(path) != info.CRC:
+				return False
+
+	return bool(members)
+
+
+def find_bundles(root, index):
+	"""
+	.zip bundles already extracted next to themselves
+
+	Returns:
+		Sorted list of relpaths
+	"""
+	return sorted(relpath for relpath in index
+				  if relpath.lower().endswith('.zip') and bundle_extracted(root, relpath))
+
+
+def build_report(root, assets_dir='assets'):
+	"""
+	Index assets and collect every cleanup candidate
+
+	Returns:
+		Dict with 'files', 'bytes' and, per category, the list of
+		candidate relpaths and the 'reclaimable' bytes; duplicates and
+		unreferenced files include their .import files. Referenced copies
+		of duplicate content are listed under 'referenced_duplicates' and
+		are never deleted
+	"""
+	index = index_assets(root, assets_dir)
+	references, uids = find_references(root, assets_dir)
+
+	# Sources referenced by uid (scenes often store uid:// next to the path)
+	for relpath, entry in index.items():
+		if entry['import'] and entry['import'].get('uid') in uids:
+			references.add(res_to_relpath(entry['import'].get('source_file', '')))
+
+	live = {relpath for relpath in index
+			if not relpath.endswith(IMPORT_SUFFIX) and is_referenced(relpath, references)}
+
+	def with_import(paths):
+		return [p for path in paths for p in (path, path + IMPORT_SUFFIX) if p in index]
+
+	orphans = find_orphans(root, index)
+	duplicate_groups = find_duplicates(index, live)
+	duplicates = with_import(path for _, paths, _ in duplicate_groups for path in paths)
+	bundles = find_bundles(root, index)
+
+	# Sources whose copies go anyway are not reported twice
+	claimed = set(duplicates) | set(bundles)
+	unreferenced = with_import(sorted(
+		relpath for relpath in index
+		if not relpath.endswith(IMPORT_SUFFIX) and relpath not in live and relpath not in claimed
+	))
+
+	report = {
+		'root': root,
+		'files': len(index),
+		'bytes': sum(entry['size'] for entry in index.values()),
+		'duplicate_groups': [{'keep': keep, 'duplicates': paths, 'referenced': referenced}
+							 for keep, paths, referenced in duplicate_groups],
+		'referenced_duplicates': [path for _, _, referenced in duplicate_groups for path in referenced],
+		'missing': sorted(ref for ref in references if ref.startswith(assets_dir + '/')
+						  and not os.path.exists(os.path.join(root, ref))),
+	}
+	for name, paths in (('orphans', orphans), ('duplicates', duplicates),
+						('bundles', bundles), ('unreferenced', unreferenced)):
+		report[name] = paths
+		report[name + '_bytes'] = sum(index[path]['size'] for path in paths)
+	return report
+
+
+def print_report(report):
+	"""Print every category with its files and reclaimable bytes"""
+	print("="*60)
+	print(f"ASSET INDEX: {report['files']} files, {report['bytes']:,} bytes")
+	print("="*60)
+
+	labels = {
+		'orphans': ".import files without a source",
+		'duplicates': "Duplicate content",
+		'bundles': "Bundles already extracted",
+		'unreferenced': "Not referenced by scenes, scripts or settings",
+	}
+	for name, label in labels.items():
+		paths = report[name]
+		print(f"\n{label}: {len(paths)} files, {report[name + '_bytes']:,} bytes")
+		if name == 'duplicates':
+			for group in report['duplicate_groups']:
+				if not group['duplicates']:
+					continue
+				print(f"  keep {group['keep']}")
+				for path in group['duplicates']:
+					print(f"    ✗ {path}")
+		else:
+			for path in paths:
+				print(f"  ✗ {path}")
+
+	if report['referenced_duplicates']:
+		print(f"\nReferenced duplicates (merge by hand, never deleted): "
+			  f"{len(report['referenced_duplicates'])}")
+		for group in report['duplicate_groups']:
+			if group['referenced']:
+				print(f"  same as {group['keep']}")
+				for path in group['referenced']:
+					print(f"    = {path}")
+
+	if report['missing']:
+		print(f"\nReferenced but missing: {len(report['missing'])}")
+		for path in report['missing']:
+			print(f"  ? {path}")
+
+
+def apply_cleanup(report, categories=DEFAULT_CLEAN):
+	"""
+	Delete the candidates of the given categories
+
+	Returns:
+		(files deleted, bytes reclaimed)
+	"""
+	unknown = [name for name in categories if name not in CATEGORIES]
+	if unknown:
+		raise ValueError(f"Unknown categories: {', '.join(unknown)} (expected {', '.join(CATEGORIES)})")
+
+	root = report['root']
+	paths = sorted({path for name in categories for path in report[name]})
+
+	deleted = 0
+	reclaimed = 0
+	for relpath in paths:
+		path = os.path.join(root, relpath)
+		try:
+			size = os.path.getsize(path)
+			os.remove(path)
+		except OSError as e:
+			print(f"  ✗ {relpath}: {e}")
+			continue
+		deleted += 1
+		reclaimed += size
+	return deleted, reclaimed
+
+
+if __name__ == "__main__":
+	if '--help' in sys.argv or '-h' in sys.argv:
+		print("Asset Index and Cleaner")
+		print("="*60)
+		print("\nUsage:")
+		print("  python asset_index.py [project_dir] [options]")
+		print()
+		print("Options:")
+		print("  --apply           Delete orphans, duplicates and extracted bundles")
+		print("                    (default: dry run, only report)")
+		print("  --unreferenced    With --apply, also delete unreferenced assets")
+		print("  --only <list>     Categories to delete, comma separated")
+		print("                    (orphans, duplicates, bundles, unreferenced)")
+		print("  --assets <dir>    Asset directory below the project (default: assets)")
+		print("  --json <path>     Also write the report as JSON")
+		print()
+		print("Examples:")
+		print("  python asset_index.py")
+		print("  python asset_index.py --apply --only orphans")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	assets_dir = 'assets'
+	json_path = None
+	categories = list(DEFAULT_CLEAN)
+	start = None
+
+	i = 0
+	while i < len(args):
+		if args[i] == '--assets':
+			assets_dir = args[i + 1]
+			i += 2
+		elif args[i] == '--json':
+			json_path = args[i + 1]
+			i += 2
+		elif args[i] == '--only':
+			categories = args[i + 1].split(',')
+			i += 2
+		elif args[i].startswith('--'):
+			i += 1
+		else:
+			start = args[i]
+			i += 1
+
+	if '--unreferenced' in args and 'unreferenced' not in categories:
+		categories.append('unreferenced')
+
+	unknown = [name for name in categories if name not in CATEGORIES]
+	if unknown:
+		print(f"✗ Error: unknown --only categories: {', '.join(unknown)} "
+			  f"(expected {', '.join(CATEGORIES)})")
+		sys.exit(1)
+
+	root = find_project_root(start)
+	report = build_report(root, assets_dir)
+	print_report(report)
+
+	if json_path:
+		with open(json_path, 'w', encoding='utf-8') as f:
+			json.dump(report, f, indent=2)
+		print(f"\nReport: {json_path}")
+
+	reclaimable = sum(report[name + '_bytes'] for name in categories)
+	print("\n" + "="*60)
+	if '--apply' in args:
+		deleted, reclaimed = apply_cleanup(report, categories)
+		print(f"✓ Deleted {deleted} files, reclaimed {reclaimed:,} bytes ({', '.join(categories)})")
+	else:
+		print(f"Dry run: --apply would delete {', '.join(categories)}, "
+			  f"reclaiming {reclaimable:,} bytes")
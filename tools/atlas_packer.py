@@ -0,0 +1,433 @@
+"""
+Texture Atlas Packer
+Packs every rotation and animation frame of a character into atlases
+
+Reads the character's metadata.json (bundle zip or extracted directory),
+bin-packs all frames with a MaxRects (best short side fit) packer into as
+few atlases as possible, then writes the atlas PNGs and a Godot 4
+SpriteFrames resource (.tres) whose frames are AtlasTextures into them.
+One texture instead of dozens of small PNGs means fewer HTTP fetches in
+the web export and fewer texture binds at runtime.
+
+With --trim, frames are cropped to their visible pixels before packing
+and each AtlasTexture gets a margin restoring the original frame size,
+so sprites render in the same place from much smaller atlases. A
+<name>_trim.json sidecar records every frame's original size, offset and
+atlas region.
+
+With --dedup, identical (or, with a threshold, nearly identical) frames
+are packed once and share one atlas region; <name>_aliases.json lists the
+duplicates and the area saved.
+
+Animations in the SpriteFrames resource:
+    rotation_<direction>       single rotation frame
+    <animation>_<direction>    animation frames in order
+
+Usage:
+    python atlas_packer.py <bundle.zip|character_dir> [options]
+"""
+
+import numpy as np
+import os
+import sys
+
+from frame_dedup import dedup_report, find_duplicates, print_report, write_aliases
+from pixellab_bundle import frame_pixels, load_character
+from png_output import save_png
+from sprite_trim import trim_frames, write_sidecar
+from stage_profile import stage, profile_run
+
+
+# Largest atlas side; frames that do not fit go into another atlas
+DEFAULT_MAX_ATLAS_SIZE = 2048
+
+# Transparent pixels between packed frames
+DEFAULT_PADDING = 1
+
+DEFAULT_FPS = 8.0
+
+
+def _fits(free, w, h):
+	return w <= free[2] and h <= free[3]
+
+
+def _split_free_rects(free_rects, used):
+	"""Split every free rectangle overlapping `used` into up to four pieces"""
+	ux, uy, uw, uh = used
+	result = []
+
+	for fx, fy, fw, fh in free_rects:
+		if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+			result.append((fx, fy, fw, fh))
+			continue
+
+		if ux > fx:
+			result.append((fx, fy, ux - fx, fh))
+		if ux + uw < fx + fw:
+			result.append((ux + uw, fy, fx + fw - ux - uw, fh))
+		if uy > fy:
+			result.append((fx, fy, fw, uy - fy))
+		if uy + uh < fy + fh:
+			result.append((fx, uy + uh, fw, fy + fh - uy - uh))
+
+	# Drop free rectangles contained in another one
+	pruned = []
+	for i, a in enumerate(result):
+		contained = False
+		for j, b in enumerate(result):
+			if i != j and a[0] >= b[0] and a[1] >= b[1] and \
+					a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3] and \
+					(a != b or i > j):
+				contained = True
+				break
+		if not contained:
+			pruned.append(a)
+
+	return pruned
+
+
+def maxrects_pack(sizes, bin_width, bin_height, padding=DEFAULT_PADDING):
+	"""
+	Pack rectangles into one bin with MaxRects best short side fit
+
+	Args:
+		sizes: List of (width, height)
+		bin_width, bin_height: Bin size
+		padding: Gap kept to the right of and below every rectangle
+
+	Returns:
+		(placements, leftover): dict index -> (x, y) of packed rectangles,
+		and the list of indices that did not fit
+	"""
+	free_rects = [(0, 0, bin_width + padding, bin_height + padding)]
+	placements = {}
+	leftover = []
+
+	# Big rectangles first
+	order = sorted(range(len(sizes)), key=lambda i: (-max(sizes[i]), -sizes[i][0] * sizes[i][1], i))
+
+	for i in order:
+		w, h = sizes[i][0] + padding, sizes[i][1] + padding
+
+		best = None
+		best_score = None
+		for free in free_rects:
+			if _fits(free, w, h):
+				short_side = min(free[2] - w, free[3] - h)
+				long_side = max(free[2] - w, free[3] - h)
+				score = (short_side, long_side, free[1], free[0])
+				if best_score is None or score < best_score:
+					best, best_score = (free[0], free[1]), score
+
+		if best is None:
+			leftover.append(i)
+			continue
+
+		placements[i] = best
+		free_rects = _split_free_rects(free_rects, (best[0], best[1], w, h))
+
+	return placements, sorted(leftover)
+
+
+def _candidate_widths(area, min_w, max_w, steps=24):
+	"""Bin widths to try, spread around the square root of the area"""
+	side = int(np.ceil(np.sqrt(area)))
+	low = max(min_w, side // 2)
+	high = min(max_w, side * 2)
+	if high <= low:
+		return [max(min_w, min(max_w, side))]
+	return sorted(set(np.linspace(low, high, steps).astype(int).tolist()))
+
+
+def pack_atlases(sizes, max_size=DEFAULT_MAX_ATLAS_SIZE, padding=DEFAULT_PADDING):
+	"""
+	Pack rectangles into as few, as small atlases as possible
+
+	Args:
+		sizes: List of (width, height)
+		max_size: Largest atlas side
+		padding: Gap between rectangles
+
+	Returns:
+		List of atlases: dicts with 'size' (width, height) cropped to the
+		used area (not a power of two) and 'placements' (index -> (x, y))
+	"""
+	for w, h in sizes:
+		if w > max_size or h > max_size:
+			raise ValueError(f"Frame {w}x{h} is larger than the max atlas size {max_size}")
+
+	remaining = list(range(len(sizes)))
+	atlases = []
+
+	while remaining:
+		subset = [sizes[i] for i in remaining]
+		area = sum((w + padding) * (h + padding) for w, h in subset)
+		min_w = max(w for w, _ in subset)
+		min_h = max(h for _, h in subset)
+
+		# Try several bin widths and keep the most square, then smallest,
+		# cropped atlas; if nothing fits everything, fill one max-size
+		# atlas and continue with the rest
+		best = None
+		for bin_w in _candidate_widths(area, min_w, max_size):
+			placements, leftover = maxrects_pack(subset, bin_w, max_size, padding)
+			if leftover:
+				continue
+			used_w = max(x + subset[i][0] for i, (x, _) in placements.items())
+			used_h = max(y + subset[i][1] for i, (_, y) in placements.items())
+			score = (max(used_w, used_h), used_w * used_h)
+			if best is None or score < best[0]:
+				best = (score, placements, leftover)
+
+		if best is None:
+			placements, leftover = maxrects_pack(subset, max_size, max_size, padding)
+		else:
+			_, placements, leftover = best
+
+		used_w = max(x + subset[i][0] for i, (x, _) in placements.items())
+		used_h = max(y + subset[i][1] for i, (_, y) in placements.items())
+
+		atlases.append({
+			'size': (used_w, used_h),
+			'placements': {remaining[i]: pos for i, pos in placements.items()},
+		})
+		remaining = [remaining[i] for i in leftover]
+
+	return atlases
+
+
+def find_project_root(path):
+	"""Closest parent directory holding project.godot, or None"""
+	path = os.path.abspath(path)
+	while True:
+		if os.path.exists(os.path.join(path, 'project.godot')):
+			return path
+		parent = os.path.dirname(path)
+		if parent == path:
+			return None
+		path = parent
+
+
+def res_path(path):
+	"""Godot res:// path for a file inside the project"""
+	root = find_project_root(os.path.dirname(os.path.abspath(path)))
+	if root is None:
+		return os.path.basename(path)
+	return 'res://' + os.path.relpath(os.path.abspath(path), root).replace(os.sep, '/')
+
+
+def animation_name(frame):
+	"""SpriteFrames animation name for a frame dict"""
+	if frame['animation'] is None:
+		return f"rotation_{frame['direction']}"
+	return f"{frame['animation']}_{frame['direction']}"
+
+
+def write_sprite_frames(tres_path, atlas_paths, regions, frames, fps=DEFAULT_FPS):
+	"""
+	Write a Godot 4 SpriteFrames resource using AtlasTextures
+
+	Args:
+		tres_path: Output .tres path
+		atlas_paths: Atlas PNG paths, indexed by atlas number
+		regions: Per frame (atlas index, x, y, width, height)
+		frames: Frame dicts (animation, direction, index); trimmed frames
+			also carry 'offset' and 'original_size'
+		fps: Animation speed
+	"""
+	lines = [f'[gd_resource type="SpriteFrames" load_steps={len(atlas_paths) + len(regions) + 1} format=3]', '']
+
+	for a, path in enumerate(atlas_paths):
+		lines.append(f'[ext_resource type="Texture2D" path="{res_path(path)}" id="{a + 1}_atlas"]')
+	lines.append('')
+
+	for i, (a, x, y, w, h) in enumerate(regions):
+		lines.append(f'[sub_resource type="AtlasTexture" id="AtlasTexture_{i}"]')
+		lines.append(f'atlas = ExtResource("{a + 1}_atlas")')
+		lines.append(f'region = Rect2({x}, {y}, {w}, {h})')
+		if 'offset' in frames[i]:
+			# Margin re-adds the trimmed transparent border around the region
+			ox, oy = frames[i]['offset']
+			ow, oh = frames[i]['original_size']
+			if (ox, oy, ow, oh) != (0, 0, w, h):
+				lines.append(f'margin = Rect2({ox}, {oy}, {ow - w}, {oh - h})')
+		lines.append('')
+
+	# Group frames into animations, keeping metadata order
+	animations = {}
+	for i, frame in enumerate(frames):
+		animations.setdefault(animation_name(frame), []).append((frame['index'], i))
+
+	entries = []
+	for name, members in animations.items():
+		frame_entries = ',\n'.join(
+			f'{{\n"duration": 1.0,\n"texture": SubResource("AtlasTexture_{i}")\n}}'
+			for _, i in sorted(members)
+		)
+		entries.append(
+			f'{{\n"frames": [{frame_entries}],\n"loop": true,\n'
+			f'"name": &"{name}",\n"speed": {float(fps)}\n}}'
+		)
+
+	lines.append('[resource]')
+	lines.append(f"animations = [{', '.join(entries)}]")
+	lines.append('')
+
+	with open(tres_path, 'w', encoding='utf-8', newline='\n') as f:
+		f.write('\n'.join(lines))
+
+
+def build_atlas(source, output_dir=None, name=None, max_size=DEFAULT_MAX_ATLAS_SIZE,
+				padding=DEFAULT_PADDING, fps=DEFAULT_FPS, trim=False, margin=0,
+				dedup=False, dedup_threshold=0):
+	"""
+	Pack a character's frames into atlases and write a SpriteFrames resource
+
+	Args:
+		source: Bundle zip or extracted character directory
+		output_dir: Output directory (default: next to the source)
+		name: Base name of the outputs (default: source name)
+		max_size: Largest atlas side
+		padding: Gap between frames
+		fps: Animation speed in the SpriteFrames resource
+		trim: Crop transparent padding from frames and write a trim sidecar
+		margin: Transparent pixels kept around each trimmed frame
+		dedup: Pack duplicate frames once and share their atlas region
+		dedup_threshold: Max per-channel difference for near duplicates
+
+	Returns:
+		Path of the .tres file
+	"""
+	base = source.rstrip('/\\')
+	if base.lower().endswith('.zip'):
+		base = base[:-4]
+	if name is None:
+		name = os.path.basename(base)
+	if output_dir is None:
+		output_dir = os.path.dirname(base) or '.'
+	os.makedirs(output_dir, exist_ok=True)
+
+	print(f"Loading: {source}")
+	metadata, frames = load_character(source)
+	if trim:
+		with stage('trim', frame_pixels(frames)):
+			before, after = trim_frames(frames, margin)
+		print(f"Trimmed: {before:,} -> {after:,} pixels "
+			  f"({(1 - after / max(before, 1)) * 100:.1f}% smaller)")
+	sizes = [(f['image'].shape[1], f['image'].shape[0]) for f in frames]
+	print(f"Frames: {len(frames)}")
+
+	# AtlasTextures cannot mirror, so only same-orientation duplicates share a region
+	aliases = [None] * len(frames)
+	if dedup:
+		with stage('dedup', frame_pixels(frames)):
+			aliases = find_duplicates(frames, dedup_threshold, flips=False)
+		report = dedup_report(frames, aliases)
+		print_report(name, report)
+
+	packed = [i for i in range(len(frames)) if aliases[i] is None]
+	with stage('pack', frame_pixels([frames[i] for i in packed])):
+		atlases = pack_atlases([sizes[i] for i in packed], max_size, padding)
+	for atlas in atlases:
+		atlas['placements'] = {packed[j]: pos for j, pos in atlas['placements'].items()}
+
+	atlas_paths = []
+	regions = [None] * len(frames)
+	for a, atlas in enumerate(atlases):
+		width, height = atlas['size']
+		suffix = '' if len(atlases) == 1 else f"_{a}"
+		atlas_path = os.path.join(output_dir, f"{name}_atlas{suffix}.png")
+
+		with stage('save', width * height):
+			canvas = np.zeros((height, width, 4), dtype=np.uint8)
+			for i, (x, y) in atlas['placements'].items():
+				w, h = sizes[i]
+				canvas[y:y + h, x:x + w] = frames[i]['image']
+				regions[i] = (a, x, y, w, h)
+			size, mode = save_png(canvas, atlas_path)
+		atlas_paths.append(atlas_path)
+
+		frame_area = sum(sizes[i][0] * sizes[i][1] for i in atlas['placements'])
+		print(f"  Atlas {a}: {width}x{height}, {len(atlas['placements'])} frames, "
+			  f"{frame_area / (width * height) * 100:.1f}% used, {size / 1024:.1f} KB {mode} -> {atlas_path}")
+
+	# Duplicates point at their source frame's region
+	for i, alias in enumerate(aliases):
+		if alias is not None:
+			regions[i] = regions[alias['source']]
+
+	tres_path = os.path.join(output_dir, f"{name}_frames.tres")
+	write_sprite_frames(tres_path, atlas_paths, regions, frames, fps)
+	print(f"✓ SpriteFrames: {tres_path}")
+
+	if dedup:
+		aliases_path = os.path.join(output_dir, f"{name}_aliases.json")
+		write_aliases(aliases_path, frames, aliases, report)
+		print(f"✓ Aliases: {aliases_path}")
+
+	if trim:
+		sidecar_path = os.path.join(output_dir, f"{name}_trim.json")
+		write_sidecar(sidecar_path, frames, margin, [
+			{'atlas': res_path(atlas_paths[a]), 'region': [x, y, w, h]}
+			for a, x, y, w, h in regions
+		])
+		print(f"✓ Trim sidecar: {sidecar_path}")
+
+	return tres_path
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Texture Atlas Packer")
+		print("="*60)
+		print("\nUsage:")
+		print("  python atlas_packer.py <bundle.zip|character_dir> [options]")
+		print()
+		print("Options:")
+		print("  -o <dir>          Output directory (default: next to the source)")
+		print("  -n <name>         Output base name (default: character folder name)")
+		print(f"  --max-size <px>   Largest atlas side (default: {DEFAULT_MAX_ATLAS_SIZE})")
+		print(f"  --padding <px>    Gap between frames (default: {DEFAULT_PADDING})")
+		print(f"  --fps <value>     Animation speed (default: {DEFAULT_FPS})")
+		print("  --trim            Crop transparent padding (AtlasTexture margins keep placement)")
+		print("  --margin <px>     Transparent pixels kept around trimmed frames (default: 0)")
+		print("  --dedup           Pack duplicate frames once, sharing one region")
+		print("  --threshold <v>   Max per-channel difference for near duplicates (default: 0)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python atlas_packer.py assets/sprites/player/penitent_knight")
+		print("  python atlas_packer.py assets/sprites/enemies/ghoul.zip -o assets/atlases")
+		print("  python atlas_packer.py assets/sprites/bosses/blood_wraith.zip --trim --margin 1")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	source = args[0]
+	output_dir = None
+	name = None
+	max_size = DEFAULT_MAX_ATLAS_SIZE
+	padding = DEFAULT_PADDING
+	fps = DEFAULT_FPS
+	margin = 0
+	threshold = 0
+
+	if '-o' in args:
+		output_dir = args[args.index('-o') + 1]
+	if '-n' in args:
+		name = args[args.index('-n') + 1]
+	if '--max-size' in args:
+		max_size = int(args[args.index('--max-size') + 1])
+	if '--padding' in args:
+		padding = int(args[args.index('--padding') + 1])
+	if '--fps' in args:
+		fps = float(args[args.index('--fps') + 1])
+	if '--margin' in args:
+		margin = int(args[args.index('--margin') + 1])
+	if '--threshold' in args:
+		threshold = int(args[args.index('--threshold') + 1])
+
+	with profile_run(args):
+		build_atlas(source, output_dir, name, max_size, padding, fps,
+					trim='--trim' in args, margin=margin,
+					dedup='--dedup' in args, dedup_threshold=threshold)
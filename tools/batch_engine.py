@@ -0,0 +1,199 @@
+"""
+Parallel Batch Engine
+Runs a per-image tool function over many files on a process pool
+
+- Configurable worker count (default: all cores)
+- Bounded in-flight memory: new files are only submitted while the
+  estimated decoded size of the files in flight fits the budget
+- Deterministic output: each file's console log is captured in the
+  worker and printed in input order, followed by an ordered summary
+- Per-file error isolation: a failing file is reported, the rest continue
+- Throughput report in images/s and megapixels/s
+"""
+
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import contextlib
+import io
+import os
+import time
+import traceback
+
+from stage_profile import add_records, stage, take_records
+
+
+# Budget for the estimated memory of all images being processed at once (MB)
+DEFAULT_MAX_IN_FLIGHT_MB = 2048
+
+# Rough peak bytes per pixel while one image is processed
+# (decoded RGBA, working copy, alpha channel, output image)
+IN_FLIGHT_BYTES_PER_PIXEL = 16
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def list_images(input_dir, extensions=IMAGE_EXTENSIONS):
+	"""Sorted list of image file names in a directory"""
+	return sorted(
+		filename for filename in os.listdir(input_dir)
+		if filename.lower().endswith(extensions)
+	)
+
+
+def default_workers():
+	"""Number of worker processes to use when none is given"""
+	return os.cpu_count() or 1
+
+
+def image_pixels(path):
+	"""Pixel count from the image header (no full decode), 0 if unreadable"""
+	try:
+		with Image.open(path) as img:
+			width, height = img.size
+		return width * height
+	except Exception:
+		return 0
+
+
+def _run_job(func, input_path, args, kwargs):
+	"""
+	Worker entry point: run one job with its console output captured
+
+	Returns:
+		Result dict (never raises)
+	"""
+	log = io.StringIO()
+	start = time.perf_counter()
+	result = {'input': input_path, 'output': None, 'ok': False, 'error': None}
+
+	with contextlib.redirect_stdout(log):
+		try:
+			with stage('file', image_pixels(input_path)) as info:
+				info['input'] = input_path
+				result['output'] = func(input_path, *args, **kwargs)
+			result['ok'] = True
+		except Exception as e:
+			result['error'] = f"{type(e).__name__}: {e}"
+			traceback.print_exc(file=log)
+
+	result['seconds'] = time.perf_counter() - start
+	result['log'] = log.getvalue()
+	# Stage records travel back with the result (workers are other processes)
+	result['stages'] = take_records()
+	return result
+
+
+def _print_result(result, index, total):
+	"""Print one file's captured log and status line"""
+	name = os.path.basename(result['input'])
+
+	print(f"\n{'='*60}")
+	print(f"[{index + 1}/{total}] {name}")
+	print('='*60)
+	if result['log']:
+		print(result['log'], end='')
+
+	if result['ok']:
+		print(f"✓ {name} ({result['seconds']:.2f}s)")
+	else:
+		print(f"✗ Error processing {name}: {result['error']}")
+
+
+def run_batch(func, jobs, workers=None, max_in_flight_mb=DEFAULT_MAX_IN_FLIGHT_MB):
+	"""
+	Run func(input_path, *args, **kwargs) for every job on a process pool
+
+	Args:
+		func: Module-level tool function (must be picklable)
+		jobs: List of (input_path, args, kwargs) tuples
+		workers: Number of worker processes (default: all cores, 1 = in-process)
+		max_in_flight_mb: Memory budget for images being processed at once (MB)
+
+	Returns:
+		List of result dicts in job order, with keys
+		input, output, ok, error, seconds, log, pixels, stages
+	"""
+	workers = workers or default_workers()
+	total = len(jobs)
+	budget = max_in_flight_mb * 1024 * 1024
+
+	pixels = [image_pixels(job[0]) for job in jobs]
+	results = [None] * total
+	next_to_print = 0
+
+	start = time.perf_counter()
+
+	def flush():
+		# Print finished results in job order
+		nonlocal next_to_print
+		while next_to_print < total and results[next_to_print] is not None:
+			_print_result(results[next_to_print], next_to_print, total)
+			next_to_print += 1
+
+	if workers == 1:
+		for i, (input_path, args, kwargs) in enumerate(jobs):
+			results[i] = _run_job(func, input_path, args, kwargs)
+			results[i]['pixels'] = pixels[i]
+			add_records(results[i]['stages'])
+			flush()
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			pending = {}
+			in_flight = 0
+			next_job = 0
+
+			while next_job < total or pending:
+				# Submit while there is a free worker slot and memory budget;
+				# always allow one job so oversized images still run
+				while next_job < total and len(pending) < workers * 2:
+					cost = pixels[next_job] * IN_FLIGHT_BYTES_PER_PIXEL
+					if pending and in_flight + cost > budget:
+						break
+
+					input_path, args, kwargs = jobs[next_job]
+					future = pool.submit(_run_job, func, input_path, args, kwargs)
+					pending[future] = (next_job, cost)
+					in_flight += cost
+					next_job += 1
+
+				done, _ = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					i, cost = pending.pop(future)
+					in_flight -= cost
+
+					try:
+						results[i] = future.result()
+					except Exception as e:
+						# Worker process died (e.g. killed by the OOM killer)
+						results[i] = {'input': jobs[i][0], 'output': None, 'ok': False,
+									  'error': f"{type(e).__name__}: {e}", 'seconds': 0.0, 'log': ''}
+					results[i]['pixels'] = pixels[i]
+					add_records(results[i].get('stages', []))
+
+				flush()
+
+	elapsed = time.perf_counter() - start
+	print_summary(results, elapsed, workers)
+
+	return results
+
+
+def print_summary(results, elapsed, workers):
+	"""Print the ordered batch summary and throughput report"""
+	succeeded = [r for r in results if r['ok']]
+	failed = [r for r in results if not r['ok']]
+	megapixels = sum(r['pixels'] for r in succeeded) / 1e6
+
+	print(f"\n{'='*60}")
+	print(f"✓ Batch complete: Processed {len(succeeded)}/{len(results)} images "
+		  f"with {workers} worker{'s' if workers != 1 else ''}")
+
+	if failed:
+		print(f"✗ {len(failed)} failed:")
+		for r in failed:
+			print(f"  {os.path.basename(r['input'])}: {r['error']}")
+
+	if elapsed > 0:
+		print(f"Throughput: {len(succeeded) / elapsed:.2f} images/s, "
+			  f"{megapixels / elapsed:.2f} MP/s ({megapixels:.1f} MP in {elapsed:.2f}s)")
+	print('='*60)
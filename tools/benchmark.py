@@ -0,0 +1,385 @@
+"""
+Sprite Tool Benchmarks
+Measures how the hot sprite-tool functions scale with image size
+
+Synthetic sprite sheets are generated for every size and scenario
+(background colors, noise level, grid shape). Each function runs in a
+fresh process so its peak RSS is its own. Wall time, megapixels/s and
+peak RSS are written to JSON. --compare checks a result file against a
+saved baseline and lists the regressions.
+
+Usage:
+    python benchmark.py [options]
+    python benchmark.py --compare <baseline.json> <results.json> [--threshold <pct>]
+"""
+
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import json
+import multiprocessing
+import numpy as np
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None
+
+from complete_sprite_pipeline import remove_background
+from fix_sprite_alignment import fix_sprite_alignment
+from fix_sprite_grid import fix_grid_dimensions
+from fix_transparency import make_transparent
+from fix_transparency_v2 import remove_background_advanced
+
+
+# Square sheet sizes in pixels
+DEFAULT_SIZES = (256, 512, 1024, 2048, 4096, 8192)
+
+# Synthetic sheets: background colors (two colors form a fake
+# transparency checkerboard), noise amplitude and grid (cols, rows)
+SCENARIOS = {
+	'solid': {'background': [(255, 0, 255)], 'noise': 0, 'grid': (4, 4)},
+	'noisy': {'background': [(0, 177, 64)], 'noise': 12, 'grid': (6, 4)},
+	'light': {'background': [(238, 238, 242)], 'noise': 3, 'grid': (8, 8)},
+	'checker': {'background': [(255, 255, 255), (204, 204, 204)], 'noise': 2, 'grid': (6, 5)},
+}
+
+# Checkerboard square size in pixels
+CHECKER_SIZE = 16
+
+# Frame size fix_grid_dimensions resizes to
+GRID_FRAME_SIZE = 128
+
+# Rows generated per step (bounds memory for 8192² sheets)
+GENERATE_BAND_ROWS = 512
+
+# Time differences below this are noise, never regressions (seconds)
+MIN_REGRESSION_SECONDS = 0.005
+
+DEFAULT_THRESHOLD_PCT = 10.0
+
+
+def make_sheet(size, background, noise=0, grid=(4, 4), seed=0):
+	"""
+	Synthetic sprite sheet: one two-tone ellipse sprite per cell on a background
+
+	Args:
+		size: Width and height in pixels
+		background: List of RGB colors (two or more form a checkerboard)
+		noise: Amplitude of uniform per-channel noise (0 = none)
+		grid: (cols, rows)
+		seed: Random seed for sprite placement, colors and noise
+
+	Returns:
+		(size, size, 4) uint8 array, fully opaque
+	"""
+	cols, rows = grid
+	rng = np.random.default_rng(seed)
+	cell_w, cell_h = size / cols, size / rows
+
+	# Per cell: center jitter, radii and two sprite colors
+	center_x = (np.arange(cols) + 0.5 + rng.uniform(-0.1, 0.1, (rows, cols))) * cell_w
+	center_y = (np.arange(rows)[:, None] + 0.5 + rng.uniform(-0.1, 0.1, (rows, cols))) * cell_h
+	radius_x = rng.uniform(0.2, 0.35, (rows, cols)) * cell_w
+	radius_y = rng.uniform(0.3, 0.42, (rows, cols)) * cell_h
+	body = rng.integers(20, 140, (rows, cols, 3))
+	trim = rng.integers(120, 220, (rows, cols, 3))
+
+	background = np.array(background, dtype=np.int16)
+	sheet = np.empty((size, size, 4), dtype=np.uint8)
+	sheet[:, :, 3] = 255
+	xs = np.arange(size)
+	col = np.minimum((xs / cell_w).astype(int), cols - 1)
+
+	for y0 in range(0, size, GENERATE_BAND_ROWS):
+		ys = np.arange(y0, min(y0 + GENERATE_BAND_ROWS, size))[:, None]
+		row = np.minimum((ys / cell_h).astype(int), rows - 1)
+
+		checker = (ys // CHECKER_SIZE + xs // CHECKER_SIZE) % len(background)
+		rgb = background[checker]
+
+		dist = (((xs - center_x[row, col]) / radius_x[row, col]) ** 2 +
+				((ys - center_y[row, col]) / radius_y[row, col]) ** 2)
+		rgb = np.where((dist <= 1)[..., None], body[row, col], rgb)
+		rgb = np.where((dist <= 0.3)[..., None], trim[row, col], rgb)
+
+		if noise:
+			rgb = rgb + rng.integers(-noise, noise + 1, rgb.shape, dtype=np.int16)
+		sheet[y0:y0 + len(ys), :, :3] = np.clip(rgb, 0, 255)
+
+	return sheet
+
+
+def _setup_remove_background(path, output_path, grid):
+	with Image.open(path) as img:
+		data = np.array(img.convert('RGBA'))
+	return lambda: remove_background(data)
+
+
+def _setup_remove_background_advanced(path, output_path, grid):
+	return lambda: remove_background_advanced(path, output_path, use_cache=False)
+
+
+def _setup_make_transparent(path, output_path, grid):
+	return lambda: make_transparent(path, output_path)
+
+
+def _setup_fix_sprite_alignment(path, output_path, grid):
+	cols, rows = grid
+	return lambda: fix_sprite_alignment(path, cols, rows, output_path, use_cache=False)
+
+
+def _setup_fix_grid_dimensions(path, output_path, grid):
+	cols, rows = grid
+	return lambda: fix_grid_dimensions(path, cols, rows, GRID_FRAME_SIZE, output_path)
+
+
+# Benchmarked functions: setup(path, output_path, grid) returns the call
+# to time (decoding an array input is setup, not measured)
+BENCHMARKS = {
+	'remove_background': _setup_remove_background,
+	'remove_background_advanced': _setup_remove_background_advanced,
+	'make_transparent': _setup_make_transparent,
+	'fix_sprite_alignment': _setup_fix_sprite_alignment,
+	'fix_grid_dimensions': _setup_fix_grid_dimensions,
+}
+
+
+def peak_rss_mb():
+	"""Peak resident memory of this process so far (MB), None where unsupported"""
+	# Linux: ru_maxrss survives exec and would report the parent's peak
+	try:
+		with open('/proc/self/status', encoding='ascii') as f:
+			for line in f:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Bytes on macOS, kilobytes elsewhere
+	return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(function, path, output_path, grid, repeat):
+	"""
+	Worker entry point: time one function on one sheet
+
+	Returns:
+		Dict with seconds (best of repeat), setup_rss_mb and peak_rss_mb
+	"""
+	with contextlib.redirect_stdout(io.StringIO()):
+		call = BENCHMARKS[function](path, output_path, grid)
+		setup_rss = peak_rss_mb()
+		times = []
+		for _ in range(repeat):
+			start = time.perf_counter()
+			call()
+			times.append(time.perf_counter() - start)
+
+	return {'seconds': min(times), 'setup_rss_mb': setup_rss, 'peak_rss_mb': peak_rss_mb()}
+
+
+def environment():
+	"""Machine and library versions recorded with the results"""
+	return {
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'pillow': Image.__version__,
+		'platform': platform.platform(),
+		'processor': platform.processor() or platform.machine(),
+		'cpu_count': os.cpu_count(),
+	}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, functions=None, scenarios=None, repeat=3):
+	"""
+	Benchmark every function on every scenario and size
+
+	Args:
+		sizes: Square sheet sizes in pixels
+		functions: Names from BENCHMARKS (default: all)
+		scenarios: Names from SCENARIOS (default: all)
+		repeat: Runs per case; the fastest counts
+
+	Returns:
+		Dict with environment and a list of results
+	"""
+	functions = list(functions or BENCHMARKS)
+	scenarios = list(scenarios or SCENARIOS)
+	for name in functions:
+		if name not in BENCHMARKS:
+			raise ValueError(f"Unknown function: {name!r} (expected one of {tuple(BENCHMARKS)})")
+	for name in scenarios:
+		if name not in SCENARIOS:
+			raise ValueError(f"Unknown scenario: {name!r} (expected one of {tuple(SCENARIOS)})")
+
+	results = []
+	work_dir = tempfile.mkdtemp(prefix='sprite_bench_')
+	# A fresh spawned process per case, so peak RSS is not carried over
+	context = multiprocessing.get_context('spawn')
+
+	try:
+		for scenario in scenarios:
+			settings = SCENARIOS[scenario]
+			for size in sizes:
+				path = os.path.join(work_dir, f"{scenario}_{size}.png")
+				Image.fromarray(make_sheet(size, **settings), 'RGBA').save(path, 'PNG', compress_level=1)
+
+				for function in functions:
+					output_path = os.path.join(work_dir, f"{scenario}_{size}_{function}.png")
+					with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+						measured = pool.submit(_run_case, function, path, output_path,
+											   settings['grid'], repeat).result()
+
+					megapixels = size * size / 1e6
+					result = {
+						'function': function, 'scenario': scenario, 'size': size,
+						'grid': list(settings['grid']), 'megapixels': megapixels,
+						'megapixels_per_s': megapixels / measured['seconds'],
+						**measured,
+					}
+					results.append(result)
+
+					rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else "n/a"
+					print(f"{function:28s} {scenario:8s} {size:5d}²  {result['seconds']:8.3f}s  "
+						  f"{result['megapixels_per_s']:7.1f} MP/s  peak {rss}")
+					if os.path.exists(output_path):
+						os.remove(output_path)
+				os.remove(path)
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	return {'environment': environment(), 'repeat': repeat, 'results': results}
+
+
+def case_key(result):
+	"""Key matching a result to the same case in another run"""
+	return result['function'], result['scenario'], result['size']
+
+
+def compare_results(baseline, current, threshold_pct=DEFAULT_THRESHOLD_PCT):
+	"""
+	Find cases that got slower or use more memory than the baseline
+
+	Args:
+		baseline, current: Parsed result files from run_benchmarks
+		threshold_pct: Allowed growth in time and peak RSS (percent)
+
+	Returns:
+		List of (result, metric, baseline value, current value) regressions
+	"""
+	limit = 1 + threshold_pct / 100
+	previous = {case_key(r): r for r in baseline['results']}
+	regressions = []
+
+	for result in current['results']:
+		before = previous.get(case_key(result))
+		if before is None:
+			continue
+
+		if (result['seconds'] > before['seconds'] * limit and
+				result['seconds'] - before['seconds'] >= MIN_REGRESSION_SECONDS):
+			regressions.append((result, 'seconds', before['seconds'], result['seconds']))
+
+		if (result['peak_rss_mb'] is not None and before['peak_rss_mb'] is not None and
+				result['peak_rss_mb'] > before['peak_rss_mb'] * limit):
+			regressions.append((result, 'peak_rss_mb', before['peak_rss_mb'], result['peak_rss_mb']))
+
+	return regressions
+
+
+def print_comparison(baseline, current, regressions):
+	"""Print per-case speedups and the list of regressions"""
+	previous = {case_key(r): r for r in baseline['results']}
+
+	print("="*60)
+	print("BENCHMARK COMPARISON")
+	print("="*60)
+	for result in current['results']:
+		before = previous.get(case_key(result))
+		if before is None:
+			continue
+		function, scenario, size = case_key(result)
+		print(f"{function:28s} {scenario:8s} {size:5d}²  {before['seconds']:8.3f}s -> "
+			  f"{result['seconds']:8.3f}s  ({before['seconds'] / result['seconds']:.2f}x)")
+
+	print()
+	if not regressions:
+		print("✓ No regressions")
+		return
+
+	print(f"✗ {len(regressions)} regression{'s' if len(regressions) != 1 else ''}:")
+	for result, metric, before, after in regressions:
+		function, scenario, size = case_key(result)
+		print(f"  {function} {scenario} {size}²: {metric} {before:.3f} -> {after:.3f} "
+			  f"(+{(after / before - 1) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+
+	if '-h' in args or '--help' in args:
+		print("Sprite Tool Benchmarks")
+		print("="*60)
+		print("\nUsage:")
+		print("  python benchmark.py [options]")
+		print("  python benchmark.py --compare <baseline.json> <results.json> [--threshold <pct>]")
+		print()
+		print("Options:")
+		print("  -o <path>              Results file (default: benchmark_results.json)")
+		print(f"  --sizes <n,...>        Sheet sizes (default: {','.join(map(str, DEFAULT_SIZES))})")
+		print(f"  --functions <a,...>    {', '.join(BENCHMARKS)}")
+		print(f"  --scenarios <a,...>    {', '.join(SCENARIOS)}")
+		print("  --repeat <n>           Runs per case, fastest counts (default: 3)")
+		print(f"  --threshold <pct>      Allowed slowdown before a regression (default: {DEFAULT_THRESHOLD_PCT:g})")
+		print()
+		print("Examples:")
+		print("  python benchmark.py --sizes 256,1024,4096 -o baseline.json")
+		print("  python benchmark.py --compare baseline.json benchmark_results.json")
+		sys.exit(1)
+
+	if '--compare' in args:
+		i = args.index('--compare')
+		with open(args[i + 1], encoding='utf-8') as f:
+			baseline = json.load(f)
+		with open(args[i + 2], encoding='utf-8') as f:
+			current = json.load(f)
+		threshold = DEFAULT_THRESHOLD_PCT
+		if '--threshold' in args:
+			threshold = float(args[args.index('--threshold') + 1])
+
+		regressions = compare_results(baseline, current, threshold)
+		print_comparison(baseline, current, regressions)
+		sys.exit(1 if regressions else 0)
+
+	output_path = 'benchmark_results.json'
+	sizes = DEFAULT_SIZES
+	functions = None
+	scenarios = None
+	repeat = 3
+
+	if '-o' in args:
+		output_path = args[args.index('-o') + 1]
+	if '--sizes' in args:
+		sizes = [int(s) for s in args[args.index('--sizes') + 1].split(',')]
+	if '--functions' in args:
+		functions = args[args.index('--functions') + 1].split(',')
+	if '--scenarios' in args:
+		scenarios = args[args.index('--scenarios') + 1].split(',')
+	if '--repeat' in args:
+		repeat = int(args[args.index('--repeat') + 1])
+
+	report = run_benchmarks(sizes, functions, scenarios, repeat)
+	with open(output_path, 'w', encoding='utf-8') as f:
+		json.dump(report, f, indent=2)
+	print(f"\n✓ {len(report['results'])} results saved: {output_path}")
@@ -0,0 +1,292 @@
+"""
+Background Alpha Engine
+Shared alpha computation for the background removal tools
+
+Works through the image in row bands so the float64 working arrays
+never exceed a fixed memory budget, no matter how large the sheet is.
+Pixel art sheets only hold a few hundred distinct colors, so alpha is
+computed once per unique color and gathered back to the pixels, falling
+back to the per-pixel path when the image has too many colors.
+The result is pixel-identical to computing every pixel at once.
+"""
+
+import numpy as np
+
+
+# Working memory budget for the distance/alpha arrays (MB)
+DEFAULT_MAX_MEMORY_MB = 64
+
+# Approximate float64 scratch bytes per pixel while one background color
+# is processed (r/g/b casts, squared terms, sum, sqrt, scaled alpha)
+WORKING_BYTES_PER_PIXEL = 64
+
+# Above this many distinct colors the per-pixel path is used instead
+MAX_UNIQUE_COLORS = 65536
+
+# From this many pixels on, unique colors are tracked in a 24-bit lookup
+# table (fixed 32 MB) instead of sorting the packed pixels with np.unique
+LUT_MIN_PIXELS = 1 << 20
+
+
+def band_rows(width, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Number of image rows that fit in the working memory budget
+
+	Args:
+		width: Image width in pixels
+		max_memory_mb: Memory budget in MB (None = unlimited)
+
+	Returns:
+		Rows per band (at least 1), or None when unlimited
+	"""
+	if max_memory_mb is None:
+		return None
+
+	budget = int(max_memory_mb * 1024 * 1024)
+	return max(1, budget // (max(1, width) * WORKING_BYTES_PER_PIXEL))
+
+
+def iter_bands(height, width, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""Yield row slices covering the image within the memory budget"""
+	rows = band_rows(width, max_memory_mb)
+	if rows is None:
+		rows = max(1, height)
+
+	for y in range(0, height, rows):
+		yield slice(y, min(y + rows, height))
+
+
+def color_distance(rgb, bg_color):
+	"""
+	Euclidean RGB distance of every pixel from a background color
+
+	Args:
+		rgb: numpy array (..., 3+) of pixels
+		bg_color: RGB background color
+
+	Returns:
+		float64 array of distances
+	"""
+	r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+	return np.sqrt(
+		(r.astype(float) - bg_color[0]) ** 2 +
+		(g.astype(float) - bg_color[1]) ** 2 +
+		(b.astype(float) - bg_color[2]) ** 2
+	)
+
+
+def alpha_from_distance(diff, tolerance, smooth_edges=True):
+	"""
+	Convert background distance into alpha values
+
+	Args:
+		diff: Distance array from color_distance
+		tolerance: Color similarity threshold
+		smooth_edges: Gradual alpha ramp instead of a binary mask
+
+	Returns:
+		uint8 alpha array
+	"""
+	if smooth_edges:
+		# Pixels closer to the background get lower alpha
+		return np.clip(255 * (diff / tolerance), 0, 255).astype(np.uint8)
+
+	# Binary mask - either fully transparent or fully opaque
+	return np.where(diff <= tolerance, 0, 255).astype(np.uint8)
+
+
+def dense_alpha(rgb, bg_colors, tolerance, smooth_edges=True):
+	"""
+	Alpha for every pixel against all background colors (per-pixel path)
+
+	Args:
+		rgb: numpy array (..., 3+) of pixels
+		bg_colors: List of RGB background colors
+		tolerance: Color similarity threshold
+		smooth_edges: Gradual alpha ramp instead of a binary mask
+
+	Returns:
+		uint8 alpha array with the shape of rgb[..., 0]
+	"""
+	alpha = np.full(rgb.shape[:-1], 255, dtype=np.uint8)
+
+	for bg_color in bg_colors:
+		diff = color_distance(rgb, bg_color)
+		np.minimum(alpha, alpha_from_distance(diff, tolerance, smooth_edges), out=alpha)
+
+	return alpha
+
+
+def pack_rgb(rgb):
+	"""Pack the RGB channels of every pixel into a 24-bit integer key"""
+	return (
+		(rgb[..., 0].astype(np.uint32) << 16) |
+		(rgb[..., 1].astype(np.uint32) << 8) |
+		rgb[..., 2].astype(np.uint32)
+	)
+
+
+def unpack_rgb(keys):
+	"""Inverse of pack_rgb: (N,) integer keys -> (N, 3) uint8 colors"""
+	keys = np.asarray(keys, dtype=np.uint32)
+	return np.stack([keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF], axis=-1).astype(np.uint8)
+
+
+def unique_color_alpha(img_array, bg_colors, tolerance, smooth_edges=True,
+					   max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+					   max_unique_colors=MAX_UNIQUE_COLORS, out=None):
+	"""
+	Compute alpha once per unique color and gather it back to the pixels
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		bg_colors: List of RGB background colors
+		tolerance: Color similarity threshold
+		smooth_edges: Gradual alpha ramp instead of a binary mask
+		max_memory_mb: Working memory budget in MB (None = whole image at once)
+		max_unique_colors: Give up above this many distinct colors
+		out: Optional uint8 (height, width) array to write into
+
+	Returns:
+		uint8 alpha array (height, width), or None if the image has more
+		than max_unique_colors colors
+	"""
+	height, width = img_array.shape[:2]
+
+	if height * width < LUT_MIN_PIXELS:
+		# Small image: unique colors and their inverse indices in one sort
+		colors, inverse = np.unique(pack_rgb(img_array).ravel(), return_inverse=True)
+		if len(colors) > max_unique_colors:
+			return None
+
+		color_alpha = dense_alpha(unpack_rgb(colors), bg_colors, tolerance, smooth_edges)
+
+		if out is None:
+			out = np.empty((height, width), dtype=np.uint8)
+		out[...] = color_alpha[inverse].reshape(height, width)
+		return out
+
+	# Large image: mark every color present, band by band
+	bands = list(iter_bands(height, width, max_memory_mb))
+	seen = np.zeros(1 << 24, dtype=bool)
+	for band in bands:
+		seen[pack_rgb(img_array[band])] = True
+
+	colors = np.flatnonzero(seen)
+	del seen
+	if len(colors) > max_unique_colors:
+		return None
+
+	# Alpha per unique color, scattered into a lookup table
+	lut = np.zeros(1 << 24, dtype=np.uint8)
+	lut[colors] = dense_alpha(unpack_rgb(colors), bg_colors, tolerance, smooth_edges)
+
+	if out is None:
+		out = np.empty((height, width), dtype=np.uint8)
+	for band in bands:
+		out[band] = lut[pack_rgb(img_array[band])]
+
+	return out
+
+
+def color_histogram(img_array, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Distinct RGB colors of an image and how many pixels have each
+
+	Colors are counted per band and merged, so memory follows the band
+	size and the number of colors present.
+
+	Returns:
+		(colors, counts): sorted packed 24-bit colors and int64 pixel counts
+	"""
+	height, width = img_array.shape[:2]
+	colors = np.empty(0, dtype=np.uint32)
+	counts = np.empty(0, dtype=np.int64)
+
+	for band in iter_bands(height, width, max_memory_mb):
+		band_colors, band_counts = np.unique(pack_rgb(img_array[band]), return_counts=True)
+		colors, inverse = np.unique(np.concatenate((colors, band_colors)), return_inverse=True)
+		merged = np.zeros(len(colors), dtype=np.int64)
+		np.add.at(merged, inverse, np.concatenate((counts, band_counts)))
+		counts = merged
+
+	return colors, counts
+
+
+def unique_color_distances(img_array, bg_colors, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Distance of every distinct color to its nearest background color
+
+	Alpha only grows with distance, so alpha_from_distance(distances, t)
+	gathered back to the pixels equals compute_alpha(..., t) for every
+	tolerance t. The distances are computed once and reused per tolerance.
+
+	Returns:
+		(colors, counts, distances): packed colors (sorted, see
+		color_histogram), pixel counts and float64 distances
+	"""
+	colors, counts = color_histogram(img_array, max_memory_mb)
+	rgb = unpack_rgb(colors)
+
+	distances = np.full(len(colors), np.inf)
+	for bg_color in bg_colors:
+		np.minimum(distances, color_distance(rgb, bg_color), out=distances)
+
+	return colors, counts, distances
+
+
+def compute_alpha(img_array, bg_colors, tolerance, smooth_edges=True,
+				  max_memory_mb=DEFAULT_MAX_MEMORY_MB, out=None,
+				  unique_colors=True, max_unique_colors=MAX_UNIQUE_COLORS):
+	"""
+	Compute the background-removal alpha channel
+
+	Uses the unique-color path when the image has at most
+	max_unique_colors colors, otherwise the per-pixel path band by band.
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		bg_colors: List of RGB background colors
+		tolerance: Color similarity threshold
+		smooth_edges: Gradual alpha ramp instead of a binary mask
+		max_memory_mb: Working memory budget in MB (None = whole image at once)
+		out: Optional uint8 (height, width) array to write into,
+			 e.g. img_array[:, :, 3] to update the image in place
+		unique_colors: Try the unique-color path first
+		max_unique_colors: Color count above which the per-pixel path is used
+
+	Returns:
+		uint8 alpha array (height, width)
+	"""
+	height, width = img_array.shape[:2]
+
+	if out is None:
+		out = np.empty((height, width), dtype=np.uint8)
+
+	if unique_colors:
+		if unique_color_alpha(img_array, bg_colors, tolerance, smooth_edges,
+							  max_memory_mb, max_unique_colors, out) is not None:
+			return out
+
+	for band in iter_bands(height, width, max_memory_mb):
+		out[band] = dense_alpha(img_array[band], bg_colors, tolerance, smooth_edges)
+
+	return out
+
+
+def alpha_stats(alpha, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Count transparent, semi-transparent and opaque pixels band by band
+
+	Returns:
+		(transparent, semi, opaque) pixel counts
+	"""
+	height, width = alpha.shape[:2]
+	transparent = opaque = 0
+
+	for band in iter_bands(height, width, max_memory_mb):
+		transparent += int(np.count_nonzero(alpha[band] == 0))
+		opaque += int(np.count_nonzero(alpha[band] == 255))
+
+	return transparent, height * width - transparent - opaque, opaque
@@ -0,0 +1,162 @@
+"""
+Background Color Detector
+Shared background color detection for all sprite tools
+
+Packs the RGB of the sampled border pixels into 24-bit integers and
+builds a vectorized histogram, so whole edges of wide sheets are
+counted in a single numpy call instead of Python tuples in a Counter.
+"""
+
+import numpy as np
+
+from bg_alpha import pack_rgb, unpack_rgb
+
+
+# Sampling strategies understood by sample_border
+STRATEGIES = ('edges', 'corners', 'strided', 'full')
+
+# Side of the square blocks sampled by the 'corners' strategy
+DEFAULT_CORNER_SIZE = 10
+
+# Number of samples per edge for the 'strided' strategy
+DEFAULT_STRIDE_SAMPLES = 10
+
+
+def sample_border(img_array, strategy='edges', border=1, corner_size=DEFAULT_CORNER_SIZE,
+				  stride_samples=DEFAULT_STRIDE_SAMPLES):
+	"""
+	Collect packed RGB keys from the image border
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		strategy: 'edges' (every border pixel), 'corners' (corner blocks),
+				  'strided' (evenly spaced edge pixels), 'full' (whole image),
+				  or a tuple of these to combine them
+		border: Thickness of the 'edges' band in pixels
+		corner_size: Side of each 'corners' block in pixels
+		stride_samples: Samples per edge for 'strided'
+
+	Returns:
+		1D uint32 array of packed RGB keys
+	"""
+	if not isinstance(strategy, str):
+		return np.concatenate([
+			sample_border(img_array, s, border, corner_size, stride_samples)
+			for s in strategy
+		])
+
+	height, width = img_array.shape[:2]
+
+	if strategy == 'edges':
+		border = max(1, min(border, height // 2 or 1, width // 2 or 1))
+		regions = [
+			img_array[:border],
+			img_array[height - border:],
+			img_array[border:height - border, :border],
+			img_array[border:height - border, width - border:],
+		]
+	elif strategy == 'corners':
+		cy = min(corner_size, height)
+		cx = min(corner_size, width)
+		regions = [
+			img_array[:cy, :cx],
+			img_array[:cy, width - cx:],
+			img_array[height - cy:, :cx],
+			img_array[height - cy:, width - cx:],
+		]
+	elif strategy == 'strided':
+		step_x = max(1, width // stride_samples)
+		step_y = max(1, height // stride_samples)
+		regions = [
+			img_array[0, ::step_x],
+			img_array[-1, ::step_x],
+			img_array[::step_y, 0],
+			img_array[::step_y, -1],
+		]
+	elif strategy == 'full':
+		regions = [img_array]
+	else:
+		raise ValueError(f"Unknown sampling strategy: {strategy!r} (expected one of {STRATEGIES})")
+
+	return np.concatenate([pack_rgb(region).ravel() for region in regions])
+
+
+def rank_colors(keys, top_n=5, min_percentage=0.0):
+	"""
+	Rank packed colors by frequency using a vectorized histogram
+
+	Args:
+		keys: 1D array of packed RGB keys
+		top_n: Maximum number of colors to return
+		min_percentage: Drop colors below this share of the samples
+
+	Returns:
+		List of (RGB numpy array, percentage) tuples, most common first
+	"""
+	if len(keys) == 0:
+		return []
+
+	colors, counts = np.unique(keys, return_counts=True)
+
+	# Most frequent first; ties keep the lowest packed color first
+	order = np.argsort(-counts, kind='stable')[:top_n]
+	percentages = counts[order] * 100.0 / len(keys)
+	rgb = unpack_rgb(colors[order]).astype(int)
+
+	return [
+		(color, float(pct))
+		for color, pct in zip(rgb, percentages)
+		if pct > min_percentage
+	]
+
+
+def detect_background_colors(img_array, strategy='edges', top_n=5, min_percentage=1.0,
+							 **sample_options):
+	"""
+	Detect the most likely background colors of an image
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		strategy: Sampling strategy, see sample_border
+		top_n: Maximum number of colors to return
+		min_percentage: Drop colors below this share of the sampled pixels
+		**sample_options: Passed through to sample_border
+
+	Returns:
+		List of (RGB numpy array, confidence percentage) tuples, most likely first
+	"""
+	keys = sample_border(img_array, strategy, **sample_options)
+	return rank_colors(keys, top_n, min_percentage)
+
+
+def median_color(img_array, strategy='strided', **sample_options):
+	"""
+	Per-channel median of the sampled border pixels
+
+	Unlike the most frequent color this follows noisy or gradient borders,
+	where no single color repeats.
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		strategy: Sampling strategy, see sample_border
+		**sample_options: Passed through to sample_border
+
+	Returns:
+		float64 RGB array
+	"""
+	keys = sample_border(img_array, strategy, **sample_options)
+	return np.median(unpack_rgb(keys), axis=0)
+
+
+def has_transparent_border(img_array):
+	"""
+	True if every border pixel is already fully transparent
+
+	Images with real transparency (e.g. PixelLab exports) need no background
+	removal; their transparent black border would be detected as background.
+	"""
+	if img_array.ndim != 3 or img_array.shape[2] < 4:
+		return False
+
+	alpha = img_array[:, :, 3]
+	return not (alpha[0].any() or alpha[-1].any() or alpha[:, 0].any() or alpha[:, -1].any())
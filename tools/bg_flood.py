@@ -0,0 +1,162 @@
+"""
+Background Flood Fill
+Keeps only background pixels reachable from the image (or frame) border
+
+Global removal clears every pixel close to a background color, so white
+armor highlights and purple robes get holes. Here a pixel only counts as
+background if a path of background pixels (4-connected) joins it to the
+border of the image, or to the border of its frame.
+
+Labeling is linear in the number of pixels: each row is split into runs
+of background pixels (vectorized), runs that overlap between neighbouring
+rows are joined with a vectorized union-find (hook the larger root to the
+smaller one, then pointer jumping), and runs in a component that touches
+a border are painted back into the mask.
+"""
+
+import numpy as np
+
+
+def mask_runs(mask):
+	"""
+	Horizontal runs of True pixels, in row-major order
+
+	Returns:
+		(rows, starts, ends) int arrays; a run covers columns start..end-1
+	"""
+	height, width = mask.shape
+	padded = np.zeros((height, width + 2), dtype=np.int8)
+	padded[:, 1:-1] = mask
+	edges = np.diff(padded, axis=1)  # (height, width + 1)
+
+	starts = np.flatnonzero(edges == 1)
+	ends = np.flatnonzero(edges == -1)
+	rows = starts // (width + 1)
+	return rows, starts % (width + 1), ends % (width + 1)
+
+
+def run_adjacency(rows, starts, ends, width):
+	"""
+	Pairs of runs in neighbouring rows that share at least one column
+
+	Returns:
+		(upper, lower) int arrays of run indices
+	"""
+	stride = width + 1
+	key_starts = rows * stride + starts
+	key_ends = rows * stride + ends
+
+	# For each run, the runs of the row above with end > start and start < end
+	lower = np.flatnonzero(rows > 0)
+	above = (rows[lower] - 1) * stride
+	first = np.searchsorted(key_ends, above + starts[lower], side='right')
+	last = np.searchsorted(key_starts, above + ends[lower], side='left')
+	counts = np.maximum(last - first, 0)
+
+	lower = np.repeat(lower, counts)
+	offsets = np.repeat(first - (np.cumsum(counts) - counts), counts)
+	upper = np.arange(len(lower)) + offsets
+	return upper, lower
+
+
+def component_roots(count, a, b):
+	"""
+	Connected components of a graph by vectorized union-find
+
+	Args:
+		count: Number of nodes
+		a, b: Edge endpoint arrays
+
+	Returns:
+		int array: the smallest node index of each node's component
+	"""
+	parent = np.arange(count)
+
+	while True:
+		root_a, root_b = parent[a], parent[b]
+		crossing = root_a != root_b
+		if not crossing.any():
+			return parent
+
+		# Edges inside one component are done for good
+		a, b = a[crossing], b[crossing]
+		root_a, root_b = root_a[crossing], root_b[crossing]
+		np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+
+		# Pointer jumping until every node points at its root
+		while True:
+			grand = parent[parent]
+			if np.array_equal(grand, parent):
+				break
+			parent = grand
+
+
+def border_lines(size, cells=None):
+	"""
+	Which rows (or columns) are a border: the image edge, plus each cell's
+	first and last line when the axis is split into `cells` equal frames
+	"""
+	lines = np.zeros(size, dtype=bool)
+	lines[[0, size - 1]] = True
+	if cells:
+		step = size // cells
+		lines[0:step * cells:step] = True
+		lines[step - 1:step * cells:step] = True
+	return lines
+
+
+def border_connected(mask, grid=None):
+	"""
+	Pixels of mask connected to the image border (or to frame borders)
+
+	Args:
+		mask: (height, width) bool array of background candidates
+		grid: Optional (cols, rows): every frame's border also counts
+
+	Returns:
+		(height, width) bool array
+	"""
+	height, width = mask.shape
+	rows, starts, ends = mask_runs(mask)
+	if len(rows) == 0:
+		return np.zeros_like(mask, dtype=bool)
+
+	cols, grid_rows = grid if grid else (None, None)
+	border_rows = border_lines(height, grid_rows)
+	border_cols = np.concatenate(([0], np.cumsum(border_lines(width, cols))))
+
+	# A run is a seed if its row is a border row or it covers a border column
+	seeds = border_rows[rows] | (border_cols[ends] > border_cols[starts])
+
+	upper, lower = run_adjacency(rows, starts, ends, width)
+	roots = component_roots(len(rows), upper, lower)
+
+	reached = np.zeros(len(rows), dtype=bool)
+	reached[roots[seeds]] = True
+	keep = reached[roots]
+
+	# Paint the kept runs: +1 at each start, -1 at each end, running sum
+	stride = width + 1
+	marks = np.zeros(height * stride + 1, dtype=np.int8)
+	marks[rows[keep] * stride + starts[keep]] = 1
+	marks[rows[keep] * stride + ends[keep]] = -1
+	painted = np.cumsum(marks[:-1], dtype=np.int8).astype(bool)
+	return painted.reshape(height, stride)[:, :width]
+
+
+def restrict_alpha(alpha, grid=None):
+	"""
+	Restore full opacity to background-like pixels the border cannot reach
+
+	Keeps the smooth-edge alpha ramp of reachable pixels as it is.
+
+	Args:
+		alpha: uint8 (height, width) alpha from compute_alpha (modified in place)
+		grid: Optional (cols, rows) for per-frame borders
+
+	Returns:
+		The same array
+	"""
+	candidates = alpha < 255
+	alpha[candidates & ~border_connected(candidates, grid)] = 255
+	return alpha
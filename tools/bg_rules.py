@@ -0,0 +1,260 @@
+"""
+Background Rules
+Declarative background predicates compiled into one fused pass
+
+A rule is a small expression over a pixel's color:
+
+    brightness > 200
+    r > 240 and g > 240 and b > 240
+    diff(r, g) < 20 and diff(g, b) < 20 and brightness > 180
+    dist(255, 0, 255) < 40 or (r > 200 and not g > 200)
+
+Operands: r, g, b, brightness (mean of r, g, b), diff(x, y) (absolute
+channel difference), wrapdiff(x, y) (x - y as uint8, wrapping below 0 as
+numpy does on 8-bit channels) and dist(R, G, B) (RGB distance to a
+color), compared with <, <=, >, >=, == or != to a number, and joined
+with and / or / not and parentheses. A list of rules matches when any rule does.
+
+A pixel's rules only depend on its RGB color, so the compiled rules are
+evaluated once per distinct color in the image and the result is
+gathered back through a lookup table, band by band. Adding rules does
+not add full-image passes or full-image temporaries.
+
+Rules files are JSON: {"background": ["rule", ...]}. Built-in sets can
+be named instead (see RULE_SETS).
+"""
+
+import json
+import operator
+import os
+import re
+
+import numpy as np
+
+from bg_alpha import DEFAULT_MAX_MEMORY_MB, band_rows, iter_bands, pack_rgb, unpack_rgb
+
+
+# Light backgrounds (white, light grey, light purple) that image
+# generators draw as "transparent". The grey test keeps the original
+# uint8 subtraction, so masks match the hard-coded version bit for bit
+LIGHT_BACKGROUND_RULES = (
+	'brightness > 200',
+	'r > 240 and g > 240 and b > 240',
+	'r > 200 and b > 200 and g < 200',
+	'wrapdiff(r, g) < 20 and wrapdiff(g, b) < 20 and brightness > 180',
+)
+
+# The same with a true absolute difference in the grey test, so light
+# greys tinted either way (e.g. slightly blue) are removed too
+SYMMETRIC_LIGHT_BACKGROUND_RULES = LIGHT_BACKGROUND_RULES[:3] + (
+	'diff(r, g) < 20 and diff(g, b) < 20 and brightness > 180',
+)
+
+# Rule sets that --rules accepts by name
+RULE_SETS = {
+	'light': LIGHT_BACKGROUND_RULES,
+	'light-symmetric': SYMMETRIC_LIGHT_BACKGROUND_RULES,
+}
+
+COMPARISONS = {
+	'<': operator.lt, '<=': operator.le,
+	'>': operator.gt, '>=': operator.ge,
+	'==': operator.eq, '!=': operator.ne,
+}
+
+CHANNELS = ('r', 'g', 'b')
+
+_TOKEN = re.compile(r'\s*(?:(\d+(?:\.\d+)?)|([a-z_]+)|(<=|>=|==|!=|[<>(),]))', re.IGNORECASE)
+
+
+def tokenize(rule):
+	"""Split a rule into number, word and symbol tokens"""
+	tokens = []
+	pos = 0
+	rule = rule.strip()
+	while pos < len(rule):
+		match = _TOKEN.match(rule, pos)
+		if not match:
+			raise ValueError(f"Unexpected text in rule {rule!r}: {rule[pos:]!r}")
+		number, word, symbol = match.groups()
+		if number is not None:
+			tokens.append(('number', float(number)))
+		elif word is not None:
+			tokens.append(('word', word.lower()))
+		else:
+			tokens.append(('symbol', symbol))
+		pos = match.end()
+	return tokens
+
+
+def _operand(name, args):
+	"""Function computing an operand from the channel dict"""
+	if name in CHANNELS and not args:
+		return lambda c: c[name]
+	if name == 'brightness' and not args:
+		return lambda c: (c['r'] + c['g'] + c['b']) / 3
+	if name == 'diff' and len(args) == 2 and all(a in CHANNELS for a in args):
+		x, y = args
+		return lambda c: np.abs(c[x] - c[y])
+	if name == 'wrapdiff' and len(args) == 2 and all(a in CHANNELS for a in args):
+		x, y = args
+		return lambda c: (c[x] - c[y]) % 256
+	if name == 'dist' and len(args) == 3 and all(isinstance(a, float) for a in args):
+		return lambda c: np.sqrt((c['r'] - args[0]) ** 2 + (c['g'] - args[1]) ** 2 +
+								 (c['b'] - args[2]) ** 2)
+	raise ValueError(f"Unknown operand: {name}({', '.join(map(str, args))})" if args
+					 else f"Unknown operand: {name}")
+
+
+def compile_rule(rule):
+	"""
+	Compile one rule into a predicate
+
+	Returns:
+		Function mapping a dict of float64 channel arrays ('r', 'g', 'b')
+		to a bool array
+	"""
+	tokens = tokenize(rule)
+	pos = 0
+
+	def peek():
+		return tokens[pos] if pos < len(tokens) else (None, None)
+
+	def take(kind=None, value=None):
+		nonlocal pos
+		token = peek()
+		if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+			expected = value or kind or 'more input'
+			raise ValueError(f"Bad rule {rule!r}: expected {expected} at token {pos + 1}")
+		pos += 1
+		return token[1]
+
+	def parse_or():
+		left = parse_and()
+		while peek() == ('word', 'or'):
+			take()
+			right = parse_and()
+			left = (lambda a, b: lambda c: a(c) | b(c))(left, right)
+		return left
+
+	def parse_and():
+		left = parse_not()
+		while peek() == ('word', 'and'):
+			take()
+			right = parse_not()
+			left = (lambda a, b: lambda c: a(c) & b(c))(left, right)
+		return left
+
+	def parse_not():
+		if peek() == ('word', 'not'):
+			take()
+			inner = parse_not()
+			return lambda c: ~inner(c)
+		if peek() == ('symbol', '('):
+			take()
+			inner = parse_or()
+			take('symbol', ')')
+			return inner
+		return parse_comparison()
+
+	def parse_comparison():
+		name = take('word')
+		args = []
+		if peek() == ('symbol', '('):
+			take()
+			while True:
+				args.append(take())
+				if peek() == ('symbol', ','):
+					take()
+					continue
+				take('symbol', ')')
+				break
+		operand = _operand(name, args)
+
+		symbol = take('symbol')
+		if symbol not in COMPARISONS:
+			raise ValueError(f"Bad rule {rule!r}: expected a comparison, got {symbol!r}")
+		compare = COMPARISONS[symbol]
+		threshold = take('number')
+		return lambda c: compare(operand(c), threshold)
+
+	predicate = parse_or()
+	if pos != len(tokens):
+		raise ValueError(f"Bad rule {rule!r}: unexpected {tokens[pos][1]!r}")
+	return predicate
+
+
+def compile_rules(rules):
+	"""
+	Compile a rule or list of rules (any of them matching) into one predicate
+	"""
+	if isinstance(rules, str):
+		rules = [rules]
+	predicates = [compile_rule(rule) for rule in rules]
+	if not predicates:
+		raise ValueError("No background rules given")
+
+	def matches(channels):
+		result = predicates[0](channels)
+		for predicate in predicates[1:]:
+			result |= predicate(channels)
+		return result
+
+	return matches
+
+
+def load_rules(source):
+	"""
+	Rules from a RULE_SETS name, a JSON file ({"background": [...]}) or a
+	rule string
+
+	Returns:
+		List of rule strings
+	"""
+	if source in RULE_SETS:
+		return list(RULE_SETS[source])
+	if os.path.isfile(source):
+		with open(source, encoding='utf-8') as f:
+			rules = json.load(f)['background']
+	else:
+		rules = source
+	return [rules] if isinstance(rules, str) else list(rules)
+
+
+def rule_mask(img_array, rules=LIGHT_BACKGROUND_RULES, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Pixels matching the background rules
+
+	Rules are evaluated once per distinct color, then looked up per pixel.
+
+	Args:
+		img_array: numpy array of image (RGB or RGBA)
+		rules: Rule string, list of rule strings, or a compiled predicate
+		max_memory_mb: Working memory budget for the per-band lookups (MB)
+
+	Returns:
+		(height, width) bool array
+	"""
+	predicate = rules if callable(rules) else compile_rules(rules)
+	height, width = img_array.shape[:2]
+	bands = list(iter_bands(height, width, max_memory_mb))
+
+	# Every color present, marked in a 24-bit table
+	seen = np.zeros(1 << 24, dtype=bool)
+	for band in bands:
+		seen[pack_rgb(img_array[band])] = True
+	colors = np.flatnonzero(seen)
+	del seen
+
+	# Rules on each distinct color, a chunk at a time
+	lut = np.zeros(1 << 24, dtype=bool)
+	chunk = band_rows(1, max_memory_mb) or max(1, len(colors))
+	for start in range(0, len(colors), chunk):
+		keys = colors[start:start + chunk]
+		rgb = unpack_rgb(keys).astype(np.float64)
+		lut[keys] = predicate({name: rgb[:, i] for i, name in enumerate(CHANNELS)})
+
+	mask = np.empty((height, width), dtype=bool)
+	for band in bands:
+		mask[band] = lut[pack_rgb(img_array[band])]
+	return mask
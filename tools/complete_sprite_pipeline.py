@@ -12,67 +12,48 @@ This will:
 """
 
 from PIL import Image
-import numpy as np
 import sys
 import os
-from collections import Counter
+
+from bg_alpha import DEFAULT_MAX_MEMORY_MB, compute_alpha, alpha_stats
+from bg_detect import detect_background_colors
+from decode_cache import load_rgba
+from output_cache import tool_version, cache_key, lookup, store
+from stage_profile import stage, profile_run
+
+
+CACHE_VERSION = tool_version(__file__)
 
 
 def detect_background(img_array):
-	"""Detect background color from edges"""
-	height, width = img_array.shape[:2]
-	
-	edge_pixels = []
-	sample_size = min(100, width, height)
-	
-	edge_pixels.extend(img_array[0, :sample_size, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[-1, :sample_size, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[:sample_size, 0, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[:sample_size, -1, :3].reshape(-1, 3).tolist())
-	
-	color_counts = Counter(tuple(p) for p in edge_pixels)
-	bg_colors = []
-	total = len(edge_pixels)
-	
-	for color, count in color_counts.most_common(5):
-		percentage = (count / total) * 100
-		if percentage > 1.0:
-			bg_colors.append((np.array(color), percentage))
-	
-	return bg_colors
+	"""Detect background colors from the full image border"""
+	return detect_background_colors(img_array, strategy='edges', top_n=5, min_percentage=1.0)
 
 
-def remove_background(img_array, tolerance=45):
+def remove_background(img_array, tolerance=45, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
 	"""Remove background with multi-color detection"""
 	height, width = img_array.shape[:2]
 	
-	bg_colors = detect_background(img_array)
+	with stage('detect', height * width):
+		bg_colors = detect_background(img_array)
 	
 	print("Detected background colors:")
 	for color, pct in bg_colors:
 		print(f"  RGB{tuple(color)}: {pct:.1f}%")
 	
-	alpha = np.ones((height, width), dtype=np.uint8) * 255
-	
-	for bg_color, _ in bg_colors:
-		r, g, b = img_array[:,:,0], img_array[:,:,1], img_array[:,:,2]
-		
-		diff = np.sqrt(
-			(r.astype(float) - bg_color[0]) ** 2 +
-			(g.astype(float) - bg_color[1]) ** 2 +
-			(b.astype(float) - bg_color[2]) ** 2
-		)
-		
-		fade_alpha = np.clip(255 * (diff / tolerance), 0, 255).astype(np.uint8)
-		alpha = np.minimum(alpha, fade_alpha)
-	
-	transparent = np.sum(alpha == 0)
+	# Banded so the float working set stays within max_memory_mb
+	with stage('alpha', height * width):
+		alpha = compute_alpha(img_array, [color for color, _ in bg_colors], tolerance,
+							  max_memory_mb=max_memory_mb)
+	
+	transparent, _, _ = alpha_stats(alpha, max_memory_mb)
 	print(f"Made {transparent} pixels transparent ({transparent/(height*width)*100:.1f}%)")
 	
 	return alpha
 
 
-def process_sprite(input_path, cols, rows, frame_size, output_path=None, tolerance=45):
+def process_sprite(input_path, cols, rows, frame_size, output_path=None, tolerance=45,
+				   max_memory_mb=DEFAULT_MAX_MEMORY_MB, use_cache=True):
 	"""
 	Complete pipeline: load → remove background → resize to grid → save
 	
@@ -83,6 +64,8 @@ def process_sprite(input_path, cols, rows, frame_size, output_path=None, toleran
 		frame_size: Size of each frame in pixels
 		output_path: Output path (default: auto-generated)
 		tolerance: Background removal tolerance
+		max_memory_mb: Working memory budget for background removal (MB)
+		use_cache: Reuse a cached output if the input and settings are unchanged
 	
 	Returns:
 		Path to output file
@@ -92,19 +75,29 @@ def process_sprite(input_path, cols, rows, frame_size, output_path=None, toleran
 	print("COMPLETE SPRITE PROCESSING PIPELINE")
 	print("="*70)
 	
+	if output_path is None:
+		base, _ = os.path.splitext(input_path)
+		output_path = f"{base}_final.png"
+	
+	if use_cache:
+		key = cache_key(input_path, 'process_sprite', CACHE_VERSION, {
+			'cols': cols, 'rows': rows, 'frame_size': frame_size, 'tolerance': tolerance,
+		})
+		if lookup(key, output_path):
+			print(f"\n✓ Cache hit (input and settings unchanged): {output_path}")
+			return output_path
+	
 	# Step 1: Load image
 	print(f"\n[1/4] Loading: {input_path}")
-	img = Image.open(input_path)
-	if img.mode != 'RGBA':
-		img = img.convert('RGBA')
-	
-	data = np.array(img)
-	orig_width, orig_height = img.size
+	with stage('load') as info:
+		data = load_rgba(input_path)
+		orig_height, orig_width = data.shape[:2]
+		info['pixels'] = orig_width * orig_height
 	print(f"      Original size: {orig_width}x{orig_height}")
 	
 	# Step 2: Remove background
 	print(f"\n[2/4] Removing background (tolerance={tolerance})...")
-	alpha = remove_background(data, tolerance)
+	alpha = remove_background(data, tolerance, max_memory_mb)
 	data[:,:,3] = alpha
 	
 	# Step 3: Resize to perfect grid
@@ -115,8 +108,9 @@ def process_sprite(input_path, cols, rows, frame_size, output_path=None, toleran
 	print(f"      Target: {target_width}x{target_height} ({cols}x{rows} grid)")
 	print(f"      Frame size: {frame_size}x{frame_size} pixels")
 	
-	img_with_alpha = Image.fromarray(data, 'RGBA')
-	img_resized = img_with_alpha.resize((target_width, target_height), Image.Resampling.NEAREST)
+	with stage('resize', target_width * target_height):
+		img_with_alpha = Image.fromarray(data, 'RGBA')
+		img_resized = img_with_alpha.resize((target_width, target_height), Image.Resampling.NEAREST)
 	
 	# Verify
 	verify_w = img_resized.size[0] / cols
@@ -128,12 +122,11 @@ def process_sprite(input_path, cols, rows, frame_size, output_path=None, toleran
 		print(f"      ✗ Warning: Frame size = {verify_w}x{verify_h} (expected {frame_size}x{frame_size})")
 	
 	# Step 4: Save
-	if output_path is None:
-		base, _ = os.path.splitext(input_path)
-		output_path = f"{base}_final.png"
-	
 	print(f"\n[4/4] Saving final sprite...")
-	img_resized.save(output_path, 'PNG')
+	with stage('save', target_width * target_height):
+		img_resized.save(output_path, 'PNG')
+	if use_cache:
+		store(key, output_path)
 	
 	file_size = os.path.getsize(output_path) / 1024  # KB
 	print(f"      ✓ Saved to: {output_path}")
@@ -170,6 +163,10 @@ if __name__ == "__main__":
 		print("Options:")
 		print("  -o <path>     Output file path (default: auto-generated)")
 		print("  -t <value>    Tolerance for background removal (default: 45)")
+		print(f"  -m <MB>       Working memory cap for background removal (default: {DEFAULT_MAX_MEMORY_MB})")
+		print("  --no-cache    Always reprocess, bypassing the output cache")
+		print("  --profile <f> Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet       No console output")
 		print()
 		print("Examples:")
 		print("  python complete_sprite_pipeline.py knight.png 6 4 128")
@@ -191,6 +188,8 @@ if __name__ == "__main__":
 	
 	output_file = None
 	tolerance = 45
+	max_memory_mb = DEFAULT_MAX_MEMORY_MB
+	use_cache = '--no-cache' not in sys.argv
 	
 	# Parse options
 	for i in range(5, len(sys.argv)):
@@ -198,12 +197,16 @@ if __name__ == "__main__":
 			output_file = sys.argv[i + 1]
 		elif sys.argv[i] == '-t' and i + 1 < len(sys.argv):
 			tolerance = int(sys.argv[i + 1])
+		elif sys.argv[i] == '-m' and i + 1 < len(sys.argv):
+			max_memory_mb = float(sys.argv[i + 1])
 	
 	# Run pipeline
-	try:
-		process_sprite(input_file, cols, rows, frame_size, output_file, tolerance)
-	except Exception as e:
-		print(f"\n✗ Error: {e}")
-		import traceback
-		traceback.print_exc()
-		sys.exit(1)
+	with profile_run(sys.argv[1:]):
+		try:
+			process_sprite(input_file, cols, rows, frame_size, output_file, tolerance, max_memory_mb,
+						   use_cache)
+		except Exception as e:
+			print(f"\n✗ Error: {e}")
+			import traceback
+			traceback.print_exc()
+			sys.exit(1)
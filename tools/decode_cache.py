@@ -0,0 +1,90 @@
+"""
+Decoded Image Cache
+Memory-mapped cache of decoded RGBA arrays, keyed by the source file's hash
+
+Tuning a tool on the same large sheet decodes the same PNG on every run.
+With the cache on, the first run stores the decoded RGBA array as a .npy
+file. Later runs memory-map that file instead of decoding, which takes
+milliseconds and copies nothing up front. Maps are copy-on-write, so tools
+that modify the array in place never change the cache entry. The cache is
+kept under a size limit by evicting the least recently used entries.
+
+Off by default; set SPRITE_DECODE_CACHE=1 to turn it on for every tool.
+Location: <output cache>/decoded (override with SPRITE_DECODE_CACHE_DIR)
+"""
+
+from PIL import Image
+import numpy as np
+import os
+
+from output_cache import DEFAULT_CACHE_DIR, file_hash, evict
+
+
+# Environment variable that turns the cache on
+DECODE_CACHE_ENV = 'SPRITE_DECODE_CACHE'
+
+DEFAULT_DECODE_CACHE_DIR = os.environ.get(
+	'SPRITE_DECODE_CACHE_DIR',
+	os.path.join(DEFAULT_CACHE_DIR, 'decoded'),
+)
+
+# Maximum total size of cached arrays (MB); a 4096² sheet takes 64 MB
+DEFAULT_MAX_DECODE_CACHE_MB = int(os.environ.get('SPRITE_DECODE_CACHE_MB', 2048))
+
+
+def decode_cache_enabled():
+	"""True when SPRITE_DECODE_CACHE is set to anything but '' or '0'"""
+	return os.environ.get(DECODE_CACHE_ENV, '') not in ('', '0')
+
+
+def decode_rgba(path):
+	"""Decode an image file into a (height, width, 4) uint8 array"""
+	with Image.open(path) as img:
+		return np.array(img.convert('RGBA'))
+
+
+def _entry_path(key, cache_dir):
+	return os.path.join(cache_dir, key[:2], key + '.npy')
+
+
+def load_rgba(path, use_cache=None, cache_dir=DEFAULT_DECODE_CACHE_DIR,
+			  max_cache_mb=DEFAULT_MAX_DECODE_CACHE_MB):
+	"""
+	Decoded RGBA array of an image, memory-mapped from the cache when possible
+
+	Args:
+		path: Image file path
+		use_cache: True/False, or None to follow SPRITE_DECODE_CACHE
+		cache_dir: Cache location
+		max_cache_mb: Size limit enforced after adding an entry
+
+	Returns:
+		(height, width, 4) uint8 array; on a cache hit a copy-on-write
+		memory map (writes stay private to this process)
+	"""
+	if use_cache is None:
+		use_cache = decode_cache_enabled()
+	if not use_cache:
+		return decode_rgba(path)
+
+	entry = _entry_path(file_hash(path), cache_dir)
+	try:
+		data = np.load(entry, mmap_mode='c')
+		# Mark as recently used for LRU eviction
+		os.utime(entry)
+		return data.view(np.ndarray)
+	except (OSError, ValueError):
+		# Missing or unreadable entry: decode and (re)store it
+		pass
+
+	data = decode_rgba(path)
+
+	os.makedirs(os.path.dirname(entry), exist_ok=True)
+	# Write under a temporary name so concurrent readers never see partial files
+	tmp = f"{entry}.{os.getpid()}.tmp"
+	with open(tmp, 'wb') as f:
+		np.save(f, data)
+	os.replace(tmp, entry)
+
+	evict(max_cache_mb, cache_dir, extension='.npy')
+	return data
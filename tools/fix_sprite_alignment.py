@@ -1,6 +1,10 @@
 """
 Sprite Alignment Fixer
 Fixes animation jitter by centering sprites and removing background aggressively
+
+The sheet is viewed as a (rows, frame_h, cols, frame_w) array, so the
+bounds of every frame come from a few array operations and re-centering
+writes the whole output in one gather instead of a Python loop per frame.
 """
 
 from PIL import Image, ImageDraw
@@ -8,11 +12,34 @@ import numpy as np
 import sys
 import os
 
+from bg_flood import border_connected
+from bg_rules import LIGHT_BACKGROUND_RULES, load_rules, rule_mask
+from decode_cache import load_rgba
+from output_cache import tool_version, cache_key, lookup, store
+from stage_profile import stage, profile_run
+
+
+CACHE_VERSION = tool_version(__file__)
+
+# Per frame analysis record; width/height are max - min as reported by
+# analyze_sprite_offsets (the content box is one pixel larger)
+FRAME_DTYPE = np.dtype([
+	('row', np.int32), ('col', np.int32),
+	('min_x', np.int32), ('min_y', np.int32), ('max_x', np.int32), ('max_y', np.int32),
+	('center_x', np.float64), ('center_y', np.float64),
+	('width', np.int32), ('height', np.int32),
+	('has_content', np.bool_),
+])
 
-def get_sprite_bounds(img_array):
+
+def get_sprite_bounds(img_array, alpha_threshold=10):
 	"""
 	Find the bounding box of non-transparent pixels
 	
+	Args:
+		img_array: numpy RGBA array
+		alpha_threshold: Pixels with alpha above this count as content
+	
 	Returns:
 		(min_x, min_y, max_x, max_y) or None if all transparent
 	"""
@@ -20,8 +47,8 @@ def get_sprite_bounds(img_array):
 	alpha = img_array[:, :, 3]
 	
 	# Find rows and cols with any opaque pixels
-	rows_with_content = np.any(alpha > 10, axis=1)
-	cols_with_content = np.any(alpha > 10, axis=0)
+	rows_with_content = np.any(alpha > alpha_threshold, axis=1)
+	cols_with_content = np.any(alpha > alpha_threshold, axis=0)
 	
 	if not rows_with_content.any() or not cols_with_content.any():
 		return None
@@ -34,55 +61,253 @@ def get_sprite_bounds(img_array):
 	return (min_x, min_y, max_x, max_y)
 
 
+def frame_grid(data, cols, rows):
+	"""
+	View a sheet as a (rows, frame_h, cols, frame_w, channels) array
+	
+	Pixels right of / below the last full frame are left out, as when
+	slicing frames one by one. No data is copied.
+	"""
+	frame_width = data.shape[1] // cols
+	frame_height = data.shape[0] // rows
+	cropped = data[:rows * frame_height, :cols * frame_width]
+	return cropped.reshape(rows, frame_height, cols, frame_width, data.shape[2])
+
+
+def frame_bounds(grid, alpha_threshold=10):
+	"""
+	Bounds of every frame of a sheet at once
+	
+	Args:
+		grid: Sheet view from frame_grid
+		alpha_threshold: Pixels with alpha above this count as content
+	
+	Returns:
+		(rows, cols) structured array of FRAME_DTYPE; frames without
+		content have has_content False
+	"""
+	rows, frame_height, cols, frame_width = grid.shape[:4]
+	content = grid[..., 3] > alpha_threshold
+	
+	rows_with_content = content.any(axis=3)  # (rows, frame_h, cols)
+	cols_with_content = content.any(axis=1)  # (rows, cols, frame_w)
+	
+	frames = np.zeros((rows, cols), dtype=FRAME_DTYPE)
+	frames['row'], frames['col'] = np.indices((rows, cols))
+	frames['has_content'] = rows_with_content.any(axis=1)
+	frames['min_y'] = np.argmax(rows_with_content, axis=1)
+	frames['max_y'] = frame_height - np.argmax(rows_with_content[:, ::-1], axis=1) - 1
+	frames['min_x'] = np.argmax(cols_with_content, axis=2)
+	frames['max_x'] = frame_width - np.argmax(cols_with_content[:, :, ::-1], axis=2) - 1
+	frames['center_x'] = (frames['min_x'] + frames['max_x']) / 2
+	frames['center_y'] = (frames['min_y'] + frames['max_y']) / 2
+	frames['width'] = frames['max_x'] - frames['min_x']
+	frames['height'] = frames['max_y'] - frames['min_y']
+	
+	return frames
+
+
+def shift_frames(grid, shift_x, shift_y, frames=None):
+	"""
+	Move every frame by its own integer shift, in one pass
+	
+	Args:
+		grid: Sheet view from frame_grid
+		shift_x, shift_y: (rows, cols) integer shifts, source to destination
+		frames: Optional result of frame_bounds; only each frame's content
+			box is moved and frames without content come out empty
+	
+	Returns:
+		New (rows, frame_h, cols, frame_w, channels) array; pixels shifted
+		in from outside the frame are transparent
+	"""
+	rows, frame_height, cols, frame_width = grid.shape[:4]
+	
+	# Source coordinates of every destination pixel
+	src_y = np.arange(frame_height)[None, :, None] - shift_y[:, None, :]  # (rows, frame_h, cols)
+	src_x = np.arange(frame_width)[None, None, :] - shift_x[:, :, None]   # (rows, cols, frame_w)
+	
+	if frames is None:
+		inside_y = (src_y >= 0) & (src_y < frame_height)
+		inside_x = (src_x >= 0) & (src_x < frame_width)
+	else:
+		inside_y = ((src_y >= frames['min_y'][:, None, :]) & (src_y <= frames['max_y'][:, None, :]) &
+					frames['has_content'][:, None, :])
+		inside_x = (src_x >= frames['min_x'][:, :, None]) & (src_x <= frames['max_x'][:, :, None])
+	
+	# Gather whole RGBA pixels as uint32 through one flat index
+	pixels = np.ascontiguousarray(grid).view(np.uint32).reshape(-1)
+	row_start = ((np.arange(rows)[:, None, None] * frame_height + np.clip(src_y, 0, frame_height - 1))
+				 * cols * frame_width + np.arange(cols)[None, None, :] * frame_width)
+	index = row_start[:, :, :, None] + np.clip(src_x, 0, frame_width - 1)[:, None, :, :]
+	
+	result = np.where(inside_y[:, :, :, None] & inside_x[:, None, :, :], pixels[index], 0)
+	return result.astype(np.uint32, copy=False).view(np.uint8).reshape(
+		rows, frame_height, cols, frame_width, 4)
+
+
+def recenter_frames(grid, frames):
+	"""
+	Center every frame's content box in its cell, in one pass
+	
+	Args:
+		grid: Sheet view from frame_grid
+		frames: Result of frame_bounds
+	
+	Returns:
+		New (rows, frame_h, cols, frame_w, channels) array; frames without
+		content come out fully transparent
+	"""
+	frame_height, frame_width = grid.shape[1], grid.shape[3]
+	sprite_w = frames['max_x'] - frames['min_x'] + 1
+	sprite_h = frames['max_y'] - frames['min_y'] + 1
+	
+	shift_x = (frame_width - sprite_w) // 2 - frames['min_x']
+	shift_y = (frame_height - sprite_h) // 2 - frames['min_y']
+	
+	return shift_frames(grid, shift_x, shift_y, frames)
+
+
+def registration_signal(grid, channel='alpha'):
+	"""
+	Per frame float image used for registration, shape (rows, cols, frame_h, frame_w)
+	
+	'alpha' uses coverage only; 'luminance' uses brightness weighted by
+	alpha, so the (transparent) background never contributes.
+	"""
+	frames = grid.transpose(0, 2, 1, 3, 4)
+	alpha = frames[..., 3].astype(np.float32) / 255
+	if channel == 'alpha':
+		return alpha
+	if channel == 'luminance':
+		rgb = frames[..., :3].astype(np.float32)
+		return (rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114) * alpha
+	raise ValueError(f"Unknown registration channel: {channel!r} (expected 'alpha' or 'luminance')")
+
+
+def _parabolic_offset(left, center, right):
+	"""Sub-pixel peak offset from three samples around a maximum"""
+	denom = left - 2 * center + right
+	safe = np.where(np.abs(denom) > 1e-12, denom, 1)
+	return np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / safe, 0.0)
+
+
+def phase_correlation_shifts(grid, channel='alpha', reference='row'):
+	"""
+	Sub-pixel shift of every frame relative to a reference frame
+	
+	All frames go through one batched FFT. The normalized cross-power
+	spectrum with the reference peaks at the frame's displacement; a
+	parabola through the peak and its neighbours gives the sub-pixel part.
+	
+	Args:
+		grid: Sheet view from frame_grid
+		channel: 'alpha' or 'luminance'
+		reference: 'row' (first frame with content of each row, one
+			animation per row) or 'sheet' (first frame with content overall)
+	
+	Returns:
+		(dx, dy): (rows, cols) float arrays, displacement of each frame from
+		its reference; shifting a frame by (-dx, -dy) aligns it. Empty
+		frames get 0.
+	"""
+	rows, frame_height, cols, frame_width = grid.shape[:4]
+	signal = registration_signal(grid, channel)
+	has_content = signal.reshape(rows, cols, -1).any(axis=2)
+	
+	spectra = np.fft.rfft2(signal, axes=(2, 3))
+	
+	# Reference spectrum per frame
+	ref_index = np.zeros((rows, cols, 2), dtype=int)
+	if reference == 'row':
+		first = np.argmax(has_content, axis=1)
+		ref_index[..., 0] = np.arange(rows)[:, None]
+		ref_index[..., 1] = first[:, None]
+	elif reference == 'sheet':
+		flat = int(np.argmax(has_content.ravel()))
+		ref_index[..., 0], ref_index[..., 1] = divmod(flat, cols)
+	else:
+		raise ValueError(f"Unknown reference: {reference!r} (expected 'row' or 'sheet')")
+	ref_spectra = spectra[ref_index[..., 0], ref_index[..., 1]]
+	
+	cross = ref_spectra.conj() * spectra
+	cross /= np.maximum(np.abs(cross), 1e-12)
+	correlation = np.fft.irfft2(cross, s=(frame_height, frame_width), axes=(2, 3))
+	
+	flat_peak = np.argmax(correlation.reshape(rows, cols, -1), axis=2)
+	peak_y, peak_x = np.divmod(flat_peak, frame_width)
+	
+	r = np.arange(rows)[:, None]
+	c = np.arange(cols)[None, :]
+	center = correlation[r, c, peak_y, peak_x]
+	sub_y = _parabolic_offset(correlation[r, c, (peak_y - 1) % frame_height, peak_x], center,
+							  correlation[r, c, (peak_y + 1) % frame_height, peak_x])
+	sub_x = _parabolic_offset(correlation[r, c, peak_y, (peak_x - 1) % frame_width], center,
+							  correlation[r, c, peak_y, (peak_x + 1) % frame_width])
+	
+	# Peaks past the middle are negative shifts (the correlation wraps)
+	dy = np.where(peak_y > frame_height // 2, peak_y - frame_height, peak_y) + sub_y
+	dx = np.where(peak_x > frame_width // 2, peak_x - frame_width, peak_x) + sub_x
+	
+	dx = np.where(has_content, dx, 0.0)
+	dy = np.where(has_content, dy, 0.0)
+	return dx, dy
+
+
+def register_frames(grid, channel='alpha', reference='row'):
+	"""
+	Align every frame to its reference frame with phase correlation
+	
+	Shifts are rounded to whole pixels so pixel art stays crisp.
+	
+	Returns:
+		(aligned grid, dx, dy, jitter before, residual jitter); jitter is the
+		RMS displacement in pixels of the frames with content
+	"""
+	dx, dy = phase_correlation_shifts(grid, channel, reference)
+	shift_x = -np.rint(dx).astype(int)
+	shift_y = -np.rint(dy).astype(int)
+	aligned = shift_frames(grid, shift_x, shift_y)
+	
+	has_content = grid[..., 3].any(axis=(1, 3))
+	count = max(int(has_content.sum()), 1)
+	before = np.sqrt(((dx ** 2 + dy ** 2) * has_content).sum() / count)
+	residual = np.sqrt((((dx + shift_x) ** 2 + (dy + shift_y) ** 2) * has_content).sum() / count)
+	
+	return aligned, dx, dy, float(before), float(residual)
+
+
 def analyze_sprite_offsets(img_path, cols, rows):
 	"""
 	Analyze sprite offsets to detect animation jitter
+	
+	Returns:
+		1D structured array (FRAME_DTYPE) of the frames with content,
+		in row-major order
 	"""
 	print(f"Analyzing: {img_path}")
-	img = Image.open(img_path).convert('RGBA')
-	data = np.array(img)
+	with stage('load') as info:
+		data = load_rgba(img_path)
+		info['pixels'] = data.shape[0] * data.shape[1]
 	
-	width, height = img.size
+	height, width = data.shape[:2]
 	frame_width = width // cols
 	frame_height = height // rows
 	
 	print(f"Grid: {cols}x{rows}, Frame size: {frame_width}x{frame_height}")
 	print("\nFrame bounding boxes:")
 	
-	offsets = []
+	frames = frame_bounds(frame_grid(data, cols, rows))
+	offsets = frames[frames['has_content']]
 	
-	for row in range(rows):
-		for col in range(cols):
-			# Extract frame
-			x = col * frame_width
-			y = row * frame_height
-			frame = data[y:y+frame_height, x:x+frame_width]
-			
-			bounds = get_sprite_bounds(frame)
-			if bounds:
-				min_x, min_y, max_x, max_y = bounds
-				center_x = (min_x + max_x) / 2
-				center_y = (min_y + max_y) / 2
-				sprite_width = max_x - min_x
-				sprite_height = max_y - min_y
-				
-				offsets.append({
-					'row': row,
-					'col': col,
-					'center_x': center_x,
-					'center_y': center_y,
-					'width': sprite_width,
-					'height': sprite_height,
-					'bounds': bounds
-				})
-				
-				print(f"  [{row},{col}] Center: ({center_x:.1f}, {center_y:.1f}), "
-					  f"Size: {sprite_width}x{sprite_height}")
+	for o in offsets:
+		print(f"  [{o['row']},{o['col']}] Center: ({o['center_x']:.1f}, {o['center_y']:.1f}), "
+			  f"Size: {o['width']}x{o['height']}")
 	
 	# Analyze jitter
 	if len(offsets) > 1:
-		centers_x = [o['center_x'] for o in offsets]
-		centers_y = [o['center_y'] for o in offsets]
+		centers_x = offsets['center_x']
+		centers_y = offsets['center_y']
 		
 		avg_x = np.mean(centers_x)
 		avg_y = np.mean(centers_y)
@@ -101,18 +326,49 @@ def analyze_sprite_offsets(img_path, cols, rows):
 	return offsets
 
 
-def fix_sprite_alignment(img_path, cols, rows, output_path=None, aggressive_bg=True):
+def fix_sprite_alignment(img_path, cols, rows, output_path=None, aggressive_bg=True,
+						 use_cache=True, register=None, reference='row', flood=False, rules=None):
 	"""
 	Fix sprite alignment and remove background aggressively
+	
+	By default each frame's bounding box is centered in its cell. With
+	register='alpha' or 'luminance', frames are instead aligned to a
+	reference frame by phase correlation, so pose changes that move the
+	bounding box (a raised sword) no longer shift the body.
+	
+	With flood=True the aggressive removal only clears light pixels
+	connected to a frame border, so white highlights inside the sprite stay.
+	
+	rules: Background rules for the aggressive removal (see bg_rules);
+	       defaults to LIGHT_BACKGROUND_RULES
 	"""
 	print("="*70)
 	print("SPRITE ALIGNMENT FIXER")
 	print("="*70)
 	
-	img = Image.open(img_path).convert('RGBA')
-	data = np.array(img)
+	if output_path is None:
+		base, ext = os.path.splitext(img_path)
+		output_path = f"{base}_fixed_aligned.png"
+	
+	if rules is None:
+		rules = LIGHT_BACKGROUND_RULES
+	rules = [rules] if isinstance(rules, str) else list(rules)
+	
+	if use_cache:
+		key = cache_key(img_path, 'fix_sprite_alignment', CACHE_VERSION, {
+			'cols': cols, 'rows': rows, 'aggressive_bg': aggressive_bg,
+			'register': register, 'reference': reference, 'flood': flood,
+			'rules': rules,
+		})
+		if lookup(key, output_path):
+			print(f"\nOK: Cache hit (input and settings unchanged): {output_path}")
+			return output_path
 	
-	width, height = img.size
+	with stage('load') as info:
+		data = load_rgba(img_path)
+		info['pixels'] = data.shape[0] * data.shape[1]
+	
+	height, width = data.shape[:2]
 	frame_width = width // cols
 	frame_height = height // rows
 	
@@ -123,94 +379,66 @@ def fix_sprite_alignment(img_path, cols, rows, output_path=None, aggressive_bg=T
 	if aggressive_bg:
 		print(f"\n[1/2] Aggressive background removal...")
 		
-		# Remove white and near-white
-		r, g, b, a = data[:,:,0], data[:,:,1], data[:,:,2], data[:,:,3]
-		
-		# Detect all light colors (white, light grey, light purple)
-		brightness = (r.astype(float) + g.astype(float) + b.astype(float)) / 3
-		is_light = brightness > 200  # Very aggressive threshold
-		
-		# Also detect specific problematic colors
-		is_white = (r > 240) & (g > 240) & (b > 240)
-		is_light_purple = (r > 200) & (b > 200) & (g < 200)
-		is_light_grey = (np.abs(r - g) < 20) & (np.abs(g - b) < 20) & (brightness > 180)
-		
-		# Combine all background detection
-		is_background = is_light | is_white | is_light_purple | is_light_grey
-		
-		data[:,:,3][is_background] = 0
+		with stage('alpha', width * height):
+			# All rules in one pass (white, light grey, light purple by default)
+			is_background = rule_mask(data, rules)
+			if flood:
+				is_background &= border_connected(is_background, (cols, rows))
+			
+			data[:,:,3][is_background] = 0
 		
 		removed = np.sum(is_background)
 		total = width * height
 		print(f"  Removed {removed} background pixels ({removed/total*100:.1f}%)")
 	
-	# Step 2: Analyze and re-center each frame
-	print(f"\n[2/2] Re-centering sprites...")
+	grid = frame_grid(data, cols, rows)
 	
-	offsets = []
-	for row in range(rows):
-		for col in range(cols):
-			x = col * frame_width
-			y = row * frame_height
-			frame = data[y:y+frame_height, x:x+frame_width]
-			
-			bounds = get_sprite_bounds(frame)
-			if bounds:
-				offsets.append({
-					'row': row,
-					'col': col,
-					'bounds': bounds,
-					'x': x,
-					'y': y
-				})
-	
-	if offsets:
-		# Calculate average sprite size
-		widths = [o['bounds'][2] - o['bounds'][0] for o in offsets]
-		heights = [o['bounds'][3] - o['bounds'][1] for o in offsets]
-		avg_width = np.mean(widths)
-		avg_height = np.mean(heights)
+	# Step 2: Register or re-center each frame
+	if register:
+		print(f"\n[2/2] Registering sprites ({register}, reference: {reference})...")
 		
-		print(f"  Avg sprite size: {avg_width:.1f}x{avg_height:.1f}")
+		with stage('align', width * height):
+			aligned, dx, dy, before, residual = register_frames(grid, register, reference)
+		for row in range(rows):
+			for col in range(cols):
+				print(f"  [{row},{col}] Shift: ({-dx[row, col]:+.2f}, {-dy[row, col]:+.2f})")
+		print(f"  Jitter: {before:.2f}px -> residual {residual:.2f}px")
 		
-		# Create new image with centered sprites
 		new_data = np.zeros_like(data)
+		new_data[:rows * frame_height, :cols * frame_width] = \
+			aligned.reshape(rows * frame_height, cols * frame_width, 4)
 		
-		for offset in offsets:
-			row, col = offset['row'], offset['col']
-			x_grid, y_grid = offset['x'], offset['y']
-			bounds = offset['bounds']
-			
-			# Extract sprite
-			min_x, min_y, max_x, max_y = bounds
-			sprite = data[y_grid:y_grid+frame_height, x_grid:x_grid+frame_width]
-			sprite_content = sprite[min_y:max_y+1, min_x:max_x+1]
+		data = new_data
+		print(f"  OK: Registered {rows * cols} frames")
+	else:
+		print(f"\n[2/2] Re-centering sprites...")
+		
+		with stage('bounds', width * height):
+			frames = frame_bounds(grid)
+		offsets = frames[frames['has_content']]
+		
+		if len(offsets):
+			# Calculate average sprite size
+			avg_width = np.mean(offsets['width'])
+			avg_height = np.mean(offsets['height'])
 			
-			# Calculate center position in frame
-			sprite_w = max_x - min_x + 1
-			sprite_h = max_y - min_y + 1
+			print(f"  Avg sprite size: {avg_width:.1f}x{avg_height:.1f}")
 			
-			# Center it
-			new_x = (frame_width - sprite_w) // 2
-			new_y = (frame_height - sprite_h) // 2
+			# Create new image with centered sprites
+			with stage('align', width * height):
+				new_data = np.zeros_like(data)
+				new_data[:rows * frame_height, :cols * frame_width] = \
+					recenter_frames(grid, frames).reshape(rows * frame_height, cols * frame_width, 4)
 			
-			# Place centered sprite
-			new_data[
-				y_grid + new_y : y_grid + new_y + sprite_h,
-				x_grid + new_x : x_grid + new_x + sprite_w
-			] = sprite_content
-		
-		data = new_data
-		print(f"  OK: Re-centered {len(offsets)} sprites")
+			data = new_data
+			print(f"  OK: Re-centered {len(offsets)} sprites")
 	
 	# Save result
-	result = Image.fromarray(data, 'RGBA')
-	
-	if output_path is None:
-		base, ext = os.path.splitext(img_path)
-		output_path = f"{base}_fixed_aligned.png"
-	
-	result.save(output_path, 'PNG')
+	with stage('save', width * height):
+		result = Image.fromarray(data, 'RGBA')
+		result.save(output_path, 'PNG')
+	if use_cache:
+		store(key, output_path)
 	
 	print(f"\n{'='*70}")
 	print(f"OK: FIXED SPRITE SAVED: {output_path}")
@@ -229,12 +457,25 @@ if __name__ == "__main__":
 		print("Options:")
 		print("  --analyze-only    Just analyze, don't fix")
 		print("  --no-aggressive   Don't use aggressive background removal")
+		print("  --no-cache        Always reprocess, bypassing the output cache")
+		print("  --register <ch>   Align frames by phase correlation on 'alpha' or 'luminance'")
+		print("                    instead of centering bounding boxes")
+		print("  --reference <r>   Registration reference: 'row' (first frame of each row,")
+		print("                    default) or 'sheet' (first frame of the sheet)")
+		print("  --flood           Only clear light pixels connected to a frame border")
+		print("  --rules <r|file>  Background rules: a rule like 'brightness > 200 or")
+		print("                    dist(255, 0, 255) < 40', a JSON rules file, or a")
+		print("                    built-in set ('light' default, 'light-symmetric')")
 		print("  -o <path>         Output path")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
 		print()
 		print("Examples:")
 		print("  python fix_sprite_alignment.py knight.png 6 4")
 		print("  python fix_sprite_alignment.py sprite.png 6 4 --analyze-only")
 		print("  python fix_sprite_alignment.py knight.png 6 4 -o fixed.png")
+		print("  python fix_sprite_alignment.py knight.png 6 4 --register alpha")
+		print("  python fix_sprite_alignment.py knight.png 6 4 --rules bg_rules.json")
 		sys.exit(1)
 	
 	input_file = sys.argv[1]
@@ -250,7 +491,21 @@ if __name__ == "__main__":
 		if idx + 1 < len(sys.argv):
 			output_file = sys.argv[idx + 1]
 	
-	if analyze_only:
-		analyze_sprite_offsets(input_file, cols, rows)
-	else:
-		fix_sprite_alignment(input_file, cols, rows, output_file, aggressive)
+	register = None
+	if '--register' in sys.argv:
+		register = sys.argv[sys.argv.index('--register') + 1]
+	reference = 'row'
+	if '--reference' in sys.argv:
+		reference = sys.argv[sys.argv.index('--reference') + 1]
+	rules = None
+	if '--rules' in sys.argv:
+		rules = load_rules(sys.argv[sys.argv.index('--rules') + 1])
+	
+	with profile_run(sys.argv[1:]):
+		if analyze_only:
+			analyze_sprite_offsets(input_file, cols, rows)
+		else:
+			fix_sprite_alignment(input_file, cols, rows, output_file, aggressive,
+								 use_cache='--no-cache' not in sys.argv,
+								 register=register, reference=reference,
+								 flood='--flood' in sys.argv, rules=rules)
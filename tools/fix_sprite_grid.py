@@ -7,6 +7,8 @@ from PIL import Image
 import sys
 import os
 
+from stage_profile import stage, profile_run
+
 
 def fix_grid_dimensions(input_path, cols, rows, target_frame_size, output_path=None):
 	"""
@@ -24,7 +26,10 @@ def fix_grid_dimensions(input_path, cols, rows, target_frame_size, output_path=N
 	"""
 	
 	print(f"Loading: {input_path}")
-	img = Image.open(input_path)
+	with stage('load') as info:
+		img = Image.open(input_path)
+		img.load()
+		info['pixels'] = img.size[0] * img.size[1]
 	
 	original_width, original_height = img.size
 	print(f"Original size: {original_width}x{original_height}")
@@ -35,10 +40,11 @@ def fix_grid_dimensions(input_path, cols, rows, target_frame_size, output_path=N
 	print(f"Target size: {target_width}x{target_height} ({cols}x{rows} grid, {target_frame_size}px frames)")
 	
 	# Resize using high-quality resampling
-	if img.mode != 'RGBA':
-		img = img.convert('RGBA')
-	
-	resized = img.resize((target_width, target_height), Image.Resampling.NEAREST)
+	with stage('resize', target_width * target_height):
+		if img.mode != 'RGBA':
+			img = img.convert('RGBA')
+		
+		resized = img.resize((target_width, target_height), Image.Resampling.NEAREST)
 	
 	print(f"Resized to: {resized.size[0]}x{resized.size[1]}")
 	
@@ -48,7 +54,8 @@ def fix_grid_dimensions(input_path, cols, rows, target_frame_size, output_path=N
 		output_path = f"{base}_fixed_grid.png"
 	
 	# Save
-	resized.save(output_path, 'PNG')
+	with stage('save', target_width * target_height):
+		resized.save(output_path, 'PNG')
 	print(f"Saved: {output_path}")
 	
 	# Verify grid divisions
@@ -71,6 +78,8 @@ if __name__ == "__main__":
 		print("Example:")
 		print("  python fix_sprite_grid.py knight.png 6 4 128")
 		print("  (Resizes to 768x512 for perfect 6x4 grid with 128px frames)")
+		print()
+		print("Options: --profile <path> (per-stage timing, .jsonl or Chrome trace), --quiet")
 		sys.exit(1)
 	
 	input_file = sys.argv[1]
@@ -78,4 +87,5 @@ if __name__ == "__main__":
 	rows = int(sys.argv[3])
 	frame_size = int(sys.argv[4])
 	
-	fix_grid_dimensions(input_file, cols, rows, frame_size)
+	with profile_run(sys.argv[5:]):
+		fix_grid_dimensions(input_file, cols, rows, frame_size)
@@ -4,55 +4,56 @@ Removes fake transparent backgrounds with intelligent color detection
 Handles white, magenta, purple, grey, and multi-color backgrounds
 """
 
-from PIL import Image
+from PIL import Image, ImageDraw
 import numpy as np
 import sys
 import os
-from collections import Counter
 
+from bg_alpha import (DEFAULT_MAX_MEMORY_MB, compute_alpha, alpha_stats, alpha_from_distance,
+					  pack_rgb, unique_color_distances)
+from bg_detect import detect_background_colors
+from bg_flood import restrict_alpha
+from batch_engine import list_images, run_batch
+from decode_cache import load_rgba
+from output_cache import tool_version, cache_key, lookup, store
+from stage_profile import stage, profile_run
 
-def detect_background_color(img_array, sample_size=100):
+
+CACHE_VERSION = tool_version(__file__)
+
+# Tolerances tried by --sweep when none are given
+DEFAULT_SWEEP_TOLERANCES = (20, 30, 40, 50, 60)
+
+# Longest side of each contact sheet thumbnail (pixels)
+SWEEP_THUMB_SIZE = 256
+
+# Checkerboard behind the thumbnails, so transparency is visible
+SWEEP_CHECKER = ((96, 96, 96), (136, 136, 136))
+SWEEP_CHECKER_SIZE = 8
+
+# Height of the label under each thumbnail (pixels)
+SWEEP_LABEL_HEIGHT = 28
+
+
+def detect_background_color(img_array, strategy=('edges', 'corners')):
 	"""
 	Intelligently detect background color from image edges
 	
 	Args:
 		img_array: numpy array of image (RGBA)
-		sample_size: number of edge pixels to sample
+		strategy: bg_detect sampling strategy (default: full edges plus
+				  corner blocks, which are often solid background)
 	
 	Returns:
 		RGB tuple of most common background color
 	"""
-	height, width = img_array.shape[:2]
+	most_common_color, percentage = detect_background_colors(
+		img_array, strategy=strategy, top_n=1, min_percentage=0.0)[0]
 	
-	# Sample pixels from all four edges
-	edge_pixels = []
+	print(f"Background color detected: RGB{tuple(most_common_color)}")
+	print(f"Confidence: {percentage:.1f}% of edge pixels")
 	
-	# Top edge
-	edge_pixels.extend(img_array[0, :sample_size, :3].reshape(-1, 3).tolist())
-	# Bottom edge
-	edge_pixels.extend(img_array[-1, :sample_size, :3].reshape(-1, 3).tolist())
-	# Left edge  
-	edge_pixels.extend(img_array[:sample_size, 0, :3].reshape(-1, 3).tolist())
-	# Right edge
-	edge_pixels.extend(img_array[:sample_size, -1, :3].reshape(-1, 3).tolist())
-	
-	# Sample corners (often solid background)
-	edge_pixels.extend(img_array[0:10, 0:10, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[0:10, -10:, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[-10:, 0:10, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[-10:, -10:, :3].reshape(-1, 3).tolist())
-	
-	# Find most common color
-	color_counts = Counter(tuple(p) for p in edge_pixels)
-	most_common_color, count = color_counts.most_common(1)[0]
-	
-	total_samples = len(edge_pixels)
-	percentage = (count / total_samples) * 100
-	
-	print(f"Background color detected: RGB{most_common_color}")
-	print(f"Confidence: {percentage:.1f}% ({count}/{total_samples} edge pixels)")
-	
-	return np.array(most_common_color)
+	return most_common_color
 
 
 def find_all_background_colors(img_array, top_n=3):
@@ -62,97 +63,74 @@ def find_all_background_colors(img_array, top_n=3):
 	Returns:
 		List of (color, percentage) tuples
 	"""
-	height, width = img_array.shape[:2]
-	
-	# Sample more aggressively from edges
-	edge_pixels = []
-	edge_size = 50
+	# Only include colors covering > 1% of edge pixels
+	top_colors = detect_background_colors(img_array, strategy='edges', top_n=top_n,
+										  min_percentage=1.0)
 	
-	# All four edges
-	edge_pixels.extend(img_array[0, :, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[-1, :, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[:, 0, :3].reshape(-1, 3).tolist())
-	edge_pixels.extend(img_array[:, -1, :3].reshape(-1, 3).tolist())
+	for color, percentage in top_colors:
+		print(f"  Found color RGB{tuple(color)}: {percentage:.1f}%")
 	
-	color_counts = Counter(tuple(p) for p in edge_pixels)
-	total = len(edge_pixels)
+	return top_colors
+
+
+def background_colors(data, multi_color=True):
+	"""
+	Background colors to remove, as (color, percentage) tuples
 	
-	top_colors = []
-	for color, count in color_counts.most_common(top_n):
-		percentage = (count / total) * 100
-		if percentage > 1.0:  # Only include if > 1% of edge pixels
-			top_colors.append((np.array(color), percentage))
-			print(f"  Found color RGB{color}: {percentage:.1f}%")
+	Args:
+		data: numpy RGBA array
+		multi_color: Up to 5 edge colors instead of only the primary one
+	"""
+	if multi_color:
+		print("\nDetecting multiple background colors...")
+		return find_all_background_colors(data, top_n=5)
 	
-	return top_colors
+	print("\nDetecting primary background color...")
+	primary_bg = detect_background_color(data)
+	return [(primary_bg, 100.0)]
 
 
-def remove_background_advanced(input_path, output_path=None, tolerance=40, 
-							   multi_color=True, smooth_edges=True):
+def remove_background_array(data, tolerance=40, multi_color=True, smooth_edges=True,
+							max_memory_mb=DEFAULT_MAX_MEMORY_MB, flood=False, grid=None):
 	"""
-	Advanced background removal with multiple color detection
+	Remove the background of an RGBA array in place
 	
 	Args:
-		input_path: Input image path
-		output_path: Output path (default: adds '_transparent')
+		data: numpy RGBA array (modified in place)
 		tolerance: Color similarity threshold (30-60 recommended)
 		multi_color: Detect and remove multiple background colors
 		smooth_edges: Apply gradual alpha for anti-aliasing
+		max_memory_mb: Working memory budget for the alpha computation (MB)
+		flood: Only remove background connected to the image border
+		grid: With flood, (cols, rows) so every frame's border counts too
 	
 	Returns:
-		Path to output file
+		The same array
 	"""
 	
-	print(f"Loading: {input_path}")
-	img = Image.open(input_path).convert('RGBA')
-	data = np.array(img)
-	
 	height, width = data.shape[:2]
 	print(f"Image size: {width}x{height}")
 	
 	# Detect background colors
-	if multi_color:
-		print("\nDetecting multiple background colors...")
-		bg_colors = find_all_background_colors(data, top_n=5)
-	else:
-		print("\nDetecting primary background color...")
-		primary_bg = detect_background_color(data)
-		bg_colors = [(primary_bg, 100.0)]
-	
-	# Create alpha channel
-	alpha = np.ones((height, width), dtype=np.uint8) * 255
+	with stage('detect', height * width):
+		bg_colors = background_colors(data, multi_color)
 	
-	# Process each background color
+	# Report each background color
 	for bg_color, confidence in bg_colors:
 		print(f"\nRemoving color RGB{tuple(bg_color)} (confidence: {confidence:.1f}%)")
-		
-		r, g, b, a = data[:,:,0], data[:,:,1], data[:,:,2], data[:,:,3]
-		
-		# Calculate color difference from this background
-		diff = np.sqrt(
-			(r.astype(float) - bg_color[0]) ** 2 +
-			(g.astype(float) - bg_color[1]) ** 2 +
-			(b.astype(float) - bg_color[2]) ** 2
-		)
-		
-		if smooth_edges:
-			# Gradual alpha based on distance (anti-aliasing)
-			# Pixels closer to bg_color get lower alpha
-			fade_alpha = np.clip(255 * (diff / tolerance), 0, 255).astype(np.uint8)
-			# Keep minimum of current alpha and new fade alpha
-			alpha = np.minimum(alpha, fade_alpha)
-		else:
-			# Binary mask - either fully transparent or fully opaque
-			mask = diff <= tolerance
-			alpha[mask] = 0
 	
-	# Apply final alpha
-	data[:,:,3] = alpha
+	# Compute alpha band by band straight into the image's alpha channel,
+	# keeping the float working set within max_memory_mb
+	with stage('alpha', height * width):
+		alpha = compute_alpha(data, [color for color, _ in bg_colors], tolerance,
+							  smooth_edges=smooth_edges, max_memory_mb=max_memory_mb,
+							  out=data[:, :, 3])
+		if flood:
+			# Background-colored pixels enclosed by the sprite stay opaque
+			restrict_alpha(alpha, grid)
 	
 	# Stats
-	transparent = np.sum(alpha == 0)
-	semi = np.sum((alpha > 0) & (alpha < 255))
-	opaque = np.sum(alpha == 255)
+	transparent, semi, opaque = alpha_stats(alpha, max_memory_mb)
 	total = height * width
 	
 	print(f"\n✓ Processing complete:")
@@ -160,50 +138,192 @@ def remove_background_advanced(input_path, output_path=None, tolerance=40,
 	print(f"  Semi-transparent: {semi} ({semi/total*100:.1f}%)")
 	print(f"  Opaque pixels: {opaque} ({opaque/total*100:.1f}%)")
 	
-	# Create output image
-	result = Image.fromarray(data, 'RGBA')
+	return data
+
+
+def remove_background_advanced(input_path, output_path=None, tolerance=40, 
+							   multi_color=True, smooth_edges=True,
+							   max_memory_mb=DEFAULT_MAX_MEMORY_MB, use_cache=True,
+							   flood=False, grid=None):
+	"""
+	Advanced background removal with multiple color detection
+	
+	Args:
+		input_path: Input image path
+		output_path: Output path (default: adds '_transparent')
+		tolerance: Color similarity threshold (30-60 recommended)
+		multi_color: Detect and remove multiple background colors
+		smooth_edges: Apply gradual alpha for anti-aliasing
+		max_memory_mb: Working memory budget for the alpha computation (MB)
+		use_cache: Reuse a cached output if the input and settings are unchanged
+		flood: Only remove background connected to the image border
+		grid: With flood, (cols, rows) so every frame's border counts too
+	
+	Returns:
+		Path to output file
+	"""
 	
 	# Determine output path
 	if output_path is None:
 		base, ext = os.path.splitext(input_path)
 		output_path = f"{base}_transparent.png"
 	
+	if use_cache:
+		key = cache_key(input_path, 'remove_background_advanced', CACHE_VERSION, {
+			'tolerance': tolerance, 'multi_color': multi_color, 'smooth_edges': smooth_edges,
+			'flood': flood, 'grid': grid,
+		})
+		if lookup(key, output_path):
+			print(f"✓ Cache hit (input and settings unchanged): {output_path}")
+			return output_path
+	
+	print(f"Loading: {input_path}")
+	with stage('load') as info:
+		data = load_rgba(input_path)
+		info['pixels'] = data.shape[0] * data.shape[1]
+	
+	remove_background_array(data, tolerance, multi_color, smooth_edges, max_memory_mb, flood, grid)
+	
+	# Create output image
+	result = Image.fromarray(data, 'RGBA')
+	
 	# Save
-	result.save(output_path, 'PNG')
+	with stage('save', data.shape[0] * data.shape[1]):
+		result.save(output_path, 'PNG')
+	if use_cache:
+		store(key, output_path)
 	print(f"\n✓ Saved to: {output_path}")
 	
 	return output_path
 
 
-def batch_process(input_dir, output_dir=None, tolerance=40, multi_color=True):
-	"""Process all images in a directory"""
+def sweep_contact_sheet(thumb, distances, settings, stats):
+	"""
+	Contact sheet with one thumbnail per (tolerance, smooth_edges) setting
+	
+	Args:
+		thumb: (h, w, 4) uint8 downscaled image
+		distances: (h, w) background distance of every thumbnail pixel
+		settings: List of (tolerance, smooth_edges); smooth rows first
+		stats: (transparent, semi, opaque) percentages per setting
+	
+	Returns:
+		PIL RGB image: a row per edge mode, a column per tolerance
+	"""
+	height, width = thumb.shape[:2]
+	cell_width = max(width, 150)
+	tolerances = sorted({t for t, _ in settings})
+	modes = sorted({smooth for _, smooth in settings}, reverse=True)
+	
+	ys, xs = np.indices((height, width))
+	checker = np.array(SWEEP_CHECKER, dtype=np.float64)[
+		(ys // SWEEP_CHECKER_SIZE + xs // SWEEP_CHECKER_SIZE) % 2]
+	rgb = thumb[:, :, :3].astype(np.float64)
+	
+	sheet = Image.new('RGB', (cell_width * len(tolerances),
+							  (height + SWEEP_LABEL_HEIGHT) * len(modes)), (32, 32, 32))
+	draw = ImageDraw.Draw(sheet)
+	
+	for (tolerance, smooth), (transparent, semi, opaque) in zip(settings, stats):
+		alpha = alpha_from_distance(distances, tolerance, smooth)[..., None] / 255
+		cell = (rgb * alpha + checker * (1 - alpha)).round().astype(np.uint8)
+		
+		x = tolerances.index(tolerance) * cell_width
+		y = modes.index(smooth) * (height + SWEEP_LABEL_HEIGHT)
+		sheet.paste(Image.fromarray(cell, 'RGB'), (x, y))
+		draw.text((x + 4, y + height + 2), f"t={tolerance} {'smooth' if smooth else 'hard'}",
+				  fill=(255, 255, 255))
+		draw.text((x + 4, y + height + 14), f"T {transparent:.0f}%  S {semi:.0f}%  O {opaque:.0f}%",
+				  fill=(200, 200, 200))
+	
+	return sheet
+
+
+def sweep_tolerances(input_path, tolerances=DEFAULT_SWEEP_TOLERANCES, output_path=None,
+					 multi_color=True, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+	"""
+	Try many tolerances at once, smooth and hard edges, in a single pass
+	
+	The image is decoded, its background detected and the distance of
+	every distinct color computed once; each setting then only maps those
+	distances to alpha. Prints a table of transparent / semi-transparent /
+	opaque percentages and saves a contact sheet.
+	
+	Args:
+		input_path: Input image path
+		tolerances: Tolerances to try
+		output_path: Contact sheet path (default: adds '_sweep')
+		multi_color: Detect and remove multiple background colors
+		max_memory_mb: Working memory budget (MB)
+	
+	Returns:
+		List of (tolerance, smooth_edges, transparent %, semi %, opaque %)
+	"""
+	if output_path is None:
+		base, ext = os.path.splitext(input_path)
+		output_path = f"{base}_sweep.png"
+	
+	print(f"Loading: {input_path}")
+	with stage('load') as info:
+		data = load_rgba(input_path)
+		info['pixels'] = data.shape[0] * data.shape[1]
+	height, width = data.shape[:2]
+	total = height * width
+	
+	with stage('detect', total):
+		bg_colors = [color for color, _ in background_colors(data, multi_color)]
+	
+	with stage('distance', total):
+		colors, counts, distances = unique_color_distances(data, bg_colors, max_memory_mb)
+	
+	settings = [(t, smooth) for smooth in (True, False) for t in sorted(tolerances)]
+	stats = []
+	with stage('alpha', total * len(settings)):
+		for tolerance, smooth in settings:
+			alpha = alpha_from_distance(distances, tolerance, smooth)
+			transparent = int(counts[alpha == 0].sum())
+			opaque = int(counts[alpha == 255].sum())
+			stats.append((transparent / total * 100, (total - transparent - opaque) / total * 100,
+						  opaque / total * 100))
+	
+	print(f"\n{'Tolerance':>9}  {'Edges':6}  {'Transparent':>11}  {'Semi':>6}  {'Opaque':>6}")
+	for (tolerance, smooth), (transparent, semi, opaque) in zip(settings, stats):
+		print(f"{tolerance:>9}  {'smooth' if smooth else 'hard':6}  "
+			  f"{transparent:10.1f}%  {semi:5.1f}%  {opaque:5.1f}%")
+	
+	with stage('save', total):
+		step = max(1, -(-max(height, width) // SWEEP_THUMB_SIZE))
+		thumb = data[::step, ::step]
+		thumb_distances = distances[np.searchsorted(colors, pack_rgb(thumb))]
+		sweep_contact_sheet(thumb, thumb_distances, settings, stats).save(output_path, 'PNG')
+	print(f"\n✓ Contact sheet saved to: {output_path}")
+	
+	return [(t, smooth, *s) for (t, smooth), s in zip(settings, stats)]
+
+
+def batch_process(input_dir, output_dir=None, tolerance=40, multi_color=True,
+				  max_memory_mb=DEFAULT_MAX_MEMORY_MB, workers=None, use_cache=True,
+				  flood=False, grid=None):
+	"""Process all images in a directory on a pool of worker processes"""
 	
 	if output_dir and not os.path.exists(output_dir):
 		os.makedirs(output_dir)
 	
-	processed = 0
-	for filename in os.listdir(input_dir):
-		if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-			input_path = os.path.join(input_dir, filename)
-			
-			if output_dir:
-				output_name = os.path.splitext(filename)[0] + '_transparent.png'
-				output_path = os.path.join(output_dir, output_name)
-			else:
-				output_path = None
-			
-			try:
-				print(f"\n{'='*60}")
-				print(f"Processing: {filename}")
-				print('='*60)
-				remove_background_advanced(input_path, output_path, tolerance, multi_color)
-				processed += 1
-			except Exception as e:
-				print(f"✗ Error processing {filename}: {e}")
-	
-	print(f"\n{'='*60}")
-	print(f"✓ Batch complete: Processed {processed} images")
-	print('='*60)
+	jobs = []
+	for filename in list_images(input_dir):
+		input_path = os.path.join(input_dir, filename)
+		
+		if output_dir:
+			output_name = os.path.splitext(filename)[0] + '_transparent.png'
+			output_path = os.path.join(output_dir, output_name)
+		else:
+			output_path = None
+		
+		jobs.append((input_path, (output_path, tolerance, multi_color),
+					 {'max_memory_mb': max_memory_mb, 'use_cache': use_cache,
+					  'flood': flood, 'grid': grid}))
+	
+	return run_batch(remove_background_advanced, jobs, workers=workers)
 
 
 if __name__ == "__main__":
@@ -213,24 +333,59 @@ if __name__ == "__main__":
 		print("\nUsage:")
 		print("  python fix_transparency_v2.py <image_path> [options]")
 		print("  python fix_transparency_v2.py --batch <directory> [options]")
+		print("  python fix_transparency_v2.py --sweep <image_path> [t1,t2,...] [options]")
 		print()
 		print("Options:")
 		print("  -t, --tolerance <value>    Color tolerance (30-60, default: 40)")
 		print("  -s, --single-color         Detect only primary bg color")
 		print("  -h, --hard-edges           No gradient/smooth edges")
+		print(f"  -m, --max-memory <MB>      Working memory cap (default: {DEFAULT_MAX_MEMORY_MB})")
+		print("  -j, --workers <n>          Batch worker processes (default: all cores)")
+		print("  --no-cache                 Always reprocess, bypassing the output cache")
+		print("  --flood                    Only remove background connected to the image border")
+		print("  --frames <cols>x<rows>     With --flood, every frame's border counts too")
+		print("  --profile <path>           Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet                    No console output")
 		print()
 		print("Examples:")
 		print("  python fix_transparency_v2.py knight.png")
 		print("  python fix_transparency_v2.py knight.png -t 50")
 		print("  python fix_transparency_v2.py --batch ./sprites -t 45")
+		print("  python fix_transparency_v2.py --batch ./sprites -t 45 -j 16")
 		print("  python fix_transparency_v2.py sprite.png --single-color --hard-edges")
+		print("  python fix_transparency_v2.py huge_sheet.png -m 128")
+		print("  python fix_transparency_v2.py --sweep knight.png 25,35,45,55")
+		print("  python fix_transparency_v2.py knight_sheet.png --flood --frames 6x4")
 		sys.exit(1)
 	
 	# Parse arguments
 	args = sys.argv[1:]
 	batch_mode = '--batch' in args
 	
-	if batch_mode:
+	flood = '--flood' in args
+	grid = None
+	if '--frames' in args:
+		grid = tuple(int(n) for n in args[args.index('--frames') + 1].lower().split('x'))
+	
+	if '--sweep' in args:
+		sweep_idx = args.index('--sweep')
+		input_file = args[sweep_idx + 1]
+		
+		tolerances = DEFAULT_SWEEP_TOLERANCES
+		if sweep_idx + 2 < len(args) and not args[sweep_idx + 2].startswith('-'):
+			tolerances = [int(t) for t in args[sweep_idx + 2].split(',')]
+		
+		max_memory_mb = DEFAULT_MAX_MEMORY_MB
+		if '-m' in args or '--max-memory' in args:
+			m_idx = args.index('-m') if '-m' in args else args.index('--max-memory')
+			max_memory_mb = float(args[m_idx + 1])
+		
+		with profile_run(args):
+			sweep_tolerances(input_file, tolerances,
+							 multi_color='--single-color' not in args and '-s' not in args,
+							 max_memory_mb=max_memory_mb)
+	
+	elif batch_mode:
 		batch_idx = args.index('--batch')
 		directory = args[batch_idx + 1] if batch_idx + 1 < len(args) else None
 		
@@ -249,7 +404,20 @@ if __name__ == "__main__":
 		if '--single-color' in args or '-s' in args:
 			multi_color = False
 		
-		batch_process(directory, tolerance=tolerance, multi_color=multi_color)
+		max_memory_mb = DEFAULT_MAX_MEMORY_MB
+		if '-m' in args or '--max-memory' in args:
+			m_idx = args.index('-m') if '-m' in args else args.index('--max-memory')
+			max_memory_mb = float(args[m_idx + 1])
+		
+		workers = None
+		if '-j' in args or '--workers' in args:
+			j_idx = args.index('-j') if '-j' in args else args.index('--workers')
+			workers = int(args[j_idx + 1])
+		
+		with profile_run(args):
+			batch_process(directory, tolerance=tolerance, multi_color=multi_color,
+						  max_memory_mb=max_memory_mb, workers=workers,
+						  use_cache='--no-cache' not in args, flood=flood, grid=grid)
 	
 	else:
 		# Single file mode
@@ -270,5 +438,14 @@ if __name__ == "__main__":
 		if '--hard-edges' in args or '-h' in args:
 			smooth_edges = False
 		
-		remove_background_advanced(input_file, tolerance=tolerance, 
-								   multi_color=multi_color, smooth_edges=smooth_edges)
+		max_memory_mb = DEFAULT_MAX_MEMORY_MB
+		if '-m' in args or '--max-memory' in args:
+			m_idx = args.index('-m') if '-m' in args else args.index('--max-memory')
+			max_memory_mb = float(args[m_idx + 1])
+		
+		with profile_run(args):
+			remove_background_advanced(input_file, tolerance=tolerance, 
+									   multi_color=multi_color, smooth_edges=smooth_edges,
+									   max_memory_mb=max_memory_mb,
+									   use_cache='--no-cache' not in args,
+									   flood=flood, grid=grid)
@@ -0,0 +1,267 @@
+"""
+Frame Deduplicator
+Finds identical, nearly identical and mirrored frames of a character
+
+Idle/breathing loops repeat frames and east/west rotations are often
+mirror images, yet every copy is stored and loaded on its own. Frames are
+hashed exactly (invisible pixels ignored), optionally compared within a
+per-channel pixel difference threshold, and checked against the
+horizontally flipped hashes of earlier frames. Duplicates become aliases
+of the first frame they match:
+
+    {"source": <frame index>, "flip_h": <bool>, "exact": <bool>}
+
+atlas_packer.py --dedup lets duplicates share one atlas region. An
+AtlasTexture cannot mirror its region, so flip aliases are only recorded
+in the sidecar for the game to use with flip_h.
+
+Usage:
+    python frame_dedup.py <bundle.zip|character_dir> [...] [options]
+"""
+
+import hashlib
+import json
+import numpy as np
+import os
+import sys
+
+from pixellab_bundle import frame_pixels, load_character
+from stage_profile import stage, profile_run
+
+
+# Bytes per pixel of an uncompressed RGBA8 texture
+TEXTURE_BYTES_PER_PIXEL = 4
+
+
+def canonical(img_array):
+	"""RGBA copy with the color of fully transparent pixels zeroed"""
+	canon = img_array.copy()
+	canon[canon[:, :, 3] == 0] = 0
+	return canon
+
+
+def frame_hash(canon):
+	"""Exact content hash of a canonical frame, including its size"""
+	digest = hashlib.sha1(np.ascontiguousarray(canon).tobytes())
+	digest.update(str(canon.shape).encode('ascii'))
+	return digest.hexdigest()
+
+
+def _near_match(canon, candidates, threshold):
+	"""Index into candidates of the first frame within threshold, or None"""
+	if not candidates:
+		return None
+	stack = np.stack(candidates).astype(np.int16)
+	diff = np.abs(stack - canon.astype(np.int16)).reshape(len(candidates), -1).max(axis=1)
+	within = np.flatnonzero(diff <= threshold)
+	return int(within[0]) if len(within) else None
+
+
+def find_duplicates(frames, threshold=0, flips=True):
+	"""
+	Alias every duplicate frame to the first frame it matches
+
+	Args:
+		frames: Frame dicts with an 'image' RGBA array
+		threshold: Max per-channel difference for near duplicates (0: exact only)
+		flips: Also match horizontally mirrored frames
+
+	Returns:
+		Per frame alias dict (source, flip_h, exact) or None for unique frames
+	"""
+	aliases = [None] * len(frames)
+	# hash -> unique frame index, and shape -> unique indices/canonical arrays
+	by_hash = {}
+	by_shape = {}
+
+	for i, frame in enumerate(frames):
+		canon = canonical(frame['image'])
+		mirrored = canon[:, ::-1]
+
+		key = frame_hash(canon)
+		if key in by_hash:
+			aliases[i] = {'source': by_hash[key], 'flip_h': False, 'exact': True}
+			continue
+
+		if flips:
+			flipped_key = frame_hash(mirrored)
+			if flipped_key in by_hash:
+				aliases[i] = {'source': by_hash[flipped_key], 'flip_h': True, 'exact': True}
+				continue
+
+		indices, arrays = by_shape.setdefault(canon.shape, ([], []))
+
+		if threshold > 0:
+			match = _near_match(canon, arrays, threshold)
+			if match is not None:
+				aliases[i] = {'source': indices[match], 'flip_h': False, 'exact': False}
+				continue
+			if flips:
+				match = _near_match(mirrored, arrays, threshold)
+				if match is not None:
+					aliases[i] = {'source': indices[match], 'flip_h': True, 'exact': False}
+					continue
+
+		by_hash[key] = i
+		indices.append(i)
+		arrays.append(canon)
+
+	return aliases
+
+
+def dedup_report(frames, aliases):
+	"""
+	Count duplicates and the texture area and memory they no longer need
+
+	Args:
+		frames: Frame dicts with an 'image' RGBA array
+		aliases: Result of find_duplicates
+
+	Returns:
+		Dict with frame counts, total/saved pixel area and saved texture bytes
+		(uncompressed RGBA8); flip aliases count as saved
+	"""
+	report = {'frames': len(frames), 'unique': 0, 'exact': 0, 'near': 0, 'flipped': 0,
+			  'area': 0, 'area_saved': 0}
+
+	for frame, alias in zip(frames, aliases):
+		height, width = frame['image'].shape[:2]
+		report['area'] += width * height
+		if alias is None:
+			report['unique'] += 1
+			continue
+		report['exact' if alias['exact'] else 'near'] += 1
+		if alias['flip_h']:
+			report['flipped'] += 1
+		report['area_saved'] += width * height
+
+	report['bytes'] = report['area'] * TEXTURE_BYTES_PER_PIXEL
+	report['bytes_saved'] = report['area_saved'] * TEXTURE_BYTES_PER_PIXEL
+	return report
+
+
+def print_report(name, report):
+	"""Print one character's dedup summary"""
+	area = max(report['area'], 1)
+	print(f"{name}: {report['frames']} frames, {report['unique']} unique "
+		  f"({report['exact']} exact, {report['near']} near, {report['flipped']} mirrored duplicates)")
+	print(f"  Area saved:  {report['area_saved']:,} / {report['area']:,} px "
+		  f"({report['area_saved'] / area * 100:.1f}%)")
+	print(f"  Bytes saved: {report['bytes_saved']:,} / {report['bytes']:,} (RGBA8)")
+
+
+def write_aliases(path, frames, aliases, report=None):
+	"""
+	Write the alias sidecar, keyed by frame path from metadata.json
+
+	Each duplicate maps to its source frame's path and whether it is mirrored.
+	"""
+	entries = {}
+	for frame, alias in zip(frames, aliases):
+		if alias is not None:
+			entries[frame['path']] = {
+				'source': frames[alias['source']]['path'],
+				'flip_h': alias['flip_h'],
+				'exact': alias['exact'],
+			}
+
+	data = {'aliases': entries}
+	if report is not None:
+		data['report'] = report
+
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump(data, f, indent=2)
+
+
+def character_name(source):
+	"""Character name of a bundle zip or directory"""
+	name = os.path.basename(source.rstrip('/\\'))
+	if name.lower().endswith('.zip'):
+		name = name[:-4]
+	return name
+
+
+def dedup_character(source, threshold=0, flips=True, output_path=None):
+	"""
+	Find duplicate frames of one character and print the report
+
+	Args:
+		source: Bundle zip or extracted character directory
+		threshold: Max per-channel difference for near duplicates
+		flips: Also match mirrored frames
+		output_path: Optional alias sidecar path
+
+	Returns:
+		Report dict
+	"""
+	_, frames = load_character(source)
+	with stage('dedup', frame_pixels(frames)):
+		aliases = find_duplicates(frames, threshold, flips)
+	report = dedup_report(frames, aliases)
+
+	print_report(character_name(source), report)
+
+	if output_path is not None:
+		write_aliases(output_path, frames, aliases, report)
+		print(f"  ✓ Aliases: {output_path}")
+
+	return report
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Frame Deduplicator")
+		print("="*60)
+		print("\nUsage:")
+		print("  python frame_dedup.py <bundle.zip|character_dir> [...] [options]")
+		print()
+		print("Options:")
+		print("  --threshold <v>   Max per-channel difference for near duplicates (default: 0)")
+		print("  --no-flip         Do not match mirrored frames")
+		print("  -o <dir>          Write <character>_aliases.json sidecars into <dir>")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python frame_dedup.py assets/sprites/player/penitent_knight")
+		print("  python frame_dedup.py assets/sprites/enemies/*.zip --threshold 8")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	threshold = 0
+	output_dir = None
+	sources = []
+
+	i = 0
+	while i < len(args):
+		if args[i] == '--threshold':
+			threshold = int(args[i + 1])
+			i += 2
+		elif args[i] == '-o':
+			output_dir = args[i + 1]
+			i += 2
+		elif args[i] == '--profile':
+			i += 2
+		elif args[i].startswith('--'):
+			i += 1
+		else:
+			sources.append(args[i])
+			i += 1
+
+	if output_dir:
+		os.makedirs(output_dir, exist_ok=True)
+
+	totals = {'area': 0, 'area_saved': 0, 'bytes': 0, 'bytes_saved': 0}
+	with profile_run(args):
+		for source in sources:
+			output_path = None
+			if output_dir:
+				output_path = os.path.join(output_dir, f"{character_name(source)}_aliases.json")
+			report = dedup_character(source, threshold, '--no-flip' not in args, output_path)
+			for key in totals:
+				totals[key] += report[key]
+
+		if len(sources) > 1:
+			print("="*60)
+			print(f"Total: {totals['area_saved']:,} / {totals['area']:,} px and "
+				  f"{totals['bytes_saved']:,} / {totals['bytes']:,} bytes saved")
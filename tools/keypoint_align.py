@@ -0,0 +1,270 @@
+"""
+Keypoint Aligner
+Aligns a character's frames on skeleton keypoints from metadata.json
+
+PixelLab stores 18 normalized keypoints (NOSE, NECK, LEFT HIP, ...) for
+rotations and animation frames. They are loaded once into a
+(frames, 18, 2) table; the chosen anchor (hip midpoint, feet, neck) of
+every frame is moved to one common position, and all frames are shifted
+together in one pass. Only frames without keypoints fall back to pixel
+analysis of their alpha channel.
+
+Keypoints in the written metadata.json are shifted along with the frames.
+
+Usage:
+    python keypoint_align.py <bundle.zip|character_dir> [options]
+"""
+
+from PIL import Image
+import json
+import numpy as np
+import os
+import sys
+
+from fix_sprite_alignment import get_sprite_bounds, shift_frames
+from pixellab_bundle import METADATA_NAME, frame_pixels, load_character, member_path
+from stage_profile import stage, profile_run
+
+
+KEYPOINT_LABELS = (
+	'NOSE', 'NECK',
+	'RIGHT SHOULDER', 'RIGHT ELBOW', 'RIGHT ARM',
+	'LEFT SHOULDER', 'LEFT ELBOW', 'LEFT ARM',
+	'RIGHT HIP', 'RIGHT KNEE', 'RIGHT LEG',
+	'LEFT HIP', 'LEFT KNEE', 'LEFT LEG',
+	'RIGHT EYE', 'LEFT EYE', 'RIGHT EAR', 'LEFT EAR',
+)
+LABEL_INDEX = {label: i for i, label in enumerate(KEYPOINT_LABELS)}
+
+# Keypoints averaged into each anchor
+ANCHORS = {
+	'hips': ('LEFT HIP', 'RIGHT HIP'),
+	'feet': ('LEFT LEG', 'RIGHT LEG'),
+	'neck': ('NECK',),
+}
+
+
+def keypoint_key(frame):
+	"""(section, key, frame index) of a frame in metadata['keypoints']"""
+	if frame['animation'] is None:
+		return 'rotations', frame['direction'], 0
+	return 'animations', f"{frame['animation']}_{frame['direction']}", frame['index']
+
+
+def keypoint_table(metadata, frames):
+	"""
+	Normalized keypoints of every frame as one array
+
+	Args:
+		metadata: Parsed metadata.json
+		frames: Frame dicts from frame_list / load_character
+
+	Returns:
+		(len(frames), len(KEYPOINT_LABELS), 2) float array of (x, y) in
+		0..1, NaN where a frame or label has no keypoint
+	"""
+	keypoints = metadata.get('keypoints', {})
+	table = np.full((len(frames), len(KEYPOINT_LABELS), 2), np.nan)
+
+	for i, frame in enumerate(frames):
+		section, key, index = keypoint_key(frame)
+		per_frame = keypoints.get(section, {}).get(key, [])
+		if index >= len(per_frame):
+			continue
+		for point in per_frame[index]:
+			j = LABEL_INDEX.get(point.get('label'))
+			if j is not None:
+				table[i, j] = (point['x'], point['y'])
+
+	return table
+
+
+def keypoint_anchors(table, anchor='hips'):
+	"""
+	Anchor of every frame from the keypoint table
+
+	Returns:
+		(len(frames), 2) normalized (x, y), NaN for frames missing the anchor
+	"""
+	indices = [LABEL_INDEX[label] for label in ANCHORS[anchor]]
+	points = table[:, indices]
+	anchors = points.mean(axis=1)
+	# Frames missing any anchor keypoint are left to pixel analysis
+	anchors[np.isnan(points).any(axis=(1, 2))] = np.nan
+	return anchors
+
+
+def pixel_anchor(img_array, anchor='hips'):
+	"""
+	Anchor estimated from pixels, for frames without keypoints
+
+	'feet' is the bottom center of the content box; other anchors use the
+	alpha-weighted centroid.
+
+	Returns:
+		(x, y) in pixels, or None for an empty frame
+	"""
+	bounds = get_sprite_bounds(img_array)
+	if bounds is None:
+		return None
+
+	if anchor == 'feet':
+		min_x, min_y, max_x, max_y = bounds
+		return (min_x + max_x) / 2, float(max_y)
+
+	alpha = img_array[:, :, 3].astype(np.float64)
+	ys, xs = np.indices(alpha.shape)
+	total = alpha.sum()
+	return (xs * alpha).sum() / total, (ys * alpha).sum() / total
+
+
+def frame_anchors(metadata, frames, anchor='hips'):
+	"""
+	Anchor of every frame in pixels, from keypoints where available
+
+	Returns:
+		((len(frames), 2) float array, list of sources per frame:
+		'keypoints', 'pixels' or None for empty frames without keypoints)
+	"""
+	normalized = keypoint_anchors(keypoint_table(metadata, frames), anchor)
+	sizes = np.array([(f['image'].shape[1], f['image'].shape[0]) for f in frames], dtype=np.float64)
+	anchors = normalized * sizes
+	sources = ['keypoints'] * len(frames)
+
+	for i in np.flatnonzero(np.isnan(anchors).any(axis=1)):
+		point = pixel_anchor(frames[i]['image'], anchor)
+		if point is None:
+			sources[i] = None
+		else:
+			anchors[i] = point
+			sources[i] = 'pixels'
+
+	return anchors, sources
+
+
+def shift_keypoints(metadata, frames, shifts):
+	"""Move every frame's keypoints in metadata by its pixel shift"""
+	keypoints = metadata.get('keypoints', {})
+	for frame, (dx, dy) in zip(frames, shifts):
+		section, key, index = keypoint_key(frame)
+		per_frame = keypoints.get(section, {}).get(key, [])
+		if index >= len(per_frame):
+			continue
+		height, width = frame['image'].shape[:2]
+		for point in per_frame[index]:
+			point['x'] += dx / width
+			point['y'] += dy / height
+
+
+def align_frames(metadata, frames, anchor='hips'):
+	"""
+	Shift all frames so their anchors meet at one position
+
+	The target is the median anchor of the character's frames with
+	content; shifts are whole pixels. Frames of the same size are shifted
+	together in one pass.
+
+	Returns:
+		((len(frames), 2) int shifts, list of anchor sources)
+	"""
+	anchors, sources = frame_anchors(metadata, frames, anchor)
+	found = np.array([s is not None for s in sources])
+	shifts = np.zeros((len(frames), 2), dtype=int)
+	if not found.any():
+		return shifts, sources
+
+	target = np.median(anchors[found], axis=0)
+	shifts[found] = np.rint(target - anchors[found]).astype(int)
+
+	# Frames as the columns of a one-row sheet, one group per frame size
+	groups = {}
+	for i, frame in enumerate(frames):
+		groups.setdefault(frame['image'].shape, []).append(i)
+
+	for indices in groups.values():
+		stack = np.stack([frames[i]['image'] for i in indices])  # (n, h, w, 4)
+		grid = stack.transpose(1, 0, 2, 3)[None]
+		aligned = shift_frames(grid, shifts[indices, 0][None], shifts[indices, 1][None])
+		for k, i in enumerate(indices):
+			frames[i]['image'] = aligned[0, :, k]
+
+	return shifts, sources
+
+
+def align_bundle(source, output_dir=None, anchor='hips'):
+	"""
+	Align a character's frames on keypoints and write them out
+
+	Args:
+		source: Bundle zip or extracted character directory
+		output_dir: Output directory (default: <bundle>_aligned)
+		anchor: 'hips', 'feet' or 'neck'
+
+	Returns:
+		Output directory
+	"""
+	if anchor not in ANCHORS:
+		raise ValueError(f"Unknown anchor: {anchor!r} (expected one of {tuple(ANCHORS)})")
+
+	if output_dir is None:
+		base = source.rstrip('/\\')
+		if base.lower().endswith('.zip'):
+			base = base[:-4]
+		output_dir = base + '_aligned'
+
+	print(f"Loading: {source}")
+	metadata, frames = load_character(source)
+	with stage('align', frame_pixels(frames)):
+		shifts, sources = align_frames(metadata, frames, anchor)
+		shift_keypoints(metadata, frames, shifts)
+
+	print(f"Anchor: {anchor}")
+	for frame, (dx, dy), found in zip(frames, shifts, sources):
+		print(f"  {frame['path']}: ({dx:+d}, {dy:+d}) from {found or 'empty frame'}")
+
+	# Rejects frame paths outside output_dir before anything is written
+	output_paths = [member_path(output_dir, frame['path']) for frame in frames]
+	with stage('save', frame_pixels(frames)):
+		for frame, output_path in zip(frames, output_paths):
+			os.makedirs(os.path.dirname(output_path), exist_ok=True)
+			Image.fromarray(frame['image'], 'RGBA').save(output_path, 'PNG')
+
+	with open(os.path.join(output_dir, METADATA_NAME), 'w', encoding='utf-8') as f:
+		json.dump(metadata, f, indent=2)
+
+	print(f"✓ {len(frames)} frames aligned ({sources.count('keypoints')} from keypoints, "
+		  f"{sources.count('pixels')} from pixels) -> {output_dir}")
+
+	return output_dir
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Keypoint Aligner")
+		print("="*60)
+		print("\nUsage:")
+		print("  python keypoint_align.py <bundle.zip|character_dir> [options]")
+		print()
+		print("Options:")
+		print("  -o <dir>          Output directory (default: <bundle>_aligned)")
+		print(f"  --anchor <name>   {' | '.join(ANCHORS)} (default: hips)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python keypoint_align.py assets/sprites/bosses/blood_wraith")
+		print("  python keypoint_align.py assets/sprites/enemies/ghoul.zip --anchor feet")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	source = args[0]
+	output_dir = None
+	anchor = 'hips'
+
+	if '-o' in args:
+		output_dir = args[args.index('-o') + 1]
+	if '--anchor' in args:
+		anchor = args[args.index('--anchor') + 1]
+
+	with profile_run(args):
+		align_bundle(source, output_dir, anchor)
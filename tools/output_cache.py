@@ -0,0 +1,164 @@
+"""
+Incremental Output Cache
+Persistent on-disk cache of processed sprites, keyed by content
+
+The key combines the input file's content hash, the tool version (a hash
+of the tool's source code) and every parameter that affects the output.
+A hit copies the cached PNG to the requested output path instead of
+recomputing it. The cache is kept under a size limit by evicting the
+least recently used entries.
+
+Location: tools/.sprite_cache (override with SPRITE_CACHE_DIR)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+	'SPRITE_CACHE_DIR',
+	os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sprite_cache'),
+)
+
+# Maximum total size of cached outputs (MB)
+DEFAULT_MAX_CACHE_MB = int(os.environ.get('SPRITE_CACHE_MB', 1024))
+
+# Shared modules whose code affects every tool's output
+SHARED_SOURCES = ('bg_alpha.py', 'bg_detect.py', 'bg_flood.py', 'bg_rules.py')
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_hash(path):
+	"""SHA-256 of a file's content"""
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+def tool_version(*source_files):
+	"""
+	Version string for a tool: hash of the source code that produces its output
+
+	Args:
+		source_files: Paths of the tool script (and any extra modules it uses);
+					  the SHARED_SOURCES modules are always included
+
+	Returns:
+		Short hex version string
+	"""
+	tools_dir = os.path.dirname(os.path.abspath(__file__))
+	shared = [os.path.join(tools_dir, name) for name in SHARED_SOURCES]
+
+	digest = hashlib.sha256()
+	for path in list(source_files) + shared:
+		digest.update(os.path.basename(path).encode())
+		with open(path, 'rb') as f:
+			digest.update(f.read())
+	return digest.hexdigest()[:16]
+
+
+def cache_key(input_path, tool, version, params):
+	"""
+	Cache key for one tool invocation
+
+	Args:
+		input_path: Input image path
+		tool: Tool name (e.g. 'process_sprite')
+		version: Tool version from tool_version
+		params: Dict of every parameter that affects the output
+
+	Returns:
+		Hex key string
+	"""
+	payload = json.dumps({
+		'input': file_hash(input_path),
+		'tool': tool,
+		'version': version,
+		'params': params,
+	}, sort_keys=True, default=str)
+	return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _entry_path(key, cache_dir):
+	return os.path.join(cache_dir, key[:2], key + '.png')
+
+
+def lookup(key, output_path, cache_dir=DEFAULT_CACHE_DIR):
+	"""
+	Copy a cached output to output_path if present
+
+	Returns:
+		True on a cache hit
+	"""
+	entry = _entry_path(key, cache_dir)
+	if not os.path.exists(entry):
+		return False
+
+	try:
+		# Copy rather than hard link: tools overwrite outputs in place,
+		# which would corrupt a linked cache entry
+		shutil.copyfile(entry, output_path)
+		# Mark as recently used for LRU eviction
+		os.utime(entry)
+	except OSError:
+		return False
+
+	return True
+
+
+def store(key, output_path, cache_dir=DEFAULT_CACHE_DIR, max_cache_mb=DEFAULT_MAX_CACHE_MB):
+	"""Add a freshly written output to the cache, then enforce the size limit"""
+	entry = _entry_path(key, cache_dir)
+	os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+	# Write under a temporary name so concurrent readers never see partial files
+	tmp = f"{entry}.{os.getpid()}.tmp"
+	shutil.copyfile(output_path, tmp)
+	os.replace(tmp, entry)
+
+	evict(max_cache_mb, cache_dir)
+
+
+def evict(max_cache_mb=DEFAULT_MAX_CACHE_MB, cache_dir=DEFAULT_CACHE_DIR, extension='.png'):
+	"""
+	Delete least recently used entries until the cache fits max_cache_mb
+
+	Only files ending in extension count as entries.
+
+	Returns:
+		Number of bytes freed
+	"""
+	if not os.path.isdir(cache_dir):
+		return 0
+
+	entries = []
+	for root, _, files in os.walk(cache_dir):
+		for name in files:
+			if not name.endswith(extension):
+				continue
+			path = os.path.join(root, name)
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, path))
+
+	total = sum(size for _, size, _ in entries)
+	limit = max_cache_mb * 1024 * 1024
+	freed = 0
+
+	for _, size, path in sorted(entries):
+		if total - freed <= limit:
+			break
+		try:
+			os.remove(path)
+			freed += size
+		except OSError:
+			pass
+
+	return freed
@@ -0,0 +1,310 @@
+"""
+Pixel Grid Detector
+Recovers the native resolution of upscaled, blurred pixel art
+
+Generated pixel art arrives upscaled by a non-integer factor with soft
+pixel edges; resizing it again with NEAREST stacks artifacts on top. The
+art's pixel pitch and phase are estimated per axis from the edge profile
+(summed color differences between neighbouring columns/rows): edges of
+art pixels repeat every `pitch` pixels, so the profile's Fourier response
+at frequency 1/pitch peaks there, and its angle gives the phase.
+
+Each art pixel is then rebuilt from samples in the middle of its cell
+(away from the blurred edges) by per-channel median (default) or most
+common color, and can be re-upscaled by an exact integer factor with
+repeat.
+
+Usage:
+    python pixel_grid.py <image> [options]
+"""
+
+from PIL import Image
+import numpy as np
+import os
+import sys
+
+from png_output import save_png
+from stage_profile import stage, profile_run
+
+
+# Pitch search range and coarse step in source pixels; the best coarse
+# pitch is refined with a step REFINE_STEPS times finer
+MIN_PITCH = 2.0
+MAX_PITCH = 64.0
+PITCH_STEP = 0.02
+REFINE_STEPS = 40
+
+# Harmonics (pitch / 2, pitch / 3, ...) respond as strongly as the pitch
+# itself; the largest pitch peak scoring within this share of the best wins
+HARMONIC_TOLERANCE = 0.85
+
+# Below this score there is no clear grid: the image is taken to be at
+# native resolution already (pitch 1)
+MIN_GRID_SCORE = 0.45
+
+# Candidate pitches evaluated per numpy call (bounds the working memory)
+PITCH_CHUNK_ELEMENTS = 1 << 21
+
+# Largest number of samples per axis taken inside each cell
+MAX_CELL_SAMPLES = 5
+
+
+def edge_profile(rgba, axis):
+	"""
+	Summed color change across every column (axis=1) or row (axis=0) boundary
+
+	Returns:
+		1D float array; entry i is the edge strength between pixel i and i + 1
+	"""
+	data = rgba.astype(np.float32)
+	# Transparent pixels contribute their alpha change only
+	data[..., :3] *= data[..., 3:4] / 255
+	diff = np.abs(np.diff(data, axis=axis)).sum(axis=2)
+	return diff.sum(axis=1 - axis)
+
+
+def _responses(profile, pitches):
+	"""Normalized Fourier response of the profile at frequency 1 / pitch, per pitch"""
+	# Boundary between pixel i and i + 1 sits at coordinate i + 1
+	positions = np.arange(1, len(profile) + 1, dtype=np.float64)
+	total = profile.sum()
+	chunk = max(1, PITCH_CHUNK_ELEMENTS // len(profile))
+
+	response = np.empty(len(pitches), dtype=np.complex128)
+	for start in range(0, len(pitches), chunk):
+		angles = 2 * np.pi * positions[None, :] / pitches[start:start + chunk, None]
+		response[start:start + chunk] = np.exp(-1j * angles) @ profile / total
+	return response
+
+
+def estimate_pitch(profile, min_pitch=MIN_PITCH, max_pitch=MAX_PITCH, step=PITCH_STEP):
+	"""
+	Pitch and phase of a periodic edge profile
+
+	Args:
+		profile: Edge profile from edge_profile
+		min_pitch, max_pitch, step: Coarse pitch search range
+
+	Returns:
+		(pitch, phase, score): art pixel boundaries lie at phase + k * pitch
+		(in source pixel coordinates); score is 0..1, higher means a
+		clearer grid. Pitch is 1.0 when no grid scores MIN_GRID_SCORE,
+		unless min_pitch == max_pitch forces the pitch.
+	"""
+	profile = profile.astype(np.float64)
+	if profile.sum() <= 0:
+		return 1.0, 0.0, 0.0
+
+	max_pitch = max(min(max_pitch, len(profile) / 2), min_pitch)
+	pitches = np.arange(min_pitch, max_pitch + step / 2, step)
+	scores = np.abs(_responses(profile, pitches))
+
+	# Local maxima of the score curve; among the strong ones the largest
+	# pitch is the fundamental, the others are its harmonics
+	padded = np.concatenate(([-1.0], scores, [-1.0]))
+	peaks = np.flatnonzero((scores >= padded[:-2]) & (scores >= padded[2:]))
+	strong = peaks[scores[peaks] >= scores.max() * HARMONIC_TOLERANCE]
+	coarse = pitches[strong.max()]
+
+	fine = np.linspace(max(min_pitch, coarse - step), min(max_pitch, coarse + step), 2 * REFINE_STEPS + 1)
+	response = _responses(profile, fine)
+	best = int(np.argmax(np.abs(response)))
+	pitch = float(fine[best])
+	phase = float((-np.angle(response[best]) / (2 * np.pi) * pitch) % pitch)
+	score = float(np.abs(response[best]))
+
+	# A forced pitch is kept however weak; the caller reports the score
+	if score < MIN_GRID_SCORE and min_pitch != max_pitch:
+		return 1.0, 0.0, score
+	return pitch, phase, score
+
+
+def detect_grid(rgba, **options):
+	"""
+	Pixel grid of an image on both axes
+
+	Returns:
+		Dict with pitch_x, phase_x, score_x, pitch_y, phase_y, score_y
+	"""
+	pitch_x, phase_x, score_x = estimate_pitch(edge_profile(rgba, axis=1), **options)
+	pitch_y, phase_y, score_y = estimate_pitch(edge_profile(rgba, axis=0), **options)
+	if options.get('min_pitch') is not None and options.get('min_pitch') == options.get('max_pitch'):
+		score = min(score_x, score_y)
+		if score < MIN_GRID_SCORE:
+			print(f"⚠ Forced pitch {options['min_pitch']:g} scores only {score:.2f} "
+				  f"(detection needs {MIN_GRID_SCORE}); the grid may be wrong")
+	return {'pitch_x': pitch_x, 'phase_x': phase_x, 'score_x': score_x,
+			'pitch_y': pitch_y, 'phase_y': phase_y, 'score_y': score_y}
+
+
+def _cell_samples(size, pitch, phase):
+	"""
+	Source coordinates sampled inside every cell along one axis
+
+	Returns:
+		(cells, samples) int array of coordinates in the middle of each
+		cell; cells less than half inside the image are dropped
+	"""
+	first = phase % pitch - pitch
+	starts = first + np.arange(int(np.ceil((size - first) / pitch))) * pitch
+	starts = starts[(starts >= -pitch / 2) & (starts + pitch <= size + pitch / 2)]
+
+	# Only the middle of a cell; its blurred edges mix in the neighbours
+	count = int(min(MAX_CELL_SAMPLES, max(1, round(pitch * 0.3))))
+	fractions = np.linspace(0.35, 0.65, count) if count > 1 else np.array([0.5])
+
+	coords = np.floor(starts[:, None] + fractions[None, :] * pitch).astype(int)
+	return np.clip(coords, 0, size - 1)
+
+
+def _mode(samples):
+	"""
+	Most common packed color along the last axis
+
+	Returns:
+		(colors, counts): the color and how many samples have it
+	"""
+	equal = samples[..., :, None] == samples[..., None, :]
+	counts = equal.sum(axis=-1)
+	best = counts.argmax(axis=-1)[..., None]
+	return (np.take_along_axis(samples, best, axis=-1)[..., 0],
+			np.take_along_axis(counts, best, axis=-1)[..., 0])
+
+
+def downsample_native(rgba, grid, method='median'):
+	"""
+	Rebuild the native-resolution image, one output pixel per art pixel
+
+	Args:
+		rgba: (height, width, 4) uint8 array
+		grid: Result of detect_grid
+		method: 'median' (per channel) or 'mode' (most common color, keeps
+			the palette exact; cells where no color repeats, as in blurred
+			or resampled upscales, fall back to the median)
+
+	Returns:
+		(rows, cols, 4) uint8 array
+	"""
+	height, width = rgba.shape[:2]
+	ys = _cell_samples(height, grid['pitch_y'], grid['phase_y'])  # (rows, sy)
+	xs = _cell_samples(width, grid['pitch_x'], grid['phase_x'])   # (cols, sx)
+
+	# (rows, cols, sy, sx) samples per cell
+	samples = rgba[ys[:, None, :, None], xs[None, :, None, :]]
+	rows, cols = samples.shape[:2]
+
+	flat = samples.reshape(rows, cols, -1, 4)
+	if method == 'median':
+		return np.median(flat, axis=2).round().astype(np.uint8)
+	if method == 'mode':
+		packed = np.ascontiguousarray(samples).view(np.uint32).reshape(rows, cols, -1)
+		colors, counts = _mode(packed)
+		native = colors.view(np.uint8).reshape(rows, cols, 4)
+		# The first sample of a cell without repeats is no better than any other
+		unique = (counts == 1) & (packed.shape[-1] > 1)
+		native[unique] = np.median(flat[unique], axis=1).round().astype(np.uint8)
+		return native
+	raise ValueError(f"Unknown method: {method!r} (expected 'median' or 'mode')")
+
+
+def upscale(rgba, factor):
+	"""Exact integer upscale: every pixel becomes a factor x factor block"""
+	if factor == 1:
+		return rgba
+	height, width = rgba.shape[:2]
+	blocks = np.broadcast_to(rgba[:, None, :, None], (height, factor, width, factor, rgba.shape[2]))
+	return blocks.reshape(height * factor, width * factor, rgba.shape[2])
+
+
+def restore_pixel_grid(input_path, output_path=None, scale=1, method='median', pitch=None):
+	"""
+	Detect the pixel grid, rebuild native resolution and optionally re-upscale
+
+	Args:
+		input_path: Input image path
+		output_path: Output path (default: adds '_native')
+		scale: Integer upscale factor for the output (1 = native resolution)
+		method: 'median' or 'mode'
+		pitch: Force this pitch on both axes instead of detecting it
+
+	Returns:
+		Path to output file
+	"""
+	if output_path is None:
+		base, _ = os.path.splitext(input_path)
+		output_path = f"{base}_native.png"
+
+	with stage('load') as info:
+		with Image.open(input_path) as img:
+			rgba = np.array(img.convert('RGBA'))
+		height, width = rgba.shape[:2]
+		info['pixels'] = height * width
+	print(f"Input: {width}x{height}")
+
+	options = {'min_pitch': pitch, 'max_pitch': pitch} if pitch else {}
+	with stage('grid', height * width):
+		grid = detect_grid(rgba, **options)
+	print(f"Pixel pitch: {grid['pitch_x']:.2f} x {grid['pitch_y']:.2f}, "
+		  f"phase: ({grid['phase_x']:.2f}, {grid['phase_y']:.2f}), "
+		  f"confidence: {min(grid['score_x'], grid['score_y']):.2f}")
+
+	with stage('downsample', height * width):
+		native = downsample_native(rgba, grid, method)
+	print(f"Native resolution: {native.shape[1]}x{native.shape[0]}")
+
+	with stage('save') as info:
+		result = upscale(native, scale)
+		size, mode = save_png(result, output_path)
+		info['pixels'] = result.shape[0] * result.shape[1]
+	print(f"✓ Saved {result.shape[1]}x{result.shape[0]} ({size / 1024:.1f} KB, {mode}): {output_path}")
+
+	return output_path
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Pixel Grid Detector")
+		print("="*60)
+		print("\nUsage:")
+		print("  python pixel_grid.py <image> [options]")
+		print()
+		print("Options:")
+		print("  -o <path>         Output path (default: <image>_native.png)")
+		print("  --scale <n>       Re-upscale by this integer factor (default: 1)")
+		print("  --method <m>      median | mode (default: median)")
+		print("  --pitch <px>      Use this pixel pitch instead of detecting it")
+		print("  --detect-only     Print the detected grid and exit")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python pixel_grid.py knight.png")
+		print("  python pixel_grid.py knight.png --scale 2 -o knight_2x.png")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	input_file = args[0]
+	output_file = None
+	scale = 1
+	method = 'median'
+	pitch = None
+
+	if '-o' in args:
+		output_file = args[args.index('-o') + 1]
+	if '--scale' in args:
+		scale = int(args[args.index('--scale') + 1])
+	if '--method' in args:
+		method = args[args.index('--method') + 1]
+	if '--pitch' in args:
+		pitch = float(args[args.index('--pitch') + 1])
+
+	with profile_run(args):
+		if '--detect-only' in args:
+			with Image.open(input_file) as img:
+				rgba = np.array(img.convert('RGBA'))
+			with stage('grid', rgba.shape[0] * rgba.shape[1]):
+				grid = detect_grid(rgba)
+			for key, value in grid.items():
+				print(f"{key}: {value:.3f}")
+		else:
+			restore_pixel_grid(input_file, output_file, scale, method, pitch)
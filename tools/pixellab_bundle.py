@@ -0,0 +1,251 @@
+"""
+PixelLab Bundle Reader
+Processes PixelLab character bundles straight from the zip archive
+
+Each character arrives as a zip (e.g. assets/sprites/bosses/blood_wraith.zip)
+holding metadata.json plus rotations/*.png and animations/<name>/<dir>/*.png.
+Members are streamed into memory and decoded there; nothing is extracted.
+metadata.json decides which directions and animation frames exist, and
+only the final processed outputs are written.
+
+An already extracted character directory works as a source as well.
+
+Usage:
+    python pixellab_bundle.py <bundle.zip|character_dir> [options]
+"""
+
+from PIL import Image
+import numpy as np
+import contextlib
+import io
+import json
+import os
+import sys
+import zipfile
+
+from bg_detect import has_transparent_border
+from fix_transparency_v2 import remove_background_array
+from stage_profile import stage, profile_run
+
+
+METADATA_NAME = 'metadata.json'
+
+
+def member_path(directory, relpath):
+	"""
+	Path of a bundle member (as named in metadata.json) below directory
+
+	Raises:
+		ValueError: if relpath is absolute or leaves directory (e.g. '..')
+	"""
+	path = os.path.join(directory, *relpath.split('/'))
+	root = os.path.realpath(directory)
+	resolved = os.path.realpath(path)
+	if (relpath.startswith('/') or os.path.isabs(relpath) or resolved == root or
+			os.path.commonpath([root, resolved]) != root):
+		raise ValueError(f"Bundle path {relpath!r} leaves {directory}")
+	return path
+
+
+@contextlib.contextmanager
+def open_bundle(source):
+	"""
+	Open a bundle zip or extracted character directory for reading
+
+	Yields:
+		read(relpath) -> bytes, with relpath as written in metadata.json
+	"""
+	if os.path.isdir(source):
+		def read(relpath):
+			with open(member_path(source, relpath), 'rb') as f:
+				return f.read()
+		yield read
+		return
+
+	with zipfile.ZipFile(source) as archive:
+		# Bundles may hold their files below a top-level folder
+		prefix = ''
+		for name in archive.namelist():
+			if name == METADATA_NAME or name.endswith('/' + METADATA_NAME):
+				prefix = name[:-len(METADATA_NAME)]
+				break
+
+		def read(relpath):
+			return archive.read(prefix + relpath)
+		yield read
+
+
+def read_metadata(read):
+	"""Parse metadata.json from an open bundle"""
+	return json.loads(read(METADATA_NAME).decode('utf-8'))
+
+
+def frame_list(metadata):
+	"""
+	All frames listed in metadata.json, rotations first
+
+	Returns:
+		List of dicts with animation (None for rotations), direction,
+		index and path
+	"""
+	frames_meta = metadata.get('frames', {})
+	frames = []
+
+	for direction, path in frames_meta.get('rotations', {}).items():
+		frames.append({'animation': None, 'direction': direction, 'index': 0, 'path': path})
+
+	for animation, directions in frames_meta.get('animations', {}).items():
+		for direction, paths in directions.items():
+			for index, path in enumerate(paths):
+				frames.append({'animation': animation, 'direction': direction,
+							   'index': index, 'path': path})
+
+	return frames
+
+
+def decode_png(data):
+	"""Decode PNG bytes into an RGBA numpy array"""
+	with Image.open(io.BytesIO(data)) as img:
+		return np.array(img.convert('RGBA'))
+
+
+def iter_frames(source):
+	"""
+	Stream every frame of a bundle, decoded in memory
+
+	Yields:
+		(metadata, frame dict with an added 'image' RGBA array)
+	"""
+	with open_bundle(source) as read:
+		metadata = read_metadata(read)
+		for frame in frame_list(metadata):
+			with stage('load') as info:
+				frame['image'] = decode_png(read(frame['path']))
+				info['pixels'] = frame_pixels([frame])
+			yield metadata, frame
+
+
+def load_character(source):
+	"""
+	Load metadata and all decoded frames of a bundle
+
+	Returns:
+		(metadata, list of frame dicts with 'image')
+	"""
+	with stage('load') as info, open_bundle(source) as read:
+		metadata = read_metadata(read)
+		frames = frame_list(metadata)
+		for frame in frames:
+			frame['image'] = decode_png(read(frame['path']))
+		info['pixels'] = frame_pixels(frames)
+
+	return metadata, frames
+
+
+def frame_pixels(frames):
+	"""Total pixel count of decoded frames"""
+	return sum(frame['image'].shape[0] * frame['image'].shape[1] for frame in frames)
+
+
+def default_output_dir(source):
+	"""<bundle name>_processed next to the bundle"""
+	base = source.rstrip('/\\')
+	if base.lower().endswith('.zip'):
+		base = base[:-4]
+	return base + '_processed'
+
+
+def process_bundle(source, output_dir=None, tolerance=40, multi_color=True, smooth_edges=True):
+	"""
+	Clean every frame of a bundle and write only the processed outputs
+
+	Frames that already have a transparent border are written unchanged.
+
+	Args:
+		source: Bundle zip or extracted character directory
+		output_dir: Output directory (default: <bundle>_processed)
+		tolerance: Background removal tolerance
+		multi_color: Detect and remove multiple background colors
+		smooth_edges: Apply gradual alpha for anti-aliasing
+
+	Returns:
+		Output directory
+	"""
+	if output_dir is None:
+		output_dir = default_output_dir(source)
+
+	print(f"Bundle: {source}")
+
+	# Reject frame paths outside output_dir before anything is written
+	with open_bundle(source) as read:
+		for frame in frame_list(read_metadata(read)):
+			member_path(output_dir, frame['path'])
+
+	metadata = None
+	cleaned = kept = 0
+
+	for metadata, frame in iter_frames(source):
+		data = frame['image']
+
+		if has_transparent_border(data):
+			kept += 1
+		else:
+			print(f"\n--- {frame['path']} ---")
+			remove_background_array(data, tolerance, multi_color, smooth_edges)
+			cleaned += 1
+
+		output_path = member_path(output_dir, frame['path'])
+		os.makedirs(os.path.dirname(output_path), exist_ok=True)
+		with stage('save', frame_pixels([frame])):
+			Image.fromarray(data, 'RGBA').save(output_path, 'PNG')
+
+	if metadata is not None:
+		os.makedirs(output_dir, exist_ok=True)
+		with open(os.path.join(output_dir, METADATA_NAME), 'w', encoding='utf-8') as f:
+			json.dump(metadata, f, indent=2)
+
+	print(f"\n✓ {cleaned + kept} frames written to {output_dir} "
+		  f"({cleaned} cleaned, {kept} already transparent)")
+
+	return output_dir
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("PixelLab Bundle Processor")
+		print("="*60)
+		print("\nUsage:")
+		print("  python pixellab_bundle.py <bundle.zip|character_dir> [options]")
+		print()
+		print("Options:")
+		print("  -o <dir>      Output directory (default: <bundle>_processed)")
+		print("  -t <value>    Background removal tolerance (default: 40)")
+		print("  --list        List frames from metadata.json and exit")
+		print("  --profile <f> Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet       No console output")
+		print()
+		print("Examples:")
+		print("  python pixellab_bundle.py assets/sprites/bosses/blood_wraith.zip")
+		print("  python pixellab_bundle.py ghoul.zip -o build/ghoul -t 45")
+		sys.exit(1)
+
+	source = sys.argv[1]
+	output_dir = None
+	tolerance = 40
+
+	if '-o' in sys.argv:
+		output_dir = sys.argv[sys.argv.index('-o') + 1]
+	if '-t' in sys.argv:
+		tolerance = int(sys.argv[sys.argv.index('-t') + 1])
+
+	with profile_run(sys.argv[1:]):
+		if '--list' in sys.argv:
+			with open_bundle(source) as read:
+				metadata = read_metadata(read)
+			character = metadata.get('character', {})
+			print(f"{character.get('name', source)}: {character.get('size')}")
+			for frame in frame_list(metadata):
+				print(f"  {frame['animation'] or 'rotation'} / {frame['direction']} "
+					  f"[{frame['index']}]: {frame['path']}")
+		else:
+			process_bundle(source, output_dir, tolerance)
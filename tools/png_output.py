@@ -0,0 +1,277 @@
+"""
+PNG Output
+Size-optimized PNG encoding for finished sprites
+
+Pixel art rarely needs 32-bit RGBA. When an image has at most 256 distinct
+RGBA colors it is written as an indexed (P-mode) PNG whose tRNS chunk
+carries the alpha of every palette entry. That is lossless, and usually
+far smaller. Fully opaque images with more colors drop the alpha channel
+(RGB). Images with more colors can optionally be reduced to a
+palette (no dithering, so pixel edges stay crisp). Compression level and
+optimize are exposed, and whole directories are re-encoded in parallel
+with a per-file bytes-saved report.
+
+Usage:
+    python png_output.py <image|dir> [...] [options]
+"""
+
+from PIL import Image
+import io
+import numpy as np
+import os
+import shutil
+import sys
+
+from batch_engine import list_images, run_batch
+from stage_profile import stage, profile_run
+
+
+# zlib level used when optimize is off (0-9)
+DEFAULT_COMPRESS_LEVEL = 9
+
+# Largest palette a PNG can index
+MAX_PALETTE_COLORS = 256
+
+
+def unique_colors(rgba, limit=None):
+	"""
+	Distinct RGBA colors of an image
+
+	Args:
+		rgba: (height, width, 4) uint8 array
+		limit: Stop early and return None once there are more colors than this
+
+	Returns:
+		(colors, inverse): uint32 packed colors and per pixel index, or None
+	"""
+	packed = np.ascontiguousarray(rgba).view(np.uint32).reshape(-1)
+
+	# A cheap look at a sample first: too many colors there means too many overall
+	if limit is not None and len(packed) > 65536:
+		sample = packed[::max(1, len(packed) // 65536)]
+		if len(np.unique(sample)) > limit:
+			return None
+
+	colors, inverse = np.unique(packed, return_inverse=True)
+	if limit is not None and len(colors) > limit:
+		return None
+	return colors, inverse.reshape(rgba.shape[:2])
+
+
+def to_palette(rgba):
+	"""
+	Lossless indexed image with tRNS alpha, or None above 256 colors
+
+	Returns:
+		(P-mode PIL image, transparency bytes) or None
+	"""
+	found = unique_colors(rgba, MAX_PALETTE_COLORS)
+	if found is None:
+		return None
+
+	colors, inverse = found
+	palette = colors.view(np.uint8).reshape(-1, 4)
+
+	img = Image.fromarray(inverse.astype(np.uint8), 'P')
+	img.putpalette(palette[:, :3].tobytes(), 'RGB')
+	return img, palette[:, 3].tobytes()
+
+
+def reduce_colors(rgba, colors=MAX_PALETTE_COLORS):
+	"""
+	Quantize to at most `colors` RGBA colors without dithering (lossy)
+
+	Fully transparent pixels stay fully transparent.
+
+	Returns:
+		New (height, width, 4) uint8 array
+	"""
+	img = Image.fromarray(np.ascontiguousarray(rgba), 'RGBA')
+	quantized = img.quantize(colors=colors, method=Image.Quantize.FASTOCTREE,
+							 dither=Image.Dither.NONE)
+	reduced = np.array(quantized.convert('RGBA'))
+	reduced[rgba[:, :, 3] == 0] = 0
+	return reduced
+
+
+def encode_png(rgba, palette=True, compress_level=DEFAULT_COMPRESS_LEVEL, optimize=True,
+			   max_colors=None):
+	"""
+	Encode an RGBA array as PNG bytes
+
+	Args:
+		rgba: (height, width, 4) uint8 array
+		palette: Write P-mode + tRNS when there are at most 256 colors
+		compress_level: zlib level 0-9 (ignored by Pillow when optimize is on)
+		optimize: Let Pillow search for the smallest encoding
+		max_colors: Reduce to this many colors first (lossy), None to keep all
+
+	Returns:
+		(png bytes, mode written: 'P', 'RGB' or 'RGBA')
+	"""
+	if max_colors is not None:
+		rgba = reduce_colors(rgba, max_colors)
+
+	options = {'compress_level': compress_level, 'optimize': optimize}
+	indexed = to_palette(rgba) if palette else None
+
+	buffer = io.BytesIO()
+	if indexed is not None:
+		img, transparency = indexed
+		if any(a != 255 for a in transparency):
+			options['transparency'] = transparency
+		img.save(buffer, 'PNG', **options)
+		mode = 'P'
+	elif rgba[:, :, 3].min() == 255:
+		Image.fromarray(np.ascontiguousarray(rgba[:, :, :3]), 'RGB').save(buffer, 'PNG', **options)
+		mode = 'RGB'
+	else:
+		Image.fromarray(np.ascontiguousarray(rgba), 'RGBA').save(buffer, 'PNG', **options)
+		mode = 'RGBA'
+
+	return buffer.getvalue(), mode
+
+
+def save_png(rgba, path, palette=True, compress_level=DEFAULT_COMPRESS_LEVEL, optimize=True,
+			 max_colors=None):
+	"""
+	Write an RGBA array as a size-optimized PNG
+
+	Returns:
+		(bytes written, mode)
+	"""
+	data, mode = encode_png(rgba, palette, compress_level, optimize, max_colors)
+	with open(path, 'wb') as f:
+		f.write(data)
+	return len(data), mode
+
+
+def optimize_file(input_path, output_path=None, palette=True,
+				  compress_level=DEFAULT_COMPRESS_LEVEL, optimize=True, max_colors=None):
+	"""
+	Re-encode one PNG, keeping the original if the result is not smaller
+
+	Args:
+		input_path: PNG to re-encode
+		output_path: Output path (default: overwrite the input)
+
+	Returns:
+		(output path, bytes before, bytes after)
+	"""
+	if output_path is None:
+		output_path = input_path
+
+	before = os.path.getsize(input_path)
+	with stage('load') as info:
+		with Image.open(input_path) as img:
+			rgba = np.array(img.convert('RGBA'))
+		info['pixels'] = rgba.shape[0] * rgba.shape[1]
+
+	with stage('encode', rgba.shape[0] * rgba.shape[1]):
+		data, mode = encode_png(rgba, palette, compress_level, optimize, max_colors)
+
+	if len(data) < before:
+		with stage('save', rgba.shape[0] * rgba.shape[1]):
+			with open(output_path, 'wb') as f:
+				f.write(data)
+		after = len(data)
+		print(f"{mode}: {before:,} -> {after:,} bytes ({(1 - after / before) * 100:.1f}% smaller)")
+	else:
+		if os.path.abspath(output_path) != os.path.abspath(input_path):
+			shutil.copyfile(input_path, output_path)
+		after = before
+		print(f"Kept original ({before:,} bytes, {mode} encoding was {len(data):,})")
+
+	return output_path, before, after
+
+
+def optimize_files(paths, output_dir=None, workers=None, **options):
+	"""
+	Re-encode many PNGs in parallel and report the bytes saved
+
+	Args:
+		paths: PNG files
+		output_dir: Write here instead of overwriting the inputs
+		workers: Worker processes (default: all cores)
+		**options: palette, compress_level, optimize, max_colors
+
+	Returns:
+		Total bytes saved
+	"""
+	if output_dir:
+		os.makedirs(output_dir, exist_ok=True)
+
+	jobs = []
+	for path in paths:
+		output_path = os.path.join(output_dir, os.path.basename(path)) if output_dir else None
+		jobs.append((path, (output_path,), options))
+
+	results = run_batch(optimize_file, jobs, workers=workers)
+
+	before = sum(r['output'][1] for r in results if r['ok'])
+	after = sum(r['output'][2] for r in results if r['ok'])
+	print(f"Total: {before:,} -> {after:,} bytes, saved {before - after:,} "
+		  f"({(1 - after / max(before, 1)) * 100:.1f}%)")
+
+	return before - after
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("PNG Output Optimizer")
+		print("="*60)
+		print("\nUsage:")
+		print("  python png_output.py <image|dir> [...] [options]")
+		print()
+		print("Options:")
+		print("  -o <dir>          Output directory (default: overwrite inputs)")
+		print("  --colors <n>      Reduce to at most n colors first (lossy)")
+		print(f"  --level <0-9>     zlib compression level (default: {DEFAULT_COMPRESS_LEVEL})")
+		print("  --no-optimize     Skip Pillow's optimize pass (faster)")
+		print("  --no-palette      Always write RGBA")
+		print("  -j <workers>      Parallel workers (default: all cores)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python png_output.py assets/sprites/enemies/ghoul -o build/ghoul")
+		print("  python png_output.py sheet_final.png --colors 64")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	output_dir = None
+	workers = None
+	options = {'palette': '--no-palette' not in args, 'optimize': '--no-optimize' not in args}
+
+	inputs = []
+	i = 0
+	while i < len(args):
+		if args[i] == '-o':
+			output_dir = args[i + 1]
+			i += 2
+		elif args[i] == '-j':
+			workers = int(args[i + 1])
+			i += 2
+		elif args[i] == '--colors':
+			options['max_colors'] = int(args[i + 1])
+			i += 2
+		elif args[i] == '--level':
+			options['compress_level'] = int(args[i + 1])
+			i += 2
+		elif args[i] == '--profile':
+			i += 2
+		elif args[i].startswith('--'):
+			i += 1
+		else:
+			inputs.append(args[i])
+			i += 1
+
+	paths = []
+	for path in inputs:
+		if os.path.isdir(path):
+			paths.extend(os.path.join(path, name) for name in list_images(path, ('.png',)))
+		else:
+			paths.append(path)
+
+	with profile_run(args):
+		optimize_files(paths, output_dir, workers, **options)
@@ -0,0 +1,316 @@
+"""
+Sprite Pipeline
+Runs processing stages on one in-memory RGBA buffer
+
+Chaining fix_transparency_v2.py, fix_sprite_grid.py and
+fix_sprite_alignment.py decodes and re-encodes a PNG at every step. Here
+the image is decoded once, every stage works on the same numpy buffer
+(in place wherever the stage allows it), and one PNG is encoded at the end.
+
+Stages (run in the order given):
+    native   Rebuild native-resolution pixel art from a blurred,
+             non-integer upscale (method, scale, pitch)
+    detect   Detect background colors (strategy, top_n, min_percentage)
+    remove   Remove the background (tolerance, smooth_edges, max_memory_mb,
+             flood, cols, rows); detects colors first if detect did not run
+    resize   Resize to an exact grid with NEAREST (cols, rows, frame_size)
+    align    Center or register frames (cols, rows, register, reference)
+    trim     Crop transparent padding (margin); offsets go to a sidecar
+    tileset  Cut tiles (tileset JSON boxes, else a grid of tile), merge
+             duplicates and repack them (boxes, tile, inset, padding,
+             threshold); the tile index goes to a sidecar
+    encode   Write a size-optimized PNG (path, palette, compress_level,
+             optimize, colors); added automatically if missing
+
+Usage:
+    python sprite_pipeline.py <image> <stage[:key=value,...]> [...] [-o output]
+"""
+
+from PIL import Image
+import json
+import numpy as np
+import os
+import sys
+
+from bg_alpha import DEFAULT_MAX_MEMORY_MB, compute_alpha, alpha_stats
+from bg_detect import detect_background_colors
+from bg_flood import restrict_alpha
+from decode_cache import load_rgba
+from fix_sprite_alignment import frame_grid, frame_bounds, recenter_frames, register_frames
+from pixel_grid import detect_grid, downsample_native, upscale
+from png_output import DEFAULT_COMPRESS_LEVEL, save_png
+from sprite_trim import trim_box
+from stage_profile import stage, profile_run
+from tileset_atlas import (DEFAULT_TILE_PADDING, DEFAULT_TILE_SIZE, default_json_path,
+						   grid_tiles, json_tiles, pack_tiles, slice_tiles)
+
+
+def load_image(path):
+	"""Decode an image into a new pipeline state"""
+	return {'image': load_rgba(path), 'input_path': path}
+
+
+def stage_native(state, method='median', scale=1, pitch=None):
+	"""Replace the buffer with its native-resolution pixel art, times scale"""
+	data = state['image']
+	options = {'min_pitch': pitch, 'max_pitch': pitch} if pitch else {}
+	grid = detect_grid(data, **options)
+	state['image'] = upscale(downsample_native(data, grid, method), scale)
+	print(f"  Pitch {grid['pitch_x']:.2f} x {grid['pitch_y']:.2f}: "
+		  f"{data.shape[1]}x{data.shape[0]} -> {state['image'].shape[1]}x{state['image'].shape[0]}")
+
+
+def stage_detect(state, strategy='edges', top_n=5, min_percentage=1.0):
+	"""Detect background colors into state['bg_colors']"""
+	state['bg_colors'] = detect_background_colors(state['image'], strategy, top_n, min_percentage)
+	for color, pct in state['bg_colors']:
+		print(f"  RGB{tuple(color)}: {pct:.1f}%")
+
+
+def stage_remove(state, tolerance=45, smooth_edges=True, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+				 flood=False, cols=None, rows=None):
+	"""
+	Write background alpha straight into the buffer's alpha channel
+
+	With flood, only background connected to the image border (and to
+	every frame's border when cols and rows are given) is removed.
+	"""
+	if 'bg_colors' not in state:
+		stage_detect(state)
+
+	data = state['image']
+	compute_alpha(data, [color for color, _ in state['bg_colors']], tolerance,
+				  smooth_edges=smooth_edges, max_memory_mb=max_memory_mb, out=data[:, :, 3])
+	if flood:
+		restrict_alpha(data[:, :, 3], (cols, rows) if cols and rows else None)
+
+	transparent, _, _ = alpha_stats(data[:, :, 3], max_memory_mb)
+	print(f"  Made {transparent} pixels transparent "
+		  f"({transparent / (data.shape[0] * data.shape[1]) * 100:.1f}%)")
+
+
+def stage_resize(state, cols, rows, frame_size):
+	"""Resize to cols x rows frames of frame_size pixels (NEAREST)"""
+	target = (cols * frame_size, rows * frame_size)
+	img = Image.fromarray(state['image'], 'RGBA').resize(target, Image.Resampling.NEAREST)
+	state['image'] = np.array(img)
+	state['grid'] = (cols, rows)
+	print(f"  {target[0]}x{target[1]} ({cols}x{rows} grid, {frame_size}px frames)")
+
+
+def stage_align(state, cols=None, rows=None, register=None, reference='row'):
+	"""Center (or register) every frame of the grid, in place"""
+	if cols is None or rows is None:
+		if 'grid' not in state:
+			raise ValueError("align needs cols and rows (or a resize stage before it)")
+		cols, rows = state['grid']
+
+	data = state['image']
+	grid = frame_grid(data, cols, rows)
+	if register:
+		aligned, _, _, before, residual = register_frames(grid, register, reference)
+		print(f"  Registered {rows * cols} frames, jitter {before:.2f}px -> {residual:.2f}px")
+	else:
+		aligned = recenter_frames(grid, frame_bounds(grid))
+		print(f"  Re-centered {rows * cols} frames")
+
+	used_h, used_w = grid.shape[0] * grid.shape[1], grid.shape[2] * grid.shape[3]
+	data[used_h:] = 0
+	data[:, used_w:] = 0
+	data[:used_h, :used_w] = aligned.reshape(used_h, used_w, 4)
+	state['grid'] = (cols, rows)
+
+
+def stage_trim(state, margin=0):
+	"""Crop to the visible pixels plus margin (a view, nothing is copied)"""
+	data = state['image']
+	height, width = data.shape[:2]
+	x, y, w, h = trim_box(data, margin)
+
+	# Offsets add up if trim runs more than once
+	offset_x, offset_y = state.get('offset', (0, 0))
+	state['original_size'] = state.get('original_size', (width, height))
+	state['offset'] = (offset_x + x, offset_y + y)
+	state['image'] = data[y:y + h, x:x + w]
+	print(f"  {width}x{height} -> {w}x{h} at offset {state['offset']}")
+
+
+def stage_tileset(state, boxes=None, tile=DEFAULT_TILE_SIZE, inset=0,
+				  padding=DEFAULT_TILE_PADDING, threshold=0):
+	"""Replace the buffer with an atlas of its unique tiles"""
+	data = state['image']
+	boxes = boxes or default_json_path(state['input_path'])
+	tiles = json_tiles(boxes) if boxes else grid_tiles(data.shape[1], data.shape[0], tile)
+
+	slice_tiles(data, tiles, inset)
+	canvases, index = pack_tiles(tiles, padding=padding, threshold=threshold)
+	if len(canvases) > 1:
+		raise ValueError("Tiles need more than one atlas; use tileset_atlas.py")
+
+	state['image'] = canvases[0]
+	state['tileset'] = index
+	print(f"  {len(index['unique'])} unique of {len(tiles)} tiles -> "
+		  f"{canvases[0].shape[1]}x{canvases[0].shape[0]}")
+
+
+def stage_encode(state, path=None, palette=True, compress_level=DEFAULT_COMPRESS_LEVEL,
+				 optimize=True, colors=None):
+	"""
+	Encode the buffer as a size-optimized PNG, plus a trim sidecar if trim ran
+	and a tile index if tileset ran
+
+	Indexed (P-mode + tRNS) when the image has at most 256 colors; colors
+	reduces the palette first (lossy). See png_output.encode_png.
+	"""
+	if path is None:
+		base, _ = os.path.splitext(state['input_path'])
+		path = f"{base}_final.png"
+
+	size, mode = save_png(state['image'], path, palette, compress_level, optimize, colors)
+	state['output_path'] = path
+	print(f"  ✓ {path} ({size / 1024:.1f} KB, {mode})")
+
+	if 'offset' in state:
+		height, width = state['image'].shape[:2]
+		sidecar_path = os.path.splitext(path)[0] + '_trim.json'
+		with open(sidecar_path, 'w', encoding='utf-8') as f:
+			json.dump({
+				'original_size': list(state['original_size']),
+				'offset': list(state['offset']),
+				'size': [width, height],
+			}, f, indent=2)
+		print(f"  ✓ {sidecar_path}")
+
+	if 'tileset' in state:
+		sidecar_path = os.path.splitext(path)[0] + '_tiles.json'
+		with open(sidecar_path, 'w', encoding='utf-8') as f:
+			json.dump({
+				'source': os.path.basename(state['input_path']),
+				'atlases': [os.path.basename(path)],
+				**state['tileset'],
+			}, f, indent=2)
+		print(f"  ✓ {sidecar_path}")
+
+
+# Stage functions by name
+STAGES = {
+	'native': stage_native,
+	'detect': stage_detect,
+	'remove': stage_remove,
+	'resize': stage_resize,
+	'align': stage_align,
+	'trim': stage_trim,
+	'tileset': stage_tileset,
+	'encode': stage_encode,
+}
+
+
+def parse_value(text):
+	"""Option value from the command line: int, float, bool or string"""
+	lowered = text.lower()
+	if lowered in ('true', 'false'):
+		return lowered == 'true'
+	for convert in (int, float):
+		try:
+			return convert(text)
+		except ValueError:
+			pass
+	return text
+
+
+def parse_step(spec):
+	"""
+	Parse 'name' or 'name:key=value,key=value' into (name, options)
+	"""
+	name, _, rest = spec.partition(':')
+	if name not in STAGES:
+		raise ValueError(f"Unknown stage: {name!r} (expected one of {tuple(STAGES)})")
+
+	options = {}
+	for item in filter(None, rest.split(',')):
+		key, _, value = item.partition('=')
+		options[key] = parse_value(value)
+	return name, options
+
+
+def run_pipeline(input_path, steps, output_path=None):
+	"""
+	Decode once, run every stage on the shared buffer, encode once
+
+	Args:
+		input_path: Input image path
+		steps: List of (stage name, options dict)
+		output_path: Output path for the encode stage (default: <input>_final.png)
+
+	Returns:
+		Final pipeline state (image, output_path, bg_colors, offset, ...)
+	"""
+	steps = list(steps)
+	if not steps or steps[-1][0] != 'encode':
+		steps.append(('encode', {}))
+
+	print("="*60)
+	print(f"SPRITE PIPELINE: {' → '.join(name for name, _ in steps)}")
+	print("="*60)
+
+	with stage('load') as info:
+		state = load_image(input_path)
+		height, width = state['image'].shape[:2]
+		info['pixels'] = height * width
+	print(f"Loaded: {input_path} ({width}x{height})")
+
+	for name, options in steps:
+		if name == 'encode' and output_path is not None:
+			options = dict(options, path=options.get('path', output_path))
+		print(f"\n[{name}]")
+		height, width = state['image'].shape[:2]
+		with stage(name, height * width):
+			STAGES[name](state, **options)
+
+	return state
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 3:
+		print("Sprite Pipeline")
+		print("="*60)
+		print("\nUsage:")
+		print("  python sprite_pipeline.py <image> <stage[:key=value,...]> [...] [-o output]")
+		print()
+		print("Stages:")
+		print("  native            method (median|mode), scale, pitch")
+		print("  detect            strategy, top_n, min_percentage")
+		print("  remove            tolerance, smooth_edges, max_memory_mb, flood, cols, rows")
+		print("  resize            cols, rows, frame_size")
+		print("  align             cols, rows, register (alpha|luminance), reference")
+		print("  trim              margin")
+		print("  tileset           boxes (tileset JSON), tile, inset, padding, threshold")
+		print("  encode            path, palette, compress_level, optimize, colors")
+		print("                    (added automatically)")
+		print()
+		print("Options:")
+		print("  -o <path>         Output path (default: <image>_final.png)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python sprite_pipeline.py knight.png remove:tolerance=45 resize:cols=6,rows=4,frame_size=128 align")
+		print("  python sprite_pipeline.py boss.png remove align:cols=6,rows=5,register=alpha -o boss_final.png")
+		print("  python sprite_pipeline.py village_tileset.png tileset:tile=128,inset=3")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	options = args[:]
+	output_path = None
+	if '-o' in args:
+		i = args.index('-o')
+		output_path = args[i + 1]
+		del args[i:i + 2]
+	if '--profile' in args:
+		i = args.index('--profile')
+		del args[i:i + 2]
+	if '--quiet' in args:
+		args.remove('--quiet')
+
+	with profile_run(options):
+		run_pipeline(args[0], [parse_step(spec) for spec in args[1:]], output_path)
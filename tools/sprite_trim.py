@@ -0,0 +1,194 @@
+"""
+Sprite Trimmer
+Crops transparent padding from every frame of a character
+
+Most PixelLab frames are a small character in the middle of a mostly
+transparent canvas. Each frame is cropped to its alpha bounding box (plus
+an optional margin), and the original canvas size and the trim offset are
+recorded in a JSON sidecar so the game can place the trimmed frame exactly
+where the full frame would have been:
+
+    draw position = original position + offset
+
+Every pixel with non-zero alpha is kept, so trimmed frames render identically.
+atlas_packer.py --trim packs trimmed frames and restores their placement
+with the AtlasTexture margin instead.
+
+Usage:
+    python sprite_trim.py <bundle.zip|character_dir> [options]
+"""
+
+from PIL import Image
+import json
+import os
+import sys
+
+from fix_sprite_alignment import get_sprite_bounds
+from pixellab_bundle import METADATA_NAME, frame_pixels, load_character, member_path
+from stage_profile import stage, profile_run
+
+
+SIDECAR_NAME = 'trim.json'
+
+
+def trim_box(img_array, margin=0):
+	"""
+	Crop box of a frame's visible pixels
+
+	Args:
+		img_array: numpy RGBA array
+		margin: Transparent pixels kept around the content, clamped to the frame
+
+	Returns:
+		(x, y, width, height); a fully transparent frame becomes a 1x1 box
+		at the origin
+	"""
+	height, width = img_array.shape[:2]
+	bounds = get_sprite_bounds(img_array, alpha_threshold=0)
+	if bounds is None:
+		return 0, 0, 1, 1
+
+	min_x, min_y, max_x, max_y = (int(v) for v in bounds)
+	min_x = max(0, min_x - margin)
+	min_y = max(0, min_y - margin)
+	max_x = min(width - 1, max_x + margin)
+	max_y = min(height - 1, max_y + margin)
+
+	return min_x, min_y, max_x - min_x + 1, max_y - min_y + 1
+
+
+def trim_frames(frames, margin=0):
+	"""
+	Crop every frame in place and record where it came from
+
+	Each frame dict gets 'original_size' (width, height) and 'offset'
+	(x, y) of the crop, and its 'image' is replaced by the cropped array.
+
+	Returns:
+		(pixels before, pixels after)
+	"""
+	before = after = 0
+
+	for frame in frames:
+		image = frame['image']
+		height, width = image.shape[:2]
+		x, y, w, h = trim_box(image, margin)
+
+		frame['original_size'] = (width, height)
+		frame['offset'] = (x, y)
+		frame['image'] = image[y:y + h, x:x + w]
+
+		before += width * height
+		after += w * h
+
+	return before, after
+
+
+def sidecar_entry(frame):
+	"""Sidecar record for a trimmed frame dict"""
+	height, width = frame['image'].shape[:2]
+	return {
+		'animation': frame['animation'],
+		'direction': frame['direction'],
+		'index': frame['index'],
+		'original_size': list(frame['original_size']),
+		'offset': list(frame['offset']),
+		'size': [width, height],
+	}
+
+
+def write_sidecar(path, frames, margin, extra=None):
+	"""
+	Write the trim sidecar, keyed by the frame path from metadata.json
+
+	Args:
+		path: Output .json path
+		frames: Trimmed frame dicts
+		margin: Margin used when trimming
+		extra: Optional per frame dicts merged into each entry
+	"""
+	entries = {}
+	for i, frame in enumerate(frames):
+		entry = sidecar_entry(frame)
+		if extra is not None:
+			entry.update(extra[i])
+		entries[frame['path']] = entry
+
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump({'margin': margin, 'frames': entries}, f, indent=2)
+
+
+def trim_bundle(source, output_dir=None, margin=0):
+	"""
+	Write trimmed frames of a character plus the trim sidecar
+
+	Args:
+		source: Bundle zip or extracted character directory
+		output_dir: Output directory (default: <bundle>_trimmed)
+		margin: Transparent pixels kept around each frame's content
+
+	Returns:
+		Path of the sidecar
+	"""
+	if output_dir is None:
+		base = source.rstrip('/\\')
+		if base.lower().endswith('.zip'):
+			base = base[:-4]
+		output_dir = base + '_trimmed'
+
+	print(f"Loading: {source}")
+	metadata, frames = load_character(source)
+	with stage('trim', frame_pixels(frames)):
+		before, after = trim_frames(frames, margin)
+
+	# Rejects frame paths outside output_dir before anything is written
+	output_paths = [member_path(output_dir, frame['path']) for frame in frames]
+	with stage('save', after):
+		for frame, output_path in zip(frames, output_paths):
+			os.makedirs(os.path.dirname(output_path), exist_ok=True)
+			Image.fromarray(frame['image'], 'RGBA').save(output_path, 'PNG')
+
+	os.makedirs(output_dir, exist_ok=True)
+	with open(os.path.join(output_dir, METADATA_NAME), 'w', encoding='utf-8') as f:
+		json.dump(metadata, f, indent=2)
+
+	sidecar_path = os.path.join(output_dir, SIDECAR_NAME)
+	write_sidecar(sidecar_path, frames, margin)
+
+	print(f"✓ {len(frames)} frames trimmed: {before:,} -> {after:,} pixels "
+		  f"({(1 - after / max(before, 1)) * 100:.1f}% smaller)")
+	print(f"✓ Sidecar: {sidecar_path}")
+
+	return sidecar_path
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Sprite Trimmer")
+		print("="*60)
+		print("\nUsage:")
+		print("  python sprite_trim.py <bundle.zip|character_dir> [options]")
+		print()
+		print("Options:")
+		print("  -o <dir>          Output directory (default: <bundle>_trimmed)")
+		print("  --margin <px>     Transparent pixels kept around the content (default: 0)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python sprite_trim.py assets/sprites/player/penitent_knight")
+		print("  python sprite_trim.py assets/sprites/enemies/ghoul.zip --margin 1")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	source = args[0]
+	output_dir = None
+	margin = 0
+
+	if '-o' in args:
+		output_dir = args[args.index('-o') + 1]
+	if '--margin' in args:
+		margin = int(args[args.index('--margin') + 1])
+
+	with profile_run(args):
+		trim_bundle(source, output_dir, margin)
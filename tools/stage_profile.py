@@ -0,0 +1,184 @@
+"""
+Stage Profiler
+Structured per-stage timing and memory records for the sprite tools
+
+Tools wrap each stage (load, detect, alpha, resize, align, encode, save)
+in `with stage(name) as info:`. With profiling enabled, every stage
+records wall time, CPU time, peak traced memory (tracemalloc sees numpy
+buffers) and the pixel count it worked on. The records can be written as
+JSON lines or as a Chrome trace (chrome://tracing, ui.perfetto.dev). With
+profiling off, a stage costs one flag check.
+
+Profiling is turned on through the SPRITE_PROFILE environment variable
+(set by enable()), so batch worker processes pick it up too.
+quiet_output() silences the console output of a whole run.
+"""
+
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+
+# Environment variable that turns profiling on (inherited by workers)
+PROFILE_ENV = 'SPRITE_PROFILE'
+
+_enabled = bool(os.environ.get(PROFILE_ENV))
+_records = []
+
+# Open stages, innermost last; each holds the highest peak seen before a
+# nested stage reset the tracemalloc peak
+_open = []
+
+if _enabled:
+	tracemalloc.start()
+
+
+def enable():
+	"""Turn profiling on for this process and for workers started later"""
+	global _enabled
+	_enabled = True
+	os.environ[PROFILE_ENV] = '1'
+	if not tracemalloc.is_tracing():
+		tracemalloc.start()
+
+
+def is_enabled():
+	"""True when stages are being recorded"""
+	return _enabled
+
+
+@contextlib.contextmanager
+def stage(name, pixels=0):
+	"""
+	Record one stage
+
+	Args:
+		name: Stage name ('load', 'detect', 'alpha', ...)
+		pixels: Pixels processed; can also be set later via info['pixels']
+
+	Yields:
+		Dict the stage may update with 'pixels' (and extra fields)
+	"""
+	info = {'pixels': pixels}
+	if not _enabled:
+		yield info
+		return
+
+	current, peak = tracemalloc.get_traced_memory()
+	if _open:
+		_open[-1]['peak'] = max(_open[-1]['peak'], peak)
+	tracemalloc.reset_peak()
+
+	frame = {'peak': current}
+	_open.append(frame)
+	start = time.time()
+	wall = time.perf_counter()
+	cpu = time.process_time()
+
+	try:
+		yield info
+	finally:
+		wall = time.perf_counter() - wall
+		cpu = time.process_time() - cpu
+		_open.pop()
+		peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+		if _open:
+			_open[-1]['peak'] = max(_open[-1]['peak'], peak)
+
+		_records.append({
+			'stage': name,
+			'depth': len(_open),
+			'pid': os.getpid(),
+			'start': start,
+			'wall_s': wall,
+			'cpu_s': cpu,
+			'peak_mb': (peak - current) / (1024 * 1024),
+			**info,
+		})
+
+
+def records():
+	"""Stage records collected in this process so far"""
+	return list(_records)
+
+
+def take_records():
+	"""Return and clear this process's records (used by batch workers)"""
+	taken = list(_records)
+	_records.clear()
+	return taken
+
+
+def add_records(new_records):
+	"""Merge records collected in another process"""
+	_records.extend(new_records)
+
+
+def write_jsonl(path, stage_records=None):
+	"""Write one JSON object per stage"""
+	with open(path, 'w', encoding='utf-8') as f:
+		for record in _records if stage_records is None else stage_records:
+			f.write(json.dumps(record) + '\n')
+
+
+def write_chrome_trace(path, stage_records=None):
+	"""Write stages as complete ('X') events of a Chrome trace"""
+	events = []
+	for record in _records if stage_records is None else stage_records:
+		args = {k: v for k, v in record.items() if k not in ('stage', 'pid', 'start', 'wall_s')}
+		events.append({
+			'name': record['stage'],
+			'ph': 'X',
+			'ts': record['start'] * 1e6,
+			'dur': record['wall_s'] * 1e6,
+			'pid': record['pid'],
+			'tid': record['pid'],
+			'args': args,
+		})
+
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def write_profile(path):
+	"""Write the records as JSON lines (.jsonl) or a Chrome trace (anything else)"""
+	if path.lower().endswith('.jsonl'):
+		write_jsonl(path)
+	else:
+		write_chrome_trace(path)
+
+
+@contextlib.contextmanager
+def quiet_output(quiet=True):
+	"""Discard everything printed to stdout inside the block"""
+	if not quiet:
+		yield
+		return
+	with open(os.devnull, 'w', encoding='utf-8') as devnull:
+		with contextlib.redirect_stdout(devnull):
+			yield
+
+
+@contextlib.contextmanager
+def profile_run(args):
+	"""
+	Apply the shared --profile <path> and --quiet command line options
+
+	Args:
+		args: Command line arguments (sys.argv[1:])
+	"""
+	path = args[args.index('--profile') + 1] if '--profile' in args else None
+	if path:
+		enable()
+
+	quiet = '--quiet' in args
+	try:
+		with quiet_output(quiet):
+			yield
+	finally:
+		if path:
+			write_profile(path)
+			if not quiet:
+				print(f"Profile: {len(_records)} stages -> {path}")
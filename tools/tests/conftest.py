@@ -0,0 +1,6 @@
+"""Make the tools importable by module name, as when they run as scripts"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
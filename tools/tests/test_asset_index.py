@@ -0,0 +1,33 @@
+"""Checks for the asset-tree indexer"""
+
+import os
+import zipfile
+
+from asset_index import bundle_extracted
+
+
+def write_file(path, data):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'wb') as f:
+		f.write(data)
+
+
+def test_bundle_extracted_compares_members(tmp_path):
+	with zipfile.ZipFile(tmp_path / 'hero.zip', 'w') as archive:
+		archive.writestr('hero/metadata.json', b'{}')
+		archive.writestr('hero/rotations/south.png', b'png')
+	assert not bundle_extracted(str(tmp_path), 'hero.zip')
+
+	write_file(str(tmp_path / 'hero' / 'metadata.json'), b'{}')
+	write_file(str(tmp_path / 'hero' / 'rotations' / 'south.png'), b'png')
+	assert bundle_extracted(str(tmp_path), 'hero.zip')
+
+
+def test_bundle_with_paths_outside_directory_is_never_extracted(tmp_path):
+	# The member's target exists outside hero/, but must not count
+	write_file(str(tmp_path / 'hero' / 'metadata.json'), b'{}')
+	write_file(str(tmp_path / 'elsewhere.png'), b'png')
+	with zipfile.ZipFile(tmp_path / 'hero.zip', 'w') as archive:
+		archive.writestr('metadata.json', b'{}')
+		archive.writestr('../elsewhere.png', b'png')
+	assert not bundle_extracted(str(tmp_path), 'hero.zip')
@@ -0,0 +1,46 @@
+"""Checks for border sampling and background color estimates"""
+
+import numpy as np
+from PIL import Image
+
+from bg_detect import median_color
+from fix_transparency import advanced_remove_bg
+
+
+def gradient_border_sheet(height=60, width=80):
+	"""Sprite on a noisy horizontal gradient, so no border color repeats"""
+	rng = np.random.default_rng(3)
+	data = np.zeros((height, width, 4), dtype=np.uint8)
+	data[:, :, 0] = np.linspace(150, 230, width, dtype=np.uint8)[None, :]
+	data[:, :, 1] = 180 + rng.integers(0, 12, (height, width))
+	data[:, :, 2] = 200
+	data[:, :, 3] = 255
+	data[20:40, 30:50, :3] = (40, 20, 90)
+	return data
+
+
+def legacy_strided_median(data):
+	"""Edge sampling and median of the original advanced_remove_bg"""
+	height, width = data.shape[:2]
+	samples = np.concatenate([data[0, ::width // 10], data[-1, ::width // 10],
+							  data[::height // 10, 0], data[::height // 10, -1]])
+	return np.median(samples[:, :3], axis=0)
+
+
+def test_median_color_matches_legacy_sampling():
+	data = gradient_border_sheet()
+	assert np.array_equal(median_color(data, 'strided'), legacy_strided_median(data))
+
+
+def test_advanced_remove_bg_uses_median_background(tmp_path):
+	data = gradient_border_sheet()
+	input_path = str(tmp_path / 'sheet.png')
+	Image.fromarray(data, 'RGBA').save(input_path)
+	output_path = advanced_remove_bg(input_path, str(tmp_path / 'out.png'), threshold=30)
+
+	bg = legacy_strided_median(data)
+	rgb = data[:, :, :3].astype(float)
+	diff = np.sqrt((rgb[:, :, 0] - bg[0]) ** 2 + (rgb[:, :, 1] - bg[1]) ** 2 + (rgb[:, :, 2] - bg[2]) ** 2)
+	expected = np.minimum(np.clip(255 * (diff / 30), 0, 255).astype(np.uint8), data[:, :, 3])
+	with Image.open(output_path) as img:
+		assert np.array_equal(np.array(img)[:, :, 3], expected)
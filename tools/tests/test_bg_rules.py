@@ -0,0 +1,62 @@
+"""Checks for the declarative background rules"""
+
+import numpy as np
+
+from bg_rules import LIGHT_BACKGROUND_RULES, SYMMETRIC_LIGHT_BACKGROUND_RULES, load_rules, rule_mask
+
+
+def legacy_light_mask(data):
+	"""The hard-coded masks fix_sprite_alignment used before bg_rules"""
+	r, g, b = data[:, :, 0], data[:, :, 1], data[:, :, 2]
+	brightness = (r.astype(float) + g.astype(float) + b.astype(float)) / 3
+	is_light = brightness > 200
+	is_white = (r > 240) & (g > 240) & (b > 240)
+	is_light_purple = (r > 200) & (b > 200) & (g < 200)
+	is_light_grey = (np.abs(r - g) < 20) & (np.abs(g - b) < 20) & (brightness > 180)
+	return is_light | is_white | is_light_purple | is_light_grey
+
+
+def light_colors():
+	"""Every color bright enough to matter (brightness > 150), as a 1-row image"""
+	r, g, b = np.meshgrid(np.arange(256), np.arange(256), np.arange(256), indexing='ij')
+	keep = (r + g + b) > 450
+	data = np.zeros((1, int(keep.sum()), 4), dtype=np.uint8)
+	data[0, :, 0], data[0, :, 1], data[0, :, 2] = r[keep], g[keep], b[keep]
+	data[0, :, 3] = 255
+	return data
+
+
+def test_default_rules_match_legacy_masks():
+	data = light_colors()
+	assert np.array_equal(rule_mask(data, LIGHT_BACKGROUND_RULES), legacy_light_mask(data))
+
+
+def test_default_rules_match_legacy_masks_on_random_sheet():
+	data = np.random.default_rng(0).integers(0, 256, (96, 128, 4), dtype=np.uint8)
+	assert np.array_equal(rule_mask(data, LIGHT_BACKGROUND_RULES, max_memory_mb=0.01),
+						  legacy_light_mask(data))
+
+
+def test_wrapdiff_wraps_like_uint8():
+	data = np.array([[[200, 190, 0, 255], [190, 200, 0, 255], [5, 250, 0, 255]]], dtype=np.uint8)
+	assert rule_mask(data, 'wrapdiff(r, g) < 20').tolist() == [[True, False, True]]
+	assert rule_mask(data, 'diff(r, g) < 20').tolist() == [[True, True, False]]
+
+
+def test_symmetric_rules_remove_greys_tinted_either_way():
+	# Slightly blue and slightly red light greys
+	data = np.array([[[190, 200, 205, 255], [205, 200, 190, 255]]], dtype=np.uint8)
+	assert rule_mask(data, SYMMETRIC_LIGHT_BACKGROUND_RULES).tolist() == [[True, True]]
+	assert rule_mask(data, LIGHT_BACKGROUND_RULES).tolist() == [[False, True]]
+
+
+def test_symmetric_rules_only_add_pixels():
+	data = light_colors()
+	legacy = rule_mask(data, LIGHT_BACKGROUND_RULES)
+	symmetric = rule_mask(data, SYMMETRIC_LIGHT_BACKGROUND_RULES)
+	assert not (legacy & ~symmetric).any()
+
+
+def test_rule_sets_load_by_name():
+	assert load_rules('light') == list(LIGHT_BACKGROUND_RULES)
+	assert load_rules('light-symmetric') == list(SYMMETRIC_LIGHT_BACKGROUND_RULES)
@@ -0,0 +1,49 @@
+"""Checks for phase-correlation frame registration"""
+
+import numpy as np
+
+from fix_sprite_alignment import frame_grid, phase_correlation_shifts, register_frames
+
+
+# Fractional (dx, dy) shifts of frame 1.. against frame 0
+SUBPIXEL_SHIFTS = ((1.6, 0.0), (2.4, -0.7), (-3.3, 1.25), (0.3, 2.75), (-1.2, -2.6))
+
+# Largest error of the parabolic peak fit on these shifts is 0.15 px
+SUBPIXEL_TOLERANCE = 0.2
+
+
+def blob_sheet(shifts, frame_size=64, sigma=1.0):
+	"""One-row sheet of a Gaussian alpha blob, frame 0 centered, then moved by each shift"""
+	y, x = np.mgrid[0:frame_size, 0:frame_size].astype(float)
+	center = frame_size / 2
+	frames = []
+	for dx, dy in ((0.0, 0.0),) + tuple(shifts):
+		blob = np.exp(-((x - center - dx) ** 2 + (y - center - dy) ** 2) / (2 * sigma ** 2))
+		frame = np.zeros((frame_size, frame_size, 4), dtype=np.uint8)
+		frame[:, :, 3] = np.rint(blob * 255).astype(np.uint8)
+		frames.append(frame)
+	return frame_grid(np.concatenate(frames, axis=1), len(frames), 1)
+
+
+def test_subpixel_shifts_are_recovered():
+	dx, dy = phase_correlation_shifts(blob_sheet(SUBPIXEL_SHIFTS), 'alpha', 'row')
+	for i, expected in enumerate(SUBPIXEL_SHIFTS, start=1):
+		for recovered, shift in zip((dx[0, i], dy[0, i]), expected):
+			assert abs(recovered - shift) <= SUBPIXEL_TOLERANCE, (expected, dx[0, i], dy[0, i])
+			# Registration applies the rounded shift
+			assert np.rint(recovered) == np.rint(shift), (expected, dx[0, i], dy[0, i])
+
+
+def test_whole_pixel_jitter_is_removed():
+	frame = np.zeros((48, 48, 4), dtype=np.uint8)
+	frame[14:34, 18:30] = (200, 60, 60, 255)
+	frame[10:14, 20:28] = (240, 220, 180, 255)
+	shifts = ((0, 0), (3, -2), (-4, 1), (2, 5))
+	frames = [np.roll(frame, (dy, dx), axis=(0, 1)) for dx, dy in shifts]
+	grid = frame_grid(np.concatenate(frames, axis=1), len(frames), 1)
+
+	aligned, dx, dy, _, residual = register_frames(grid)
+	assert np.allclose(dx[0], [s[0] for s in shifts]) and np.allclose(dy[0], [s[1] for s in shifts])
+	assert residual < 1e-6
+	for k in range(len(frames)):
+		assert np.array_equal(aligned[0, :, k], frame)
@@ -0,0 +1,44 @@
+"""Checks for native-resolution recovery"""
+
+import numpy as np
+
+from pixel_grid import detect_grid, downsample_native, upscale
+
+
+def native_art(rows=10, cols=12):
+	"""Random pixel art from a small opaque palette"""
+	rng = np.random.default_rng(5)
+	palette = rng.integers(0, 256, (6, 4), dtype=np.uint8)
+	palette[:, 3] = 255
+	return palette[rng.integers(0, len(palette), (rows, cols))]
+
+
+def fixed_grid(pitch):
+	return {'pitch_x': pitch, 'phase_x': 0.0, 'score_x': 1.0,
+			'pitch_y': pitch, 'phase_y': 0.0, 'score_y': 1.0}
+
+
+def test_crisp_upscale_is_recovered_exactly():
+	art = native_art()
+	big = upscale(art, 6)
+	grid = detect_grid(big)
+	assert np.allclose((grid['pitch_x'], grid['pitch_y']), 6.0)
+	assert np.array_equal(downsample_native(big, grid), art)
+	assert np.array_equal(downsample_native(big, grid, 'mode'), art)
+
+
+def test_mode_falls_back_to_median_when_no_color_repeats():
+	art = native_art()
+	art[:, :, 2] //= 2
+	# A different blue offset for every pixel of a cell, like resampling
+	# leaves behind: no color repeats within a cell
+	y, x = np.mgrid[0:100, 0:120]
+	big = upscale(art, 10).copy()
+	big[:, :, 2] += ((y % 10) * 10 + x % 10).astype(np.uint8)
+
+	median = downsample_native(big, fixed_grid(10.0))
+	mode = downsample_native(big, fixed_grid(10.0), 'mode')
+	assert np.array_equal(mode, median)
+	assert np.array_equal(mode[:, :, :2], art[:, :, :2])
+	# Not the first (top-left) sample of each cell
+	assert not np.array_equal(mode, big[3::10, 3::10])
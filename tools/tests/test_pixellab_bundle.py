@@ -0,0 +1,69 @@
+"""Checks for reading PixelLab bundles and writing their frames"""
+
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from keypoint_align import align_bundle
+from pixellab_bundle import member_path, process_bundle
+from sprite_trim import trim_bundle
+
+
+def png_bytes(size=8):
+	buffer = io.BytesIO()
+	Image.fromarray(np.zeros((size, size, 4), dtype=np.uint8), 'RGBA').save(buffer, 'PNG')
+	return buffer.getvalue()
+
+
+def write_bundle(path, frame_paths):
+	"""Zip with metadata.json listing frame_paths as rotations, plus those members"""
+	metadata = {'frames': {'rotations': {f"dir_{i}": p for i, p in enumerate(frame_paths)}}}
+	with zipfile.ZipFile(path, 'w') as archive:
+		archive.writestr('metadata.json', json.dumps(metadata))
+		for frame_path in frame_paths:
+			archive.writestr(frame_path, png_bytes())
+	return str(path)
+
+
+def test_member_path_stays_below_directory(tmp_path):
+	root = str(tmp_path / 'out')
+	assert member_path(root, 'rotations/south.png') == os.path.join(root, 'rotations', 'south.png')
+	for bad in ('../evil.png', 'rotations/../../evil.png', '/tmp/evil.png', '', '.'):
+		with pytest.raises(ValueError):
+			member_path(root, bad)
+
+
+def test_process_bundle_rejects_paths_leaving_output_dir(tmp_path):
+	bundle = write_bundle(tmp_path / 'x.zip', ['rotations/south.png', '../../evil.png'])
+	with pytest.raises(ValueError):
+		process_bundle(bundle, str(tmp_path / 'a' / 'out'))
+	assert not os.path.exists(tmp_path / 'evil.png')
+	assert not os.path.exists(tmp_path / 'a' / 'out')
+
+
+def test_process_bundle_writes_frames(tmp_path):
+	bundle = write_bundle(tmp_path / 'x.zip', ['rotations/south.png'])
+	out = process_bundle(bundle, str(tmp_path / 'out'))
+	assert os.path.isfile(os.path.join(out, 'rotations', 'south.png'))
+	assert os.path.isfile(os.path.join(out, 'metadata.json'))
+
+
+def test_trim_bundle_rejects_paths_leaving_output_dir(tmp_path):
+	bundle = write_bundle(tmp_path / 'x.zip', ['rotations/south.png', '../../evil.png'])
+	with pytest.raises(ValueError):
+		trim_bundle(bundle, str(tmp_path / 'a' / 'out'))
+	assert not os.path.exists(tmp_path / 'evil.png')
+	assert not os.path.exists(tmp_path / 'a' / 'out')
+
+
+def test_align_bundle_rejects_paths_leaving_output_dir(tmp_path):
+	bundle = write_bundle(tmp_path / 'x.zip', ['rotations/south.png', '../../evil.png'])
+	with pytest.raises(ValueError):
+		align_bundle(bundle, str(tmp_path / 'a' / 'out'))
+	assert not os.path.exists(tmp_path / 'evil.png')
+	assert not os.path.exists(tmp_path / 'a' / 'out')
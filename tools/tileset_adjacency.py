@@ -0,0 +1,275 @@
+"""
+Tileset Adjacency Compiler
+Compiles a tileset JSON's connections into compact integer lookup tables
+
+The tileset JSON lists, for every tile, its east/west/north/south
+neighbours as UUID strings, so finding a neighbour means string lookups
+over a large file. This tool gives every tile a dense integer id (its
+position in tileset_data.tiles, the same index tileset_atlas.py uses) and
+writes <name>_adjacency.json (compact JSON):
+
+    tiles         tile UUIDs by id
+    names         tile names by id
+    words         32-bit words per neighbour mask
+    adjacency     direction -> flat list of tiles * words uint32 words;
+                  bit b of tile t's mask (word b // 32, bit b % 32) is set
+                  when tile b may be placed in that direction of tile t
+    corners       corner order and terrain encoding of the signature
+    signature     terrain-corner signature -> tile id (-1: no tile)
+    source        'connections' or 'corners' (see below)
+
+Lookups are O(1): adjacency[dir][t * words + b // 32] >> (b % 32) & 1, and
+signature[((NW * T + NE) * T + SW) * T + SE] for T terrain types.
+Masks use 32-bit words so they stay exact in engines that parse JSON
+numbers as doubles.
+
+Connections that do not name tiles of the same file (the UUIDs of a
+regenerated tileset, for example) cannot be compiled. Adjacency is then
+derived from the Wang corners instead: a tile fits east of another when
+its west corners equal the other's east corners.
+
+Usage:
+    python tileset_adjacency.py <tileset.json> [options]
+"""
+
+import json
+import numpy as np
+import os
+import sys
+
+
+DIRECTIONS = ('east', 'west', 'north', 'south')
+
+# Corner order of the signature (reading order, as in pattern_4x4)
+CORNER_ORDER = ('NW', 'NE', 'SW', 'SE')
+
+# Corners that must match: direction -> ((this tile's corner, neighbour's corner), ...)
+SHARED_CORNERS = {
+	'east': (('NE', 'NW'), ('SE', 'SW')),
+	'west': (('NW', 'NE'), ('SW', 'SE')),
+	'north': (('NW', 'SW'), ('NE', 'SE')),
+	'south': (('SW', 'NW'), ('SE', 'NE')),
+}
+
+# Terrain encoding when the JSON has no pattern_system
+DEFAULT_TERRAIN_ENCODING = {'lower': 0, 'upper': 1}
+
+SOURCES = ('auto', 'connections', 'corners')
+
+
+def load_tileset(json_path):
+	"""
+	Tiles and terrain encoding of a tileset JSON
+
+	Returns:
+		(list of tile dicts, dict terrain name -> code without the wildcard)
+	"""
+	with open(json_path, encoding='utf-8') as f:
+		tileset = json.load(f)
+
+	encoding = tileset.get('pattern_system', {}).get('terrain_encoding', DEFAULT_TERRAIN_ENCODING)
+	encoding = {name: code for name, code in encoding.items() if name != 'wildcard'}
+	return tileset['tileset_data']['tiles'], encoding
+
+
+def connection_neighbours(tiles):
+	"""
+	Neighbour sets from the tiles' connections
+
+	Returns:
+		(direction -> list of per-tile sets of tile ids, number of
+		connections naming no tile of this tileset)
+	"""
+	ids = {tile['id']: i for i, tile in enumerate(tiles)}
+	neighbours = {direction: [set() for _ in tiles] for direction in DIRECTIONS}
+	unresolved = 0
+
+	for i, tile in enumerate(tiles):
+		for direction in DIRECTIONS:
+			for uuid in tile.get('connections', {}).get(direction, []):
+				if uuid in ids:
+					neighbours[direction][i].add(ids[uuid])
+				else:
+					unresolved += 1
+
+	return neighbours, unresolved
+
+
+def corner_neighbours(tiles):
+	"""
+	Neighbour sets derived from matching Wang corners
+
+	Returns:
+		direction -> list of per-tile sets of tile ids
+	"""
+	neighbours = {}
+	for direction, pairs in SHARED_CORNERS.items():
+		# Tiles keyed by the corners they expose to a neighbour on that side
+		by_edge = {}
+		for j, tile in enumerate(tiles):
+			by_edge.setdefault(tuple(tile['corners'][theirs] for _, theirs in pairs), set()).add(j)
+		neighbours[direction] = [
+			set(by_edge.get(tuple(tile['corners'][mine] for mine, _ in pairs), ()))
+			for tile in tiles
+		]
+	return neighbours
+
+
+def pack_masks(neighbour_sets, count):
+	"""
+	Bitmasks of neighbour sets
+
+	Returns:
+		(count, words) uint32 array; bit b set in row t when b is in set t
+	"""
+	words = max(1, (count + 31) // 32)
+	masks = np.zeros((count, words), dtype=np.uint32)
+	for t, members in enumerate(neighbour_sets):
+		for b in members:
+			masks[t, b // 32] |= np.uint32(1 << (b % 32))
+	return masks
+
+
+def corner_signature(corners, encoding):
+	"""Integer signature of a tile's terrain corners"""
+	signature = 0
+	for corner in CORNER_ORDER:
+		signature = signature * len(encoding) + encoding[corners[corner]]
+	return signature
+
+
+def signature_table(tiles, encoding):
+	"""
+	Signature -> tile id table
+
+	Returns:
+		(int array of len(encoding) ** 4 entries, -1 where no tile has the
+		signature; number of tiles whose signature was already taken)
+	"""
+	table = np.full(len(encoding) ** len(CORNER_ORDER), -1, dtype=np.int32)
+	shadowed = 0
+	for i, tile in enumerate(tiles):
+		signature = corner_signature(tile['corners'], encoding)
+		if table[signature] == -1:
+			table[signature] = i
+		else:
+			shadowed += 1
+	return table, shadowed
+
+
+def compile_adjacency(json_path, output_path=None, source='auto'):
+	"""
+	Compile a tileset JSON into <name>_adjacency.json
+
+	Args:
+		json_path: Tileset JSON
+		output_path: Output path (default: <tileset>_adjacency.json)
+		source: 'connections', 'corners', or 'auto' (connections when all of
+				them name tiles of this tileset, else corners)
+
+	Returns:
+		Output path
+	"""
+	if source not in SOURCES:
+		raise ValueError(f"Unknown source: {source!r} (expected one of {SOURCES})")
+	if output_path is None:
+		output_path = os.path.splitext(json_path)[0] + '_adjacency.json'
+
+	print("="*60)
+	print(f"TILESET ADJACENCY: {json_path}")
+	print("="*60)
+
+	tiles, encoding = load_tileset(json_path)
+	count = len(tiles)
+
+	neighbours, unresolved = connection_neighbours(tiles)
+	total = sum(len(tile.get('connections', {}).get(d, [])) for tile in tiles for d in DIRECTIONS)
+	print(f"Tiles: {count}, connections: {total} ({unresolved} not naming a tile of this tileset)")
+
+	if source == 'auto':
+		source = 'connections' if total and not unresolved else 'corners'
+		if source == 'corners':
+			print("⚠ Connections do not resolve; deriving adjacency from corners")
+	if source == 'corners':
+		neighbours = corner_neighbours(tiles)
+
+	masks = {direction: pack_masks(neighbours[direction], count) for direction in DIRECTIONS}
+	table, shadowed = signature_table(tiles, encoding)
+	if shadowed:
+		print(f"⚠ {shadowed} tiles share a corner signature with an earlier tile")
+
+	compiled = {
+		'tiles': [tile['id'] for tile in tiles],
+		'names': [tile.get('name', f"tile_{i}") for i, tile in enumerate(tiles)],
+		'words': int(masks['east'].shape[1]),
+		'adjacency': {direction: masks[direction].reshape(-1).tolist() for direction in DIRECTIONS},
+		'corners': {'order': list(CORNER_ORDER), 'encoding': encoding},
+		'signature': table.tolist(),
+		'source': source,
+	}
+	with open(output_path, 'w', encoding='utf-8') as f:
+		json.dump(compiled, f, separators=(',', ':'))
+
+	covered = int((table >= 0).sum())
+	print(f"Signatures: {covered} of {len(table)} covered")
+	print(f"✓ {output_path} ({os.path.getsize(json_path):,} -> {os.path.getsize(output_path):,} bytes, "
+		  f"adjacency from {source})")
+	return output_path
+
+
+def load_adjacency(path):
+	"""
+	Load a compiled adjacency file for lookups
+
+	Returns:
+		Dict like the file, with 'adjacency' as direction -> (tiles, words)
+		uint32 arrays and 'signature' as an int32 array
+	"""
+	with open(path, encoding='utf-8') as f:
+		compiled = json.load(f)
+
+	words = compiled['words']
+	compiled['adjacency'] = {
+		direction: np.array(values, dtype=np.uint32).reshape(-1, words)
+		for direction, values in compiled['adjacency'].items()
+	}
+	compiled['signature'] = np.array(compiled['signature'], dtype=np.int32)
+	return compiled
+
+
+def can_connect(compiled, tile, neighbour, direction):
+	"""True if neighbour may be placed in direction of tile"""
+	word = compiled['adjacency'][direction][tile, neighbour // 32]
+	return bool((int(word) >> (neighbour % 32)) & 1)
+
+
+def tile_for_corners(compiled, corners):
+	"""Tile id for a dict of corner terrains (NW, NE, SW, SE), or -1"""
+	return int(compiled['signature'][corner_signature(corners, compiled['corners']['encoding'])])
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Tileset Adjacency Compiler")
+		print("="*60)
+		print("\nUsage:")
+		print("  python tileset_adjacency.py <tileset.json> [options]")
+		print()
+		print("Options:")
+		print("  -o <path>         Output path (default: <tileset>_adjacency.json)")
+		print("  --source <s>      'connections', 'corners' or 'auto' (default: auto,")
+		print("                    connections when they all name tiles of the tileset)")
+		print()
+		print("Examples:")
+		print("  python tileset_adjacency.py assets/tilesets/dungeon_tileset.json")
+		print("  python tileset_adjacency.py dungeon_tileset.json --source corners -o build/dungeon.json")
+		sys.exit(1)
+
+	output_path = None
+	source = 'auto'
+	if '-o' in sys.argv:
+		output_path = sys.argv[sys.argv.index('-o') + 1]
+	if '--source' in sys.argv:
+		source = sys.argv[sys.argv.index('--source') + 1]
+
+	compile_adjacency(sys.argv[1], output_path, source)
@@ -0,0 +1,289 @@
+"""
+Tileset Atlas Builder
+Cuts a tileset into tiles, merges identical tiles and repacks them tightly
+
+Tile boxes come from the tileset JSON (tileset_data.tiles[].bounding_box,
+e.g. assets/tilesets/dungeon_tileset.json); tilesets without one are cut
+into a uniform grid. Tiles can be cleaned like PixelLab frames (tiles that
+already have a transparent border are left alone), duplicate tiles are
+packed once, and the unique tiles go into as few, as small atlases as
+possible. <name>_tiles.json remaps every original tile to its region:
+
+    tiles[i]   {"index", "id", "name", "box", "tile"}  (original tile i)
+    unique[t]  {"atlas", "region": [x, y, w, h]}       (packed tile t)
+
+Usage:
+    python tileset_atlas.py <tileset.png> [options]
+"""
+
+import json
+import numpy as np
+import os
+import sys
+
+from atlas_packer import DEFAULT_MAX_ATLAS_SIZE, pack_atlases
+from bg_detect import has_transparent_border
+from decode_cache import load_rgba
+from fix_transparency_v2 import remove_background_array
+from frame_dedup import find_duplicates
+from png_output import save_png
+from stage_profile import stage, profile_run
+
+
+# Tile size when a tileset has no JSON
+DEFAULT_TILE_SIZE = 32
+
+# Transparent pixels between packed tiles (0: tiles touch, as in the source)
+DEFAULT_TILE_PADDING = 0
+
+
+def default_json_path(image_path):
+	"""<tileset>.json next to the image, or None"""
+	path = os.path.splitext(image_path)[0] + '.json'
+	return path if os.path.exists(path) else None
+
+
+def json_tiles(json_path):
+	"""
+	Tiles listed in a tileset JSON
+
+	Returns:
+		List of dicts with index, id, name and box (x, y, width, height)
+	"""
+	with open(json_path, encoding='utf-8') as f:
+		tileset = json.load(f)
+
+	tiles = []
+	for i, tile in enumerate(tileset['tileset_data']['tiles']):
+		box = tile['bounding_box']
+		tiles.append({
+			'index': i, 'id': tile.get('id'), 'name': tile.get('name', f"tile_{i}"),
+			'box': (box['x'], box['y'], box['width'], box['height']),
+		})
+	return tiles
+
+
+def grid_tiles(width, height, tile_width, tile_height=None):
+	"""Tiles of a uniform grid, row by row (partial cells are dropped)"""
+	tile_height = tile_height or tile_width
+	tiles = []
+	for y in range(0, height - tile_height + 1, tile_height):
+		for x in range(0, width - tile_width + 1, tile_width):
+			i = len(tiles)
+			tiles.append({'index': i, 'id': None, 'name': f"tile_{i}",
+						  'box': (x, y, tile_width, tile_height)})
+	return tiles
+
+
+def slice_tiles(data, tiles, inset=0):
+	"""
+	Copy every tile's pixels into tile['image']
+
+	Args:
+		data: Tileset RGBA array
+		tiles: Tile dicts with 'box'
+		inset: Pixels cut from every side of each box (grid lines)
+	"""
+	height, width = data.shape[:2]
+	for tile in tiles:
+		x, y, w, h = tile['box']
+		if x < 0 or y < 0 or x + w > width or y + h > height:
+			raise ValueError(f"Tile {tile['name']} box {tile['box']} is outside the {width}x{height} image")
+		if w <= 2 * inset or h <= 2 * inset:
+			raise ValueError(f"Inset {inset} leaves nothing of tile {tile['name']} ({w}x{h})")
+		tile['image'] = data[y + inset:y + h - inset, x + inset:x + w - inset].copy()
+
+
+def clean_tiles(tiles, tolerance=40, multi_color=True):
+	"""
+	Remove the background of every tile that is not already transparent
+
+	Only background connected to the tile border is removed.
+
+	Returns:
+		Number of tiles cleaned
+	"""
+	cleaned = 0
+	for tile in tiles:
+		if has_transparent_border(tile['image']):
+			continue
+		print(f"\n--- {tile['name']} ---")
+		remove_background_array(tile['image'], tolerance, multi_color, flood=True)
+		cleaned += 1
+	return cleaned
+
+
+def pack_tiles(tiles, max_size=DEFAULT_MAX_ATLAS_SIZE, padding=DEFAULT_TILE_PADDING, threshold=0):
+	"""
+	Merge duplicate tiles and pack the unique ones into atlases
+
+	Args:
+		tiles: Tile dicts with 'image'
+		max_size: Largest atlas side
+		padding: Gap between tiles
+		threshold: Max per-channel difference for near-duplicate tiles
+
+	Returns:
+		(atlas RGBA arrays, index dict with 'tiles' and 'unique' as in the
+		module docstring)
+	"""
+	aliases = find_duplicates(tiles, threshold, flips=False)
+	packed = [i for i, alias in enumerate(aliases) if alias is None]
+	sizes = [(tiles[i]['image'].shape[1], tiles[i]['image'].shape[0]) for i in packed]
+
+	canvases = []
+	unique = [None] * len(packed)
+	for a, atlas in enumerate(pack_atlases(sizes, max_size, padding)):
+		width, height = atlas['size']
+		canvas = np.zeros((height, width, 4), dtype=np.uint8)
+		for t, (x, y) in atlas['placements'].items():
+			w, h = sizes[t]
+			canvas[y:y + h, x:x + w] = tiles[packed[t]]['image']
+			unique[t] = {'atlas': a, 'region': [x, y, w, h]}
+		canvases.append(canvas)
+
+	# Original tile -> packed tile, following aliases to their source
+	slot = {i: t for t, i in enumerate(packed)}
+	entries = []
+	for i, tile in enumerate(tiles):
+		source = i if aliases[i] is None else aliases[i]['source']
+		entries.append({
+			'index': tile['index'], 'id': tile['id'], 'name': tile['name'],
+			'box': list(tile['box']), 'tile': slot[source],
+		})
+
+	return canvases, {'tiles': entries, 'unique': unique}
+
+
+def build_tileset_atlas(image_path, json_path=None, output_dir=None, name=None,
+						tile_size=DEFAULT_TILE_SIZE, inset=0, clean=False, tolerance=40,
+						threshold=0, max_size=DEFAULT_MAX_ATLAS_SIZE, padding=DEFAULT_TILE_PADDING):
+	"""
+	Slice a tileset, merge duplicate tiles and write the atlas and its index
+
+	Args:
+		image_path: Tileset image
+		json_path: Tileset JSON with bounding boxes (default: <image>.json if
+				   present, else a uniform grid of tile_size)
+		output_dir: Output directory (default: next to the image)
+		name: Base name of the outputs (default: image name)
+		tile_size: Grid tile size when there is no JSON
+		inset: Pixels cut from every side of each tile (grid lines)
+		clean: Remove the background of tiles without a transparent border
+		tolerance: Background removal tolerance
+		threshold: Max per-channel difference for near-duplicate tiles
+		max_size: Largest atlas side
+		padding: Gap between packed tiles
+
+	Returns:
+		Path of the <name>_tiles.json index
+	"""
+	base = os.path.splitext(image_path)[0]
+	if name is None:
+		name = os.path.basename(base)
+	if output_dir is None:
+		output_dir = os.path.dirname(image_path) or '.'
+	os.makedirs(output_dir, exist_ok=True)
+	if json_path is None:
+		json_path = default_json_path(image_path)
+
+	print("="*60)
+	print(f"TILESET ATLAS: {image_path}")
+	print("="*60)
+
+	with stage('load') as info:
+		data = load_rgba(image_path)
+		height, width = data.shape[:2]
+		info['pixels'] = height * width
+	if json_path:
+		tiles = json_tiles(json_path)
+		print(f"Tiles: {len(tiles)} from {json_path}")
+	else:
+		tiles = grid_tiles(width, height, tile_size)
+		print(f"Tiles: {len(tiles)} ({tile_size}px grid, no tileset JSON)")
+
+	with stage('slice', height * width):
+		slice_tiles(data, tiles, inset)
+	if clean:
+		with stage('clean', height * width):
+			cleaned = clean_tiles(tiles, tolerance)
+		print(f"\nCleaned {cleaned} of {len(tiles)} tiles")
+
+	with stage('pack', height * width):
+		canvases, index = pack_tiles(tiles, max_size, padding, threshold)
+	print(f"Unique tiles: {len(index['unique'])} of {len(tiles)}")
+
+	atlas_paths = []
+	for a, canvas in enumerate(canvases):
+		suffix = '' if len(canvases) == 1 else f"_{a}"
+		atlas_path = os.path.join(output_dir, f"{name}_atlas{suffix}.png")
+		with stage('save', canvas.shape[0] * canvas.shape[1]):
+			size, mode = save_png(canvas, atlas_path)
+		atlas_paths.append(atlas_path)
+		print(f"  Atlas {a}: {canvas.shape[1]}x{canvas.shape[0]}, "
+			  f"{size / 1024:.1f} KB {mode} -> {atlas_path}")
+
+	index_path = os.path.join(output_dir, f"{name}_tiles.json")
+	with open(index_path, 'w', encoding='utf-8') as f:
+		json.dump({
+			'source': os.path.basename(image_path),
+			'atlases': [os.path.basename(path) for path in atlas_paths],
+			**index,
+		}, f, indent=2)
+
+	source_area = sum(tile['box'][2] * tile['box'][3] for tile in tiles)
+	atlas_area = sum(canvas.shape[0] * canvas.shape[1] for canvas in canvases)
+	print(f"✓ Index: {index_path} ({source_area:,} -> {atlas_area:,} px)")
+	return index_path
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Tileset Atlas Builder")
+		print("="*60)
+		print("\nUsage:")
+		print("  python tileset_atlas.py <tileset.png> [options]")
+		print()
+		print("Options:")
+		print("  --json <path>     Tileset JSON with bounding boxes (default: <tileset>.json)")
+		print(f"  --tile <px>       Grid tile size without a JSON (default: {DEFAULT_TILE_SIZE})")
+		print("  --inset <px>      Pixels cut from every side of each tile (grid lines)")
+		print("  --clean           Remove the background of tiles without transparency")
+		print("  -t <value>        Background removal tolerance (default: 40)")
+		print("  --threshold <v>   Max per-channel difference for near-duplicate tiles")
+		print(f"  --max-size <px>   Largest atlas side (default: {DEFAULT_MAX_ATLAS_SIZE})")
+		print(f"  --padding <px>    Gap between tiles (default: {DEFAULT_TILE_PADDING})")
+		print("  -o <dir>          Output directory (default: next to the tileset)")
+		print("  -n <name>         Output base name (default: tileset name)")
+		print("  --profile <path>  Per-stage timing and memory (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python tileset_atlas.py assets/tilesets/dungeon_tileset.png -o build/tilesets")
+		print("  python tileset_atlas.py assets/tilesets/village_tileset.png --tile 128 --inset 3")
+		sys.exit(1)
+
+	args = sys.argv[1:]
+	options = {}
+
+	if '--json' in args:
+		options['json_path'] = args[args.index('--json') + 1]
+	if '--tile' in args:
+		options['tile_size'] = int(args[args.index('--tile') + 1])
+	if '--inset' in args:
+		options['inset'] = int(args[args.index('--inset') + 1])
+	if '-t' in args:
+		options['tolerance'] = int(args[args.index('-t') + 1])
+	if '--threshold' in args:
+		options['threshold'] = int(args[args.index('--threshold') + 1])
+	if '--max-size' in args:
+		options['max_size'] = int(args[args.index('--max-size') + 1])
+	if '--padding' in args:
+		options['padding'] = int(args[args.index('--padding') + 1])
+	if '-o' in args:
+		options['output_dir'] = args[args.index('-o') + 1]
+	if '-n' in args:
+		options['name'] = args[args.index('-n') + 1]
+
+	with profile_run(args):
+		build_tileset_atlas(args[0], clean='--clean' in args, **options)
@@ -0,0 +1,254 @@
+"""
+Asset Watcher
+Long-running watch mode that processes new sprites as they land
+
+Monitors assets/sprites and assets/tilesets for new or changed PNGs and
+PixelLab zip bundles. Bursts of events (an artist saving several files,
+a zip being copied) are debounced, then the matching pipeline stage runs
+in this already-warm process: PIL, numpy and the tools are imported
+once, so a saved sprite is processed well under a second later.
+
+Outputs go to a separate directory (default: build/processed, mirroring
+the layout below each watched directory's parent, e.g.
+sprites/bosses/x.png) so they never retrigger the watcher.
+
+Usage:
+    python tools/watch_assets.py [options]
+"""
+
+from PIL import Image
+import numpy as np
+import os
+import sys
+import time
+
+from bg_detect import has_transparent_border
+from fix_transparency_v2 import remove_background_advanced
+from pixellab_bundle import process_bundle
+from stage_profile import stage, profile_run
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_WATCH_DIRS = [
+	os.path.join(REPO_ROOT, 'assets', 'sprites'),
+	os.path.join(REPO_ROOT, 'assets', 'tilesets'),
+]
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, 'build', 'processed')
+
+# Seconds between directory scans
+POLL_INTERVAL = 0.1
+
+# A file must be unchanged for this long before it is processed
+DEBOUNCE_SECONDS = 0.3
+
+# Outputs written by the tools themselves, never treated as new inputs
+OUTPUT_SUFFIXES = ('_transparent.png', '_final.png', '_fixed.png',
+				   '_fixed_grid.png', '_fixed_aligned.png')
+
+
+def is_watched(path):
+	"""True for files the watcher should react to"""
+	name = os.path.basename(path).lower()
+	if name.endswith('.zip'):
+		return True
+	return name.endswith('.png') and not name.endswith(OUTPUT_SUFFIXES)
+
+
+def snapshot(watch_dirs, output_dir=None):
+	"""
+	Map every watched file to its (mtime, size)
+
+	Args:
+		watch_dirs: Directories to scan recursively
+		output_dir: Directory to skip (outputs)
+	"""
+	files = {}
+	skip = os.path.abspath(output_dir) if output_dir else None
+
+	for watch_dir in watch_dirs:
+		for root, dirs, names in os.walk(watch_dir):
+			if skip and os.path.abspath(root).startswith(skip):
+				dirs[:] = []
+				continue
+			for name in names:
+				path = os.path.join(root, name)
+				if not is_watched(path):
+					continue
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				files[path] = (stat.st_mtime_ns, stat.st_size)
+
+	return files
+
+
+def output_base_for(path, watch_dirs, output_dir):
+	"""
+	Output path (without extension) mirroring an input into the output directory
+
+	The layout below each watched directory's parent is kept, so
+	assets/sprites/bosses/x.png becomes <output_dir>/sprites/bosses/x
+	"""
+	path = os.path.abspath(path)
+	for watch_dir in watch_dirs:
+		watch_dir = os.path.abspath(watch_dir)
+		if path.startswith(watch_dir + os.sep):
+			rel = os.path.relpath(path, os.path.dirname(watch_dir))
+			break
+	else:
+		rel = os.path.basename(path)
+
+	base = os.path.join(output_dir, os.path.splitext(rel)[0])
+	os.makedirs(os.path.dirname(base), exist_ok=True)
+	return base
+
+
+def process_png(path, output_base, tolerance):
+	"""Stage for single PNGs: background removal"""
+	with Image.open(path) as img:
+		already_transparent = img.mode == 'RGBA' and has_transparent_border(np.array(img))
+
+	if already_transparent:
+		# Real transparency already (e.g. PixelLab exports); the black
+		# transparent border would otherwise be detected as background
+		print("  Already transparent, skipped")
+		return []
+
+	return [remove_background_advanced(path, output_base + '.png', tolerance=tolerance)]
+
+
+def process_zip(path, output_base, tolerance):
+	"""Stage for PixelLab bundles: process members straight from the archive"""
+	return [process_bundle(path, output_base, tolerance)]
+
+
+# Pipeline stage per file extension
+STAGES = {
+	'.png': process_png,
+	'.zip': process_zip,
+}
+
+
+def run_stage(path, watch_dirs, output_dir, tolerance):
+	"""Run the pipeline stage for one changed file, isolating errors"""
+	process = STAGES.get(os.path.splitext(path)[1].lower())
+	if process is None:
+		return []
+
+	try:
+		with stage('file') as info:
+			info['input'] = path
+			return process(path, output_base_for(path, watch_dirs, output_dir), tolerance)
+	except Exception as e:
+		print(f"✗ Error processing {path}: {e}")
+		return []
+
+
+def watch(watch_dirs=None, output_dir=DEFAULT_OUTPUT_DIR, tolerance=40,
+		  process_existing=False, poll_interval=POLL_INTERVAL,
+		  debounce=DEBOUNCE_SECONDS, once=False):
+	"""
+	Watch directories and process new or changed assets
+
+	Args:
+		watch_dirs: Directories to watch (default: assets/sprites, assets/tilesets)
+		output_dir: Where processed outputs are written
+		tolerance: Background removal tolerance
+		process_existing: Also process every file present at startup
+		poll_interval: Seconds between scans
+		debounce: Quiet period before a changed file is processed
+		once: Process pending files once and return (no watching)
+	"""
+	watch_dirs = watch_dirs or DEFAULT_WATCH_DIRS
+
+	print("="*60)
+	print("ASSET WATCHER")
+	print("="*60)
+	for d in watch_dirs:
+		print(f"Watching: {d}")
+	print(f"Output:   {output_dir}")
+	print("Press Ctrl+C to stop\n")
+
+	known = {} if process_existing else snapshot(watch_dirs, output_dir)
+	# path -> (signature, first seen changed, last seen changed)
+	pending = {}
+
+	try:
+		while True:
+			now = time.perf_counter()
+			current = snapshot(watch_dirs, output_dir)
+
+			for path, signature in current.items():
+				if known.get(path) == signature:
+					continue
+				if path in pending and pending[path][0] == signature:
+					continue
+				first_seen = pending[path][1] if path in pending else now
+				pending[path] = (signature, first_seen, now)
+
+			for path in [p for p in pending if p not in current]:
+				del pending[path]
+
+			# Files quiet for the debounce period are ready, oldest first
+			ready = sorted(
+				(p for p, (_, _, last) in pending.items() if now - last >= debounce),
+				key=lambda p: pending[p][1],
+			)
+
+			for path in ready:
+				signature, first_seen, _ = pending.pop(path)
+				known[path] = signature
+
+				print(f"\n→ Changed: {path}")
+				outputs = run_stage(path, watch_dirs, output_dir, tolerance)
+				latency = time.perf_counter() - first_seen
+				for out in outputs:
+					print(f"  ✓ {out}")
+				print(f"  Done in {latency:.2f}s after change detected")
+
+			if once and not pending:
+				return
+			time.sleep(poll_interval)
+	except KeyboardInterrupt:
+		print("\nStopped watching")
+
+
+if __name__ == "__main__":
+	if '--help' in sys.argv:
+		print("Asset Watcher")
+		print("="*60)
+		print("\nUsage:")
+		print("  python watch_assets.py [options]")
+		print()
+		print("Options:")
+		print("  -d <dir>          Directory to watch (repeatable,")
+		print("                    default: assets/sprites and assets/tilesets)")
+		print("  -o <dir>          Output directory (default: build/processed)")
+		print("  -t <value>        Background removal tolerance (default: 40)")
+		print("  --all             Also process files that exist at startup")
+		print("  --once            Process pending files once, then exit")
+		print("  --profile <path>  Per-stage timing and memory, written on exit")
+		print("                    (.jsonl, else Chrome trace)")
+		print("  --quiet           No console output")
+		print()
+		print("Examples:")
+		print("  python watch_assets.py")
+		print("  python watch_assets.py -d assets/sprites/bosses -t 45")
+		print("  python watch_assets.py --all --once")
+		sys.exit(0)
+
+	args = sys.argv[1:]
+	watch_dirs = [args[i + 1] for i, a in enumerate(args) if a == '-d' and i + 1 < len(args)]
+	output_dir = DEFAULT_OUTPUT_DIR
+	tolerance = 40
+
+	if '-o' in args:
+		output_dir = args[args.index('-o') + 1]
+	if '-t' in args:
+		tolerance = int(args[args.index('-t') + 1])
+
+	with profile_run(args):
+		watch(watch_dirs or None, output_dir, tolerance,
+			  process_existing='--all' in args, once='--once' in args)